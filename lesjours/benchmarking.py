@@ -0,0 +1,94 @@
+"""
+Helpers shared by the benchmark_* management commands: running a callable
+from many threads at once and summarising the latencies it produced.
+"""
+import threading
+import time
+
+from django.db import connection, connections
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def latency_summary(latencies):
+    """p50/p99/mean/max of latencies (seconds), reported in milliseconds."""
+    if not latencies:
+        return {'p50_ms': 0.0, 'p99_ms': 0.0, 'mean_ms': 0.0, 'max_ms': 0.0}
+    return {
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'mean_ms': sum(latencies) / len(latencies) * 1000,
+        'max_ms': max(latencies) * 1000,
+    }
+
+
+def run_concurrently(worker, threads, iterations):
+    """
+    Calls worker(thread_index, iteration) iterations times in each of threads
+    threads, all released together by a barrier. Returns (samples, wall_time)
+    where samples is a list of (latency_seconds, result_or_exception).
+    Each thread closes its own database connections when it finishes.
+    """
+    barrier = threading.Barrier(threads)
+    samples = []
+    lock = threading.Lock()
+
+    def run(thread_index):
+        local = []
+        try:
+            barrier.wait()
+            for iteration in range(iterations):
+                started = time.perf_counter()
+                try:
+                    result = worker(thread_index, iteration)
+                except Exception as e:
+                    result = e
+                local.append((time.perf_counter() - started, result))
+        finally:
+            connections.close_all()
+            with lock:
+                samples.extend(local)
+
+    pool = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return samples, time.perf_counter() - started
+
+
+class QueryCounter:
+    """
+    Counts statements executed on this thread's default connection. Unlike
+    CaptureQueriesContext it is not reset by request_started, so it can wrap
+    requests made through the test client.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
+
+    def __len__(self):
+        return self.count
+
+
+def format_summary(summary):
+    return ', '.join(f'{key}={value:.2f}' for key, value in summary.items())
@@ -0,0 +1,52 @@
+"""
+In-process timing counters.
+
+Each worker process keeps its own counters (no shared storage); they are
+cheap enough to record on every request and are read through the admin
+metrics endpoint (lesjours.views.MetricsView) or from benchmarks.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+_counters = {}
+
+
+def record(name, seconds, error=False):
+    with _lock:
+        counter = _counters.get(name)
+        if counter is None:
+            counter = _counters[name] = {'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+        ms = seconds * 1000
+        counter['count'] += 1
+        counter['errors'] += error
+        counter['total_ms'] += ms
+        counter['max_ms'] = max(counter['max_ms'], ms)
+
+
+@contextmanager
+def timer(name):
+    """Records the duration of the block under name; an exception counts as an error."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        record(name, time.perf_counter() - started, error=True)
+        raise
+    record(name, time.perf_counter() - started)
+
+
+def snapshot(prefix=''):
+    """{name: {count, errors, total_ms, max_ms, mean_ms}} for counters starting with prefix."""
+    with _lock:
+        return {
+            name: dict(counter, mean_ms=counter['total_ms'] / counter['count'] if counter['count'] else 0.0)
+            for name, counter in sorted(_counters.items())
+            if name.startswith(prefix)
+        }
+
+
+def reset():
+    with _lock:
+        _counters.clear()
@@ -1,48 +1,80 @@
 from django.utils.deprecation import MiddlewareMixin
-from django.http import HttpResponsePermanentRedirect
+from django.http import HttpResponse, HttpResponsePermanentRedirect
 from django.conf import settings
 from django.urls import is_valid_path
 import re
+import threading
+from collections import OrderedDict
+
+from users.hashers import PasswordHashingBusy
 
 
 class AppendOrRemoveSlashMiddleware(MiddlewareMixin):
     """
     Middleware для обработки URL с trailing slash и без него.
     Поддерживает все типы запросов (GET, POST, PUT, DELETE и т.д.)
+
+    Решение «добавлять ли слеш» зависит только от формы пути, поэтому оно
+    запоминается в ограниченном LRU (SLASH_DECISION_CACHE_SIZE), где ключ —
+    путь с заменёнными на 0 числами: /api/masterclasses/masterclasses/12 и
+    /api/masterclasses/masterclasses/13 дают одну запись. При попадании в кэш
+    middleware не резолвит URL вовсе, и за запрос остаётся один resolve —
+    тот, что делает Django при диспатче.
     """
-    
+
+    DIGITS = re.compile(r'\d+')
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.decisions = OrderedDict()
+        self.lock = threading.Lock()
+
     def process_request(self, request):
         # Получаем URL-путь запроса
-        path = request.path
+        path = request.path_info
+
+        # URL со слешем оставляем как есть
+        if path.endswith('/'):
+            return None
+
         urlconf = getattr(request, 'urlconf', None)
-        
-        # Проверяем URL без слеша
-        if not path.endswith('/'):
-            path_with_slash = path + '/'
-            if is_valid_path(path_with_slash, urlconf):
-                # URL со слешем существует, но мы не будем перенаправлять
-                # Вместо этого мы меняем URL запроса, чтобы он соответствовал пути со слешем
-                request.path = request.path_info = path_with_slash
-                return None
-        
-        # Проверяем URL со слешем
-        elif path != '/' and path.endswith('/'):
-            path_without_slash = path[:-1]
-            if is_valid_path(path_without_slash, urlconf):
-                # URL без слеша существует, но мы не будем перенаправлять
-                # Вместо этого оставляем URL как есть со слешем
-                return None
-        
+        if self.append_slash(path, urlconf):
+            # URL со слешем существует, но мы не будем перенаправлять
+            # Вместо этого мы меняем URL запроса, чтобы он соответствовал пути со слешем
+            request.path = request.path + '/'
+            request.path_info = path + '/'
         return None
 
-class CorsMiddleware:
-    def __init__(self, get_response):
-        self.get_response = get_response
-
-    def __call__(self, request):
-        response = self.get_response(request)
-        response["Access-Control-Allow-Origin"] = "*"
-        response["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS, PATCH"
-        response["Access-Control-Allow-Headers"] = "DNT,User-Agent,X-Requested-With,If-Modified-Since,Cache-Control,Content-Type,Range,Authorization"
-        response["Access-Control-Expose-Headers"] = "Content-Length,Content-Range"
-        return response 
\ No newline at end of file
+    def append_slash(self, path, urlconf):
+        key = (urlconf, self.DIGITS.sub('0', path))
+        with self.lock:
+            decision = self.decisions.get(key)
+            if decision is not None:
+                self.decisions.move_to_end(key)
+                return decision
+
+        decision = is_valid_path(path + '/', urlconf)
+        with self.lock:
+            self.decisions[key] = decision
+            while len(self.decisions) > settings.SLASH_DECISION_CACHE_SIZE:
+                self.decisions.popitem(last=False)
+        return decision
+
+
+class PasswordHashingBusyMiddleware(MiddlewareMixin):
+    """
+    503 с Retry-After, когда пул хеширования паролей (users.hashers) переполнен,
+    и для views вне DRF: вход в админку, allauth, сессионный authenticate().
+    Во views DRF исключение до сюда не доходит — его обрабатывает DRF.
+    """
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, PasswordHashingBusy):
+            return None
+        response = HttpResponse(
+            str(exception.detail),
+            status=exception.status_code,
+            content_type='text/plain; charset=utf-8',
+        )
+        response['Retry-After'] = str(exception.wait)
+        return response
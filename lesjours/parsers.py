@@ -0,0 +1,97 @@
+"""
+Request body parsers for all API views (REST_FRAMEWORK['DEFAULT_PARSER_CLASSES']).
+
+Some clients wrap JSON in one of three envelopes:
+
+- a JSON object posted as application/x-www-form-urlencoded, which arrives
+  as a single form key;
+- a JSON string that holds the object;
+- an object wrapped as {"data": "<json>"}.
+
+These parsers read the body once, unwrap those shapes and give views a
+plain dict. A body larger than API_MAX_BODY_BYTES is refused with a 413
+before it is read.
+"""
+import json
+
+from django.conf import settings
+from django.http import QueryDict
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework.parsers import FormParser, JSONParser
+
+
+class RequestTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Request body is too large.'
+    default_code = 'request_too_large'
+
+
+def read_body(stream, parser_context):
+    limit = settings.API_MAX_BODY_BYTES
+    request = (parser_context or {}).get('request')
+    if request is not None:
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        if length > limit:
+            raise RequestTooLarge()
+    # Chunked bodies have no Content-Length: never read more than limit + 1 bytes
+    body = stream.read(limit + 1)
+    if len(body) > limit:
+        raise RequestTooLarge()
+    return body
+
+
+def unwrap(data):
+    """Decodes a JSON string or a {"data": "<json>"} envelope holding an object; returns anything else as is."""
+    if isinstance(data, str):
+        try:
+            decoded = json.loads(data)
+        except ValueError:
+            return data
+        return decoded if isinstance(decoded, dict) else data
+    if isinstance(data, dict) and len(data) == 1 and isinstance(data.get('data'), str):
+        decoded = unwrap(data['data'])
+        if isinstance(decoded, dict):
+            return decoded
+    return data
+
+
+class TolerantJSONParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        body = read_body(stream, parser_context)
+        try:
+            data = json.loads(body.decode(encoding))
+        except ValueError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+        return unwrap(data)
+
+
+class TolerantFormParser(FormParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        body = read_body(stream, parser_context)
+        try:
+            text = body.decode(encoding)
+        except UnicodeDecodeError as exc:
+            raise ParseError(f'Form parse error - {exc}')
+
+        # A raw JSON object sent with a form content type
+        if text.lstrip().startswith('{'):
+            data = unwrap(text)
+            if isinstance(data, dict):
+                return data
+
+        form = QueryDict(text, encoding=encoding)
+        if len(form) == 1:
+            key, value = next(iter(form.items()))
+            # URL-encoded JSON object (the whole object is the only key), or data=<json>
+            envelope = key if not value else value if key == 'data' else None
+            if envelope and envelope.lstrip().startswith('{'):
+                data = unwrap(envelope)
+                if isinstance(data, dict):
+                    return data
+        return form
@@ -0,0 +1,70 @@
+"""
+Base for the purge_* management commands: each one lists querysets of
+expired rows and deletes them batch by batch, so no statement holds row
+locks for long.
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class PurgeCommand(BaseCommand):
+    """Subclasses implement get_targets(now) returning (label, queryset) pairs."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.CART_PURGE_BATCH_SIZE,
+            help='Rows deleted per statement (keeps row locks short)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0,
+            help='Seconds to pause between batches',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the rows that would be deleted',
+        )
+
+    def get_targets(self, now):
+        raise NotImplementedError
+
+    def handle(self, *args, **options):
+        for label, queryset in self.get_targets(timezone.now()):
+            if options['dry_run']:
+                self.stdout.write(f'{label}: {queryset.count()} rows would be deleted')
+                continue
+            deleted, batches, elapsed = self.purge(queryset, options['batch_size'], options['sleep'])
+            rate = deleted / elapsed if elapsed else 0
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'{label}: deleted {deleted} rows in {batches} batches, '
+                    f'{elapsed:.2f}s ({rate:.0f} rows/s)'
+                )
+            )
+
+    def purge(self, queryset, batch_size, sleep):
+        """
+        Deletes the queryset batch by batch: each iteration selects at most
+        batch_size primary keys and deletes them in its own short transaction.
+        """
+        model = queryset.model
+        deleted = 0
+        batches = 0
+        started = time.monotonic()
+        while True:
+            pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+            model.objects.filter(pk__in=pks).delete()
+            deleted += len(pks)
+            batches += 1
+            if sleep:
+                time.sleep(sleep)
+        return deleted, batches, time.monotonic() - started
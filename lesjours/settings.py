@@ -107,6 +107,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so CORS preflights are answered before sessions, CSRF and auth
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -118,6 +119,7 @@ MIDDLEWARE = [
     'django.middleware.locale.LocaleMiddleware',
     'allauth.account.middleware.AccountMiddleware',
     'lesjours.middleware.AppendOrRemoveSlashMiddleware',
+    'lesjours.middleware.PasswordHashingBusyMiddleware',
 ]
 
 ROOT_URLCONF = 'lesjours.urls'
@@ -145,17 +147,36 @@ WSGI_APPLICATION = 'lesjours.wsgi.application'
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
 if 'test' in sys.argv:
+    # TEST_DATABASE_URL=postgres://... runs the suite (including concurrency tests) on PostgreSQL
     DATABASES = {
-        'default': {
-            'ENGINE': 'django.db.backends.sqlite3',
-            'NAME': ':memory:',
-        }
+        'default': env.db('TEST_DATABASE_URL', default='sqlite://:memory:')
     }
 else:
     DATABASES = {
         'default': env.db()
     }
 
+# CACHE_URL=redis://... shares the cache between workers; tests get a dummy cache unless TEST_CACHE_URL is set
+if 'test' in sys.argv:
+    CACHES = {
+        'default': env.cache('TEST_CACHE_URL', default='dummycache://')
+    }
+else:
+    CACHES = {
+        'default': env.cache('CACHE_URL', default='locmemcache://')
+    }
+
+
+# PBKDF2 runs on a bounded pool (users.hashers); requests beyond workers + queue get a 503
+PASSWORD_HASHERS = [
+    'users.hashers.BoundedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_HASH_WORKERS = env.int('PASSWORD_HASH_WORKERS', default=2)
+PASSWORD_HASH_QUEUE = env.int('PASSWORD_HASH_QUEUE', default=8)
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -228,6 +249,7 @@ ACCOUNT_UNIQUE_EMAIL = True
 
 # Email settings
 EMAIL_BACKEND = env('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = env.str('DEFAULT_FROM_EMAIL', default='Les Jours <noreply@les-jours.ru>')
 
 # Login/Logout URLs
 LOGIN_REDIRECT_URL = 'home'
@@ -243,10 +265,8 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.BasicAuthentication',
-        'users.api.authentication.ExpiringTokenAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Session, Basic, Token or JWT, picked by the Authorization header
+        'users.api.authentication.DispatchingAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -254,12 +274,32 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 12,
     'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.coreapi.AutoSchema',
+    # JSON and form parsers that also unwrap JSON sent inside form bodies (lesjours.parsers)
+    'DEFAULT_PARSER_CLASSES': [
+        'lesjours.parsers.TolerantJSONParser',
+        'lesjours.parsers.TolerantFormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # Only views with a throttle_scope are limited (lesjours.throttling)
+    'DEFAULT_THROTTLE_CLASSES': [
+        'lesjours.throttling.FixedWindowThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'auth': env.str('THROTTLE_AUTH_RATE', default='20/min'),
+        'token_refresh': env.str('THROTTLE_TOKEN_REFRESH_RATE', default='60/min'),
+        'promo': env.str('THROTTLE_PROMO_RATE', default='30/min'),
+        'checkout': env.str('THROTTLE_CHECKOUT_RATE', default='10/min'),
+    },
 }
 
 # JWT Settings
 from users.api.jwt_settings import SIMPLE_JWT as SIMPLE_JWT_BASE
 SIMPLE_JWT = SIMPLE_JWT_BASE.copy()
 SIMPLE_JWT["SIGNING_KEY"] = SECRET_KEY
+# Revoked JWTs (users.revocation): each process re-reads new revocations at most this often
+JWT_REVOCATION_REFRESH_SECONDS = env.int('JWT_REVOCATION_REFRESH_SECONDS', default=5)
+JWT_REVOCATION_BLOOM_CAPACITY = env.int('JWT_REVOCATION_BLOOM_CAPACITY', default=100000)
+JWT_REVOCATION_BLOOM_ERROR_RATE = env.float('JWT_REVOCATION_BLOOM_ERROR_RATE', default=0.001)
 
 # Swagger settings
 SWAGGER_SETTINGS = {
@@ -283,6 +323,55 @@ SWAGGER_SETTINGS = {
 
 # Cart settings
 CART_SESSION_ID = 'cart'
+# Carts untouched for this many days are treated as empty and removed by purge_stale_carts
+CART_TTL_DAYS = env.int('CART_TTL_DAYS', default=30)
+CART_PURGE_BATCH_SIZE = env.int('CART_PURGE_BATCH_SIZE', default=500)
+# Seats put in a cart are held for this long; release_expired_holds returns them afterwards
+SEAT_HOLD_TTL_SECONDS = env.int('SEAT_HOLD_TTL_SECONDS', default=15 * 60)
+# Responses stored for Idempotency-Key replays are kept this long
+IDEMPOTENCY_KEY_TTL_HOURS = env.int('IDEMPOTENCY_KEY_TTL_HOURS', default=24)
+# A key still in progress after this long is taken to be abandoned (worker killed or timed out); a retry takes it over
+IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS = env.int('IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS', default=120)
+# DRF auth tokens expire after this many hours; purge_expired_tokens deletes the expired rows
+AUTH_TOKEN_TTL_HOURS = env.int('AUTH_TOKEN_TTL_HOURS', default=24)
+# Token lookups (creation time and user fields) are cached for this long; saving the user drops the entry.
+# The drop only reaches workers sharing the cache: with the per-process locmem default, other workers keep
+# accepting a deactivated user's or deleted token's credentials for up to this long (use CACHE_URL=redis://...)
+AUTH_TOKEN_CACHE_SECONDS = env.int('AUTH_TOKEN_CACHE_SECONDS', default=60)
+
+# JSON and form request bodies above this size are refused with 413 (lesjours.parsers)
+API_MAX_BODY_BYTES = env.int('API_MAX_BODY_BYTES', default=1024 * 1024)
+
+# Trailing-slash decisions (AppendOrRemoveSlashMiddleware) are remembered for this many path shapes
+SLASH_DECISION_CACHE_SIZE = env.int('SLASH_DECISION_CACHE_SIZE', default=1024)
+
+# User info (UserInfoView) is cached per user for this long; saving the user or profile drops it
+USER_INFO_CACHE_SECONDS = env.int('USER_INFO_CACHE_SECONDS', default=300)
+
+# Wishlisted masterclass IDs (in_wishlist) are cached per user for this long; wishlist changes drop them
+WISHLIST_CACHE_SECONDS = env.int('WISHLIST_CACHE_SECONDS', default=300)
+
+# "Recently viewed" history: rows kept per user, and when buffered views are written (users.last_seen)
+LAST_SEEN_LIMIT = env.int('LAST_SEEN_LIMIT', default=20)
+LAST_SEEN_FLUSH_SIZE = env.int('LAST_SEEN_FLUSH_SIZE', default=200)
+LAST_SEEN_FLUSH_SECONDS = env.int('LAST_SEEN_FLUSH_SECONDS', default=10)
+
+# Per-user order summary (count, total spent, upcoming bookings) is cached for this long
+ORDER_SUMMARY_CACHE_SECONDS = env.int('ORDER_SUMMARY_CACHE_SECONDS', default=300)
+
+# Rows fetched per round trip by the streaming order export (endpoint and export_orders)
+ORDER_EXPORT_CHUNK_SIZE = env.int('ORDER_EXPORT_CHUNK_SIZE', default=2000)
+
+# update_sales_rollups re-reads orders changed this long before its watermark, to catch
+# transactions that were still open when the previous run ended
+SALES_ROLLUP_OVERLAP_SECONDS = env.int('SALES_ROLLUP_OVERLAP_SECONDS', default=300)
+
+# Outbox worker (run_outbox_worker): post-checkout side effects are retried with exponential backoff
+OUTBOX_BATCH_SIZE = env.int('OUTBOX_BATCH_SIZE', default=100)
+OUTBOX_MAX_ATTEMPTS = env.int('OUTBOX_MAX_ATTEMPTS', default=5)
+OUTBOX_RETRY_BASE_SECONDS = env.int('OUTBOX_RETRY_BASE_SECONDS', default=30)
+# A claimed message not finished within this long (worker crashed) is picked up again; must cover a whole batch
+OUTBOX_LEASE_SECONDS = env.int('OUTBOX_LEASE_SECONDS', default=600)
 
 # Logging Configuration
 LOGGING = {
@@ -319,7 +408,12 @@ LOGGING = {
         },
         'users.api.views': {
             'handlers': ['console', 'file'],
-            'level': 'DEBUG',
+            'level': 'INFO',
+            'propagate': True,
+        },
+        'orders.outbox': {
+            'handlers': ['console', 'file'],
+            'level': 'INFO',
             'propagate': True,
         },
     },
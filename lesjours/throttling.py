@@ -0,0 +1,79 @@
+"""
+Fixed-window rate limiting kept in Django's cache.
+
+Each client has one counter per throttle scope and window, keyed by user
+id or, for anonymous requests, by IP. Anonymous clients behind one NAT or
+proxy share a counter, so the 'auth' and 'token_refresh' rates must leave
+room for an office or mobile carrier behind a single address.
+
+Checking a request is a single atomic cache.incr(), i.e. one cache round
+trip; only the first request of a window also needs an add(). With a
+shared cache (CACHE_URL=redis://...) the limit holds across all gunicorn
+workers; the per-process locmem default only limits each worker on its own.
+
+Trade-off: the counter resets at each window boundary, so a client can send
+up to 2 * num_requests within a short span around it. A token bucket or
+sliding window would prevent that burst but needs a read-modify-write
+(several round trips, or a Redis script) on every request; the rates in
+DEFAULT_THROTTLE_RATES are set with the 2x burst in mind.
+
+Rates come from the REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] entries
+('20/min') and a view picks one with throttle_scope, as with DRF's
+ScopedRateThrottle. Function views, which cannot set throttle_scope, use a
+subclass with a fixed scope in @throttle_classes.
+"""
+import time
+
+from django.core.cache import cache as default_cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from lesjours import metrics
+
+
+class FixedWindowThrottle(SimpleRateThrottle):
+    cache = default_cache
+    scope = None
+
+    def __init__(self):
+        # The rate depends on the view, so it is resolved in allow_request()
+        pass
+
+    def get_rate(self):
+        # Read on every request so rate changes in settings apply without a restart of this class
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        return f'throttle:{self.scope}:{ident}'
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, 'throttle_scope', None) or type(self).scope
+        self.rate = self.get_rate()
+        if self.rate is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+
+        now = time.time()
+        window = int(now // self.duration)
+        self.window_ends = (window + 1) * self.duration - now
+        key = f'{self.get_cache_key(request, view)}:{window}'
+        try:
+            taken = self.cache.incr(key)
+        except ValueError:
+            # First request in this window; add() keeps a concurrent first request from being lost
+            if self.cache.add(key, 1, self.duration + 1):
+                taken = 1
+            else:
+                taken = self.cache.incr(key)
+
+        if taken > self.num_requests:
+            metrics.record(f'throttle.{self.scope}', 0, error=True)
+            return False
+        return True
+
+    def wait(self):
+        return self.window_ends
@@ -21,11 +21,8 @@ from django.conf.urls.static import static
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
-from users.api.jwt import CustomTokenObtainPairSerializer
+from users.api.jwt import CustomTokenObtainPairView, RevocableTokenRefreshView
+from lesjours.views import MetricsView
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -52,8 +49,11 @@ urlpatterns = [
     path('api/', include('product_units.api.urls')),
     
     # JWT Token URLs
-    path('api/token/', TokenObtainPairView.as_view(serializer_class=CustomTokenObtainPairSerializer), name='token_obtain_pair'),
-    path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/token/refresh/', RevocableTokenRefreshView.as_view(), name='token_refresh'),
+
+    # Per-process timing counters (admin only)
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
     
     # Swagger URLs
     re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
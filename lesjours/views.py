@@ -0,0 +1,18 @@
+import os
+
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from lesjours import metrics
+
+
+class MetricsView(APIView):
+    """In-process timing counters of the worker that serves the request (admin only)."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'pid': os.getpid(),
+            'counters': metrics.snapshot(request.query_params.get('prefix', '')),
+        })
@@ -2,6 +2,17 @@ from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 from ..models import MasterClass, Event
 from django.utils.text import slugify
+from users.models import favorite_masterclass_ids
+
+
+def wishlist_ids(request):
+    """Wishlisted masterclass IDs of the requesting user, read from the cache once per request."""
+    if request is None or not request.user.is_authenticated:
+        return frozenset()
+    ids = getattr(request, '_wishlist_ids', None)
+    if ids is None:
+        ids = request._wishlist_ids = favorite_masterclass_ids(request.user.pk)
+    return ids
 
 
 class EventSerializer(serializers.ModelSerializer):
@@ -72,10 +83,7 @@ class MasterClassSerializer(serializers.ModelSerializer):
         }
 
     def get_in_wishlist(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj in request.user.profile.favorite_masterclasses.all()
-        return False
+        return obj.pk in wishlist_ids(self.context.get('request'))
 
     def get_parameters(self, obj):
         return obj.parameters
@@ -142,10 +150,7 @@ class ProductUnitSerializer(serializers.ModelSerializer):
         ]
 
     def get_in_wishlist(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj in request.user.profile.favorite_masterclasses.all()
-        return False
+        return obj.pk in wishlist_ids(self.context.get('request'))
 
     def get_availability(self, obj):
         # Get the event from context
@@ -13,6 +13,7 @@ from django.db import models
 import logging
 from django.utils import timezone
 from rest_framework.views import APIView
+from users.api.authentication import StatelessReadAuthentication
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +31,7 @@ class MasterClassViewSet(viewsets.ModelViewSet):
         'name'  # Keep existing name sorting
     ]
     permission_classes = [permissions.AllowAny]
+    authentication_classes = [StatelessReadAuthentication]
     lookup_field = 'slug'
 
     def get_serializer_context(self):
@@ -219,7 +221,8 @@ class MasterClassViewSet(viewsets.ModelViewSet):
         masterclass = self.get_object()
         profile = request.user.profile
 
-        if masterclass in profile.favorite_masterclasses.all():
+        # Decided from the database: the cached ID set (in_wishlist) may briefly lag a concurrent change
+        if profile.favorite_masterclasses.filter(pk=masterclass.pk).exists():
             profile.favorite_masterclasses.remove(masterclass)
             message = 'Masterclass removed from wishlist'
             in_wishlist = False
@@ -275,6 +278,7 @@ class EventViewSet(viewsets.ModelViewSet):
     filterset_fields = ['masterclass', 'start_datetime', 'end_datetime', 'available_seats']
     ordering_fields = ['start_datetime', 'end_datetime', 'available_seats']
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    authentication_classes = [StatelessReadAuthentication]
 
     def get_queryset(self):
         if getattr(self, 'swagger_fake_view', False):
@@ -363,6 +367,7 @@ class EventViewSet(viewsets.ModelViewSet):
 
 class ProductUnitListView(APIView):
     permission_classes = [permissions.AllowAny]
+    authentication_classes = [StatelessReadAuthentication]
 
     @swagger_auto_schema(
         operation_description="List all product units (masterclasses and certificates)",
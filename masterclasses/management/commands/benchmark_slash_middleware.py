@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+from django.urls import resolve
+
+from lesjours.benchmarking import format_summary, latency_summary
+from lesjours.middleware import AppendOrRemoveSlashMiddleware
+
+
+class Command(BaseCommand):
+    help = 'Measures AppendOrRemoveSlashMiddleware plus dispatch resolve with and without cached slash decisions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=5000, help='Requests per configuration')
+        parser.add_argument('--ids', type=int, default=500, help='Distinct object IDs cycled through in the paths')
+
+    def handle(self, *args, **options):
+        templates = [
+            '/api/masterclasses/events/{}',
+            '/api/order/orders/{}/info',
+            '/api/certificates/certificates/{}',
+            '/api/user/user_info/{}',
+            '/api/masterclasses/masterclasses',
+        ]
+        paths = [
+            templates[i % len(templates)].format(i % options['ids'] + 1)
+            for i in range(options['iterations'])
+        ]
+        configurations = {
+            # Size 0 evicts every decision at once: one is_valid_path per request, as before
+            'uncached': 0,
+            'cached': 1024,
+        }
+        factory = RequestFactory()
+        for name, size in configurations.items():
+            with override_settings(SLASH_DECISION_CACHE_SIZE=size):
+                latencies = self.measure(factory, paths)
+            self.stdout.write(f'{name:<9} {format_summary(latency_summary(latencies))}')
+
+    def measure(self, factory, paths):
+        middleware = AppendOrRemoveSlashMiddleware(lambda request: None)
+        requests = [factory.get(path) for path in paths]
+        latencies = []
+        for request in requests:
+            started = time.perf_counter()
+            middleware.process_request(request)
+            resolve(request.path_info)  # what the handler does before calling the view
+            latencies.append(time.perf_counter() - started)
+        return latencies
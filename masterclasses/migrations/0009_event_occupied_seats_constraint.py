@@ -0,0 +1,26 @@
+# Generated by Django 4.2.10 on 2026-10-18 22:23
+
+from django.db import migrations, models
+
+
+def raise_capacity_of_oversold_events(apps, schema_editor):
+    # Seats that were already oversold are real bookings: widen capacity so the constraint can be added
+    Event = apps.get_model('masterclasses', 'Event')
+    Event.objects.filter(occupied_seats__gt=models.F('available_seats')).update(
+        available_seats=models.F('occupied_seats')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masterclasses', '0008_alter_masterclass_bucket_link'),
+    ]
+
+    operations = [
+        migrations.RunPython(raise_capacity_of_oversold_events, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='event',
+            constraint=models.CheckConstraint(check=models.Q(('occupied_seats__lte', models.F('available_seats'))), name='event_occupied_seats_lte_available'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.10 on 2026-10-18 22:27
+
+from django.db import migrations, models
+import django.db.models.expressions
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masterclasses', '0009_event_occupied_seats_constraint'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='event',
+            name='event_occupied_seats_lte_available',
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='held_seats',
+            field=models.PositiveIntegerField(default=0, help_text='Seats temporarily held by carts (sum of active SeatHold rows)'),
+        ),
+        migrations.AddConstraint(
+            model_name='event',
+            constraint=models.CheckConstraint(check=models.Q(('available_seats__gte', django.db.models.expressions.CombinedExpression(models.F('occupied_seats'), '+', models.F('held_seats')))), name='event_claimed_seats_lte_available'),
+        ),
+    ]
@@ -1,5 +1,5 @@
 from django.core.validators import MaxValueValidator
-from django.db import models
+from django.db import models, transaction
 from django.utils.text import slugify
 from django.core.validators import MinValueValidator
 import random
@@ -50,6 +50,14 @@ class MasterClass(models.Model):
         return self.name
 
 
+class SeatsUnavailable(Exception):
+    """Raised when a conditional seat reservation could not be applied."""
+
+    def __init__(self, event_id):
+        self.event_id = event_id
+        super().__init__(f"Not enough seats available for event {event_id}")
+
+
 class Event(models.Model):
     masterclass = models.ForeignKey(
         MasterClass,
@@ -60,12 +68,22 @@ class Event(models.Model):
     end_datetime = models.DateTimeField(null=True, blank=True)
     available_seats = models.PositiveIntegerField()
     occupied_seats = models.PositiveIntegerField(default=0)
+    held_seats = models.PositiveIntegerField(
+        default=0,
+        help_text="Seats temporarily held by carts (sum of active SeatHold rows)",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['start_datetime']
         verbose_name = 'Event'
         verbose_name_plural = 'Events'
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(available_seats__gte=models.F('occupied_seats') + models.F('held_seats')),
+                name='event_claimed_seats_lte_available',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.masterclass.name} - {self.start_datetime.strftime('%Y-%m-%d %H:%M')}"
@@ -77,21 +95,65 @@ class Event(models.Model):
         super().save(*args, **kwargs)
 
     def is_full(self):
-        return self.occupied_seats >= self.available_seats
+        return self.get_remaining_seats() <= 0
 
     def get_remaining_seats(self):
-        return self.available_seats - self.occupied_seats
+        return self.available_seats - self.occupied_seats - self.held_seats
+
+    @classmethod
+    def reserve_seats(cls, seats, held=None):
+        """
+        Claims seats for several events at once, seats being {event_id: quantity}.
+
+        held is {event_id: quantity} of seat holds the caller owns and is
+        converting: those seats move from held_seats to occupied_seats and do
+        not count against availability.
+
+        Each event is a single conditional UPDATE, so the capacity check and the
+        increment happen atomically in the database. Events are updated in id
+        order to keep the row-lock order identical across concurrent checkouts.
+        Raises SeatsUnavailable and rolls back every claim if any event is short.
+        """
+        held = held or {}
+        with transaction.atomic():
+            for event_id in sorted(set(seats) | set(held)):
+                quantity = seats.get(event_id, 0)
+                own = held.get(event_id, 0)
+                events = cls.objects.filter(pk=event_id)
+                if quantity:
+                    events = events.filter(
+                        occupied_seats__lte=models.F('available_seats') - models.F('held_seats') + own - quantity,
+                    )
+                updated = events.update(
+                    occupied_seats=models.F('occupied_seats') + quantity,
+                    held_seats=models.F('held_seats') - own,
+                )
+                if not updated:
+                    raise SeatsUnavailable(event_id)
+
+    @classmethod
+    def hold_seats(cls, event_id, quantity):
+        """Conditionally adds quantity to held_seats; returns False if the event is short."""
+        return bool(cls.objects.filter(
+            pk=event_id,
+            occupied_seats__lte=models.F('available_seats') - models.F('held_seats') - quantity,
+        ).update(held_seats=models.F('held_seats') + quantity))
+
+    @classmethod
+    def unhold_seats(cls, event_id, quantity):
+        cls.objects.filter(pk=event_id).update(held_seats=models.F('held_seats') - quantity)
 
     def reserve_seat(self):
-        if not self.is_full():
-            self.occupied_seats += 1
-            self.save()
-            return True
-        return False
+        try:
+            Event.reserve_seats({self.pk: 1})
+        except SeatsUnavailable:
+            return False
+        self.refresh_from_db(fields=['occupied_seats'])
+        return True
 
     def cancel_reservation(self):
-        if self.occupied_seats > 0:
-            self.occupied_seats -= 1
-            self.save()
-            return True
-        return False
+        updated = Event.objects.filter(pk=self.pk, occupied_seats__gt=0).update(
+            occupied_seats=models.F('occupied_seats') - 1
+        )
+        self.refresh_from_db(fields=['occupied_seats'])
+        return bool(updated)
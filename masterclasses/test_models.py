@@ -98,7 +98,7 @@ class EventModelTest(TestCase):
         self.assertEqual(self.event.occupied_seats, initial_occupied + 1)
 
         # Test reserving when full
-        self.event.available_seats = 0
+        self.event.available_seats = self.event.occupied_seats
         self.event.save()
         self.assertFalse(self.event.reserve_seat())
 
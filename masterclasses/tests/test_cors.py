@@ -0,0 +1,56 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.sessions.backends.base import SessionBase
+from django.test import TestCase, Client, override_settings
+from rest_framework import status
+
+
+class CorsPreflightTest(TestCase):
+    origin = 'https://les-jours.ru'
+
+    def preflight(self, path='/api/masterclasses/masterclasses/'):
+        return Client().options(
+            path,
+            HTTP_ORIGIN=self.origin,
+            HTTP_ACCESS_CONTROL_REQUEST_METHOD='POST',
+            HTTP_ACCESS_CONTROL_REQUEST_HEADERS='authorization, content-type',
+        )
+
+    def test_preflight_is_cacheable(self):
+        """Test that a preflight carries the headers a browser needs to cache it"""
+        response = self.preflight()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Access-Control-Max-Age'], str(settings.CORS_PREFLIGHT_MAX_AGE))
+        self.assertEqual(response['Access-Control-Allow-Origin'], self.origin)
+        self.assertEqual(response['Access-Control-Allow-Credentials'], 'true')
+        self.assertEqual(response['Access-Control-Allow-Methods'], ', '.join(settings.CORS_ALLOW_METHODS))
+        self.assertEqual(response['Access-Control-Allow-Headers'], ', '.join(settings.CORS_ALLOW_HEADERS))
+        self.assertIn('origin', response['Vary'].lower())
+        self.assertNotIn('Set-Cookie', response)
+
+    @override_settings(CORS_PREFLIGHT_MAX_AGE=600)
+    def test_max_age_follows_settings(self):
+        """Test that max-age is read from CORS_PREFLIGHT_MAX_AGE"""
+        self.assertEqual(self.preflight()['Access-Control-Max-Age'], '600')
+
+    def test_preflight_skips_the_stack(self):
+        """Test that a preflight does no session, database or URL work"""
+        with mock.patch.object(SessionBase, '__getitem__') as session_read, \
+                mock.patch('lesjours.middleware.is_valid_path') as is_valid_path, \
+                self.assertNumQueries(0):
+            response = self.preflight('/api/user/user_info/1')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, b'')
+        session_read.assert_not_called()
+        is_valid_path.assert_not_called()
+
+    def test_actual_request_gets_cors_headers(self):
+        """Test that non-preflight responses still carry the exposed headers"""
+        response = Client().get('/api/masterclasses/masterclasses/', HTTP_ORIGIN=self.origin)
+
+        self.assertEqual(response['Access-Control-Allow-Origin'], self.origin)
+        self.assertEqual(response['Access-Control-Expose-Headers'], ', '.join(settings.CORS_EXPOSE_HEADERS))
+        self.assertNotIn('Access-Control-Max-Age', response)
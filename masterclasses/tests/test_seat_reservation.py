@@ -0,0 +1,113 @@
+import threading
+from unittest import skipIf
+
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from masterclasses.models import MasterClass, Event, SeatsUnavailable
+
+
+def make_event(available_seats, occupied_seats=0):
+    masterclass = MasterClass.objects.create(
+        name='Reservation Masterclass',
+        short_description='Reservation Description',
+        start_price=100.00,
+        final_price=90.00,
+    )
+    return Event.objects.create(
+        masterclass=masterclass,
+        start_datetime=timezone.now(),
+        available_seats=available_seats,
+        occupied_seats=occupied_seats
+    )
+
+
+class SeatReservationTest(TestCase):
+    def test_reserve_seats_claims_all_events(self):
+        first = make_event(available_seats=5)
+        second = make_event(available_seats=3)
+        Event.reserve_seats({first.id: 2, second.id: 3})
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.occupied_seats, 2)
+        self.assertEqual(second.occupied_seats, 3)
+
+    def test_reserve_seats_is_all_or_nothing(self):
+        first = make_event(available_seats=5)
+        second = make_event(available_seats=3, occupied_seats=2)
+        with self.assertRaises(SeatsUnavailable) as ctx:
+            Event.reserve_seats({first.id: 2, second.id: 2})
+        self.assertEqual(ctx.exception.event_id, second.id)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.occupied_seats, 0)
+        self.assertEqual(second.occupied_seats, 2)
+
+    def test_stale_instances_cannot_oversell(self):
+        """Two requests that both read "1 seat left" must not both get it"""
+        event = make_event(available_seats=1)
+        first_reader = Event.objects.get(pk=event.pk)
+        second_reader = Event.objects.get(pk=event.pk)
+        self.assertEqual(first_reader.get_remaining_seats(), 1)
+        self.assertEqual(second_reader.get_remaining_seats(), 1)
+
+        self.assertTrue(first_reader.reserve_seat())
+        self.assertFalse(second_reader.reserve_seat())
+        event.refresh_from_db()
+        self.assertEqual(event.occupied_seats, 1)
+
+    def test_cancel_reservation_never_goes_negative(self):
+        event = make_event(available_seats=2, occupied_seats=1)
+        stale = Event.objects.get(pk=event.pk)
+        self.assertTrue(event.cancel_reservation())
+        self.assertFalse(stale.cancel_reservation())
+        event.refresh_from_db()
+        self.assertEqual(event.occupied_seats, 0)
+
+    def test_check_constraint_rejects_oversell(self):
+        event = make_event(available_seats=2)
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                Event.objects.filter(pk=event.pk).update(occupied_seats=3)
+
+
+@skipIf(connection.vendor == 'sqlite', 'SQLite serialises writers per database; run against PostgreSQL')
+class ConcurrentSeatReservationTest(TransactionTestCase):
+    THREADS = 20
+    SEATS = 7
+
+    def test_concurrent_reservations_do_not_oversell(self):
+        first = make_event(available_seats=self.SEATS)
+        second = make_event(available_seats=self.SEATS)
+        barrier = threading.Barrier(self.THREADS)
+        results = []
+        lock = threading.Lock()
+
+        def checkout(index):
+            # Alternate the key order to provoke lock-order deadlocks if reserve_seats did not sort
+            seats = {first.id: 1, second.id: 1} if index % 2 else {second.id: 1, first.id: 1}
+            try:
+                barrier.wait()
+                try:
+                    Event.reserve_seats(seats)
+                    outcome = True
+                except SeatsUnavailable:
+                    outcome = False
+                with lock:
+                    results.append(outcome)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=checkout, args=(i,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(len(results), self.THREADS)
+        self.assertEqual(results.count(True), self.SEATS)
+        self.assertEqual(first.occupied_seats, self.SEATS)
+        self.assertEqual(second.occupied_seats, self.SEATS)
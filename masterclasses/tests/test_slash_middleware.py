@@ -0,0 +1,54 @@
+from unittest import mock
+
+from django.test import TestCase, RequestFactory, override_settings
+from rest_framework import status
+
+from lesjours import middleware
+from lesjours.middleware import AppendOrRemoveSlashMiddleware
+
+
+class AppendOrRemoveSlashMiddlewareTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = AppendOrRemoveSlashMiddleware(lambda request: None)
+
+    def process(self, path):
+        request = self.factory.get(path)
+        self.middleware.process_request(request)
+        return request
+
+    def test_unslashed_route_is_served(self):
+        """Test that a route without its trailing slash is still dispatched"""
+        response = self.client.get('/api/masterclasses/masterclasses')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_decision_is_shared_by_path_shape(self):
+        """Test that paths differing only in IDs reuse one cached decision"""
+        with mock.patch.object(middleware, 'is_valid_path', wraps=middleware.is_valid_path) as is_valid_path:
+            first = self.process('/api/masterclasses/events/12')
+            second = self.process('/api/masterclasses/events/345')
+            unknown = self.process('/api/no-such-route/7')
+            self.process('/api/no-such-route/8')
+
+        self.assertEqual(first.path_info, '/api/masterclasses/events/12/')
+        self.assertEqual(second.path_info, '/api/masterclasses/events/345/')
+        self.assertEqual(unknown.path_info, '/api/no-such-route/7')
+        self.assertEqual(is_valid_path.call_count, 2)
+
+    def test_slashed_path_is_not_resolved(self):
+        """Test that a path ending in a slash is passed on without a resolve"""
+        with mock.patch.object(middleware, 'is_valid_path') as is_valid_path:
+            request = self.process('/api/masterclasses/events/12/')
+        self.assertEqual(request.path_info, '/api/masterclasses/events/12/')
+        is_valid_path.assert_not_called()
+
+    @override_settings(SLASH_DECISION_CACHE_SIZE=2)
+    def test_cache_is_bounded(self):
+        """Test that the least recently used shape is evicted first"""
+        self.process('/api/masterclasses/events/1')
+        self.process('/api/order/orders/1/info')
+        self.process('/api/masterclasses/events/2')
+        self.process('/api/user/user_info/1')
+
+        shapes = [path for _, path in self.middleware.decisions]
+        self.assertEqual(shapes, ['/api/masterclasses/events/0', '/api/user/user_info/0'])
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Order
+from .models import Order, OutboxMessage
 
 
 @admin.register(Order)
@@ -13,3 +13,10 @@ class OrderAdmin(admin.ModelAdmin):
         if obj and obj.status in ['paid', 'canceled']:
             return self.readonly_fields + ('status', 'items', 'total_price')
         return self.readonly_fields
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('id', 'topic', 'status', 'attempts', 'available_at', 'processed_at')
+    list_filter = ('status', 'topic')
+    readonly_fields = ('created_at', 'processed_at', 'last_error')
@@ -1,24 +1,33 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from django.shortcuts import get_object_or_404
+from django.http import Http404
 from django.contrib.auth import get_user_model
 from ..utils import Cart
-from masterclasses.models import Event
+from masterclasses.models import Event, SeatsUnavailable
 from certificates.models import Certificate
 from decimal import Decimal
 import json
 from django.db import transaction
-from orders.models import Order, OrderItem
+from orders.models import Order, OrderItem, SeatHold
+from orders.idempotency import idempotent
+from orders import outbox
 from orders.utils import Cart
 from orders.api.serializers import OrderSerializer
+from lesjours.throttling import FixedWindowThrottle
 import uuid
 import logging
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
+
+class PromoThrottle(FixedWindowThrottle):
+    scope = 'promo'
+
+
 class CartView(APIView):
     permission_classes = [permissions.AllowAny]
 
@@ -31,6 +40,7 @@ class CartView(APIView):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    @idempotent
     def post(self, request, user_id, product_unit_id=None, guests_amount=None):
         """Add item to cart"""
         try:
@@ -54,17 +64,16 @@ class CartView(APIView):
                     # Handle event
                     try:
                         event = Event.objects.get(id=product_unit_id)
-                        # Check total seats including those already in cart
-                        cart_quantity = 0
-                        for item in cart.get_items():
-                            if item.get('type') == 'event' and str(item.get('id')) == str(product_unit_id):
-                                cart_quantity += item.get('guestsAmount', 0)
-                        if event.get_remaining_seats() < cart_quantity + guests_amount:
-                            return Response({'error': 'Not enough seats available'}, status=status.HTTP_400_BAD_REQUEST)
-                        cart.add('event', product_unit_id, guests_amount)
+                        # Hold the seats for this cart; the hold is the availability check.
+                        # One transaction: a failed cart write rolls the hold back
+                        with transaction.atomic():
+                            cart.hold(event.id, guests_amount)
+                            cart.add('event', product_unit_id, guests_amount)
                         return Response(cart.get_cart_data())
                     except Event.DoesNotExist:
                         return Response({'error': 'Event not found'}, status=status.HTTP_404_NOT_FOUND)
+                    except SeatsUnavailable:
+                        return Response({'error': 'Not enough seats available'}, status=status.HTTP_400_BAD_REQUEST)
             
             # Handle request body data only if it's not empty
             if not request.data:
@@ -84,16 +93,13 @@ class CartView(APIView):
             if item_type == 'event':
                 try:
                     event = Event.objects.get(id=item_id)
-                    # Check total seats including those already in cart
-                    cart_quantity = 0
-                    for item in cart.get_items():
-                        if item.get('type') == 'event' and str(item.get('id')) == str(item_id):
-                            cart_quantity += item.get('guestsAmount', 0)
-                    if event.get_remaining_seats() < cart_quantity + quantity:
-                        return Response({'error': 'Not enough seats available'}, status=status.HTTP_400_BAD_REQUEST)
+                    with transaction.atomic():
+                        cart.hold(event.id, quantity)
+                        cart.add('event', item_id, quantity)
                 except Event.DoesNotExist:
                     return Response({'error': 'Event not found'}, status=status.HTTP_404_NOT_FOUND)
-                cart.add('event', item_id, quantity)
+                except SeatsUnavailable:
+                    return Response({'error': 'Not enough seats available'}, status=status.HTTP_400_BAD_REQUEST)
             elif item_type == 'certificate':
                 amount = data.get('amount', item_id)
                 if request.user.is_authenticated:
@@ -105,6 +111,7 @@ class CartView(APIView):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    @idempotent
     def put(self, request, user_id):
         """Update item quantity or promo code in cart"""
         try:
@@ -121,22 +128,21 @@ class CartView(APIView):
                 return Response({'error': 'Type and id are required'}, status=status.HTTP_400_BAD_REQUEST)
             if item_type not in ['event', 'certificate']:
                 return Response({'error': 'Invalid item type'}, status=status.HTTP_400_BAD_REQUEST)
-            if item_type == 'event':
-                try:
-                    event = Event.objects.get(id=item_id)
-                    cart_quantity = 0
-                    for item in cart.get_items():
-                        if item.get('type') == 'event' and str(item.get('id')) == str(item_id):
-                            cart_quantity += item.get('guestsAmount', 0)
-                    if event.get_remaining_seats() - cart_quantity < quantity:
+            with transaction.atomic():
+                if item_type == 'event':
+                    try:
+                        event = Event.objects.get(id=item_id)
+                        cart.hold(event.id, max(quantity, 0))
+                    except Event.DoesNotExist:
+                        return Response({'error': 'Event not found'}, status=status.HTTP_404_NOT_FOUND)
+                    except SeatsUnavailable:
                         return Response({'error': 'Not enough seats available'}, status=status.HTTP_400_BAD_REQUEST)
-                except Event.DoesNotExist:
-                    return Response({'error': 'Event not found'}, status=status.HTTP_404_NOT_FOUND)
-            cart.update(item_type, item_id, quantity)
+                cart.update(item_type, item_id, quantity)
             return Response(cart.get_cart_data())
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    @idempotent
     def delete(self, request, user_id, product_unit_id=None):
         """Remove item from cart"""
         try:
@@ -173,10 +179,11 @@ class CartView(APIView):
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@idempotent
 def update_cart_from_cookies(request, user_id):
     """Update cart from cookies"""
     try:
-        data = json.loads(request.body)
+        data = request.data
         product_unit_list = data.get('product_unit_list', [])
         cart = Cart(request)
         
@@ -206,6 +213,7 @@ def update_cart_from_cookies(request, user_id):
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@throttle_classes([PromoThrottle])
 def promo_auth(request, user_id):
     """Check promo code for authenticated user"""
     try:
@@ -226,6 +234,7 @@ def promo_auth(request, user_id):
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes([PromoThrottle])
 def promo_unauth(request):
     """Check promo code for unauthenticated user"""
     try:
@@ -270,7 +279,9 @@ class CheckoutOrderView(APIView):
     Accepts user information and cart data, creates an order and returns order details.
     """
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'checkout'
 
+    @idempotent
     def post(self, request, user_id):
         try:
             # Validate user_id matches authenticated user
@@ -284,7 +295,7 @@ class CheckoutOrderView(APIView):
             cart = Cart(request)
             cart_items = []
             if hasattr(cart, 'is_authenticated') and cart.is_authenticated:
-                cart_items = list(cart.cart_obj.items.all())
+                cart_items = list(cart.cart_obj.items.select_related('event__masterclass', 'certificate'))
             else:
                 cart_items = cart.get_items()
             if not cart_items:
@@ -293,88 +304,108 @@ class CheckoutOrderView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Validate cart items availability
+            # Seats per event for a single conditional reservation of the whole cart
+            seats = {}
             for item in cart_items:
                 if hasattr(item, 'event') and item.event:
-                    event = item.event
-                    if event.get_remaining_seats() < item.quantity:
-                        return Response(
-                            {'error': f"Not enough seats available for {event.masterclass.name}"},
-                            status=status.HTTP_400_BAD_REQUEST
-                        )
+                    seats[item.event_id] = seats.get(item.event_id, 0) + item.quantity
                 elif isinstance(item, dict) and item.get('type') == 'event':
-                    event = get_object_or_404(Event, id=item['id'])
-                    if event.get_remaining_seats() < item['quantity']:
-                        return Response(
-                            {'error': f"Not enough seats available for {event.masterclass.name}"},
-                            status=status.HTTP_400_BAD_REQUEST
-                        )
+                    event_id = int(item['id'])
+                    seats[event_id] = seats.get(event_id, 0) + item['quantity']
 
             # Create order in transaction
             with transaction.atomic():
-                # Create order with contact information
-                order = Order.objects.create(
-                    user=request.user,
-                    total_price=cart.get_final_amount(),
-                    email=request.data.get('email'),
-                    phone=request.data.get('phone'),
-                    surname=request.data.get('surname'),
-                    name=request.data.get('name'),
-                    patronymic=request.data.get('patronymic'),
-                    comment=request.data.get('comment'),
-                    telegram=request.data.get('telegram')
-                )
+                # Seats held by this cart turn into occupied seats; the rest are claimed live
+                SeatHold.objects.convert_to_reservation(seats, **cart.hold_owner())
 
-                # Create order items
+                # Price the order items first: the order total is computed once from them
+                events = Event.objects.select_related('masterclass').in_bulk(
+                    [int(item['id']) for item in cart_items if isinstance(item, dict) and item.get('type') == 'event']
+                )
+                order_items = []
                 for item in cart_items:
                     if hasattr(item, 'event') and item.event:
                         event = item.event
-                        event.occupied_seats += item.quantity
-                        event.save()
-                        OrderItem.objects.create(
-                            order=order,
+                        order_items.append(OrderItem(
                             masterclass=event.masterclass,
                             quantity=item.quantity,
                             price=event.masterclass.final_price,
                             event=event
-                        )
+                        ))
                     elif hasattr(item, 'certificate') and item.certificate:
                         amount = item.certificate.amount
-                        OrderItem.objects.create(
-                            order=order,
+                        order_items.append(OrderItem(
                             masterclass=None,
                             quantity=item.quantity,
                             price=amount,
                             is_certificate=True
-                        )
+                        ))
                     elif isinstance(item, dict) and item.get('type') == 'event':
-                        event = get_object_or_404(Event, id=item['id'])
-                        event.occupied_seats += item['quantity']
-                        event.save()
-                        OrderItem.objects.create(
-                            order=order,
+                        event = events.get(int(item['id']))
+                        if event is None:
+                            raise Http404('Event not found')
+                        order_items.append(OrderItem(
                             masterclass=event.masterclass,
                             quantity=item['quantity'],
                             price=event.masterclass.final_price,
                             event=event
-                        )
+                        ))
                     elif isinstance(item, dict) and item.get('type') == 'certificate':
                         amount = Decimal(item['amount'])
-                        OrderItem.objects.create(
-                            order=order,
+                        order_items.append(OrderItem(
                             masterclass=None,
                             quantity=item['quantity'],
                             price=amount,
                             is_certificate=True
-                        )
+                        ))
+
+                # Create order with contact information
+                order = Order.objects.create(
+                    user=request.user,
+                    total_price=sum((oi.price * oi.quantity for oi in order_items), Decimal('0')),
+                    email=request.data.get('email'),
+                    phone=request.data.get('phone'),
+                    surname=request.data.get('surname'),
+                    name=request.data.get('name'),
+                    patronymic=request.data.get('patronymic'),
+                    comment=request.data.get('comment'),
+                    telegram=request.data.get('telegram')
+                )
+
+                for order_item in order_items:
+                    order_item.order = order
+                OrderItem.objects.bulk_create(order_items)
+
+                # Side effects run in run_outbox_worker, after this transaction commits
+                messages = [
+                    ('order.confirmation_email', {'order_id': order.id}),
+                    ('order.analytics', {
+                        'order_id': order.id,
+                        'user_id': request.user.id,
+                        'total_price': order.total_price,
+                        'items': len(order_items),
+                        'seats': sum(seats.values()),
+                    }),
+                ]
+                certificate_ids = [item.certificate_id for item in cart_items if getattr(item, 'certificate_id', None)]
+                if certificate_ids:
+                    messages.append(('order.certificate_codes', {'order_id': order.id, 'certificate_ids': certificate_ids}))
+                outbox.enqueue_many(messages)
 
                 # Clear cart after successful order creation
                 cart.clear()
 
                 # Return order details
-                response_data = OrderSerializer(order).data
+                response_data = OrderSerializer(Order.objects.with_items().get(pk=order.pk)).data
                 return Response(response_data, status=status.HTTP_201_CREATED)
 
+        except SeatsUnavailable as e:
+            event = Event.objects.select_related('masterclass').filter(id=e.event_id).first()
+            name = event.masterclass.name if event else e.event_id
+            return Response(
+                {'error': f"Not enough seats available for {name}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             return Response(
                 {'error': str(e)},
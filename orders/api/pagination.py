@@ -0,0 +1,13 @@
+from rest_framework.pagination import CursorPagination
+
+
+class OrderCursorPagination(CursorPagination):
+    """
+    Newest orders first. The cursor is based on (created_at, id), which is
+    covered by the orders_order_user_created_idx index for a single user.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 12
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from ..models import Order, OrderItem
+from ..models import Order, OrderItem, DailySalesRollup
 from masterclasses.models import MasterClass
 from certificates.models import Certificate
 from django.utils import timezone
@@ -72,7 +72,8 @@ class OrderItemSerializer(serializers.ModelSerializer):
         return float(obj.price * obj.quantity)
 
     def get_date(self, obj):
-        event = obj.masterclass.events.first()
+        # Дата берётся из забронированного события, а не из первого события мастер-класса
+        event = obj.event
         if event:
             return {
                 'start_datetime': event.start_datetime.isoformat(),
@@ -175,14 +176,13 @@ class OrderSerializer(serializers.ModelSerializer):
 
     def get_order_units(self, obj):
         items = []
-        logger.info(f"OrderSerializer.get_order_units: order_id={obj.id}, items_count={obj.items.count()}")
         for item in obj.items.all():
-            logger.info(f"OrderSerializer.get_order_units: item_id={item.id}, is_certificate={item.is_certificate}, masterclass={item.masterclass}, event={getattr(item, 'event', None)}")
+            logger.debug(f"OrderSerializer.get_order_units: item_id={item.id}, is_certificate={item.is_certificate}, masterclass_id={item.masterclass_id}, event_id={item.event_id}")
             if item.masterclass is None:
                 items.append(CertificateOrderItemSerializer(item).data)
             else:
                 items.append(OrderItemSerializer(item).data)
-        logger.info(f"OrderSerializer.get_order_units: result_count={len(items)}")
+        logger.debug(f"OrderSerializer.get_order_units: order_id={obj.id}, result_count={len(items)}")
         return items
 
     def get_formatted_date(self, obj):
@@ -285,4 +285,15 @@ class OrderSerializer(serializers.ModelSerializer):
             for attr, value in validated_data.items():
                 setattr(instance, attr, value)
             instance.save()
-        return instance 
\ No newline at end of file
+        return instance
+
+
+class DailySalesRollupSerializer(serializers.ModelSerializer):
+    masterclass_name = serializers.CharField(source='masterclass.name', read_only=True, default=None)
+
+    class Meta:
+        model = DailySalesRollup
+        fields = [
+            'day', 'masterclass', 'masterclass_name', 'orders_count', 'revenue', 'seats_sold',
+            'certificates_sold', 'seats_available', 'seats_occupied', 'occupancy_ratio'
+        ]
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import OrderViewSet, OrderItemViewSet, UserPasswordViewSet
+from .views import OrderViewSet, OrderItemViewSet, UserPasswordViewSet, OrderExportView, DailySalesReportView
 from .cart_views import (
     CartView,
     update_cart_from_cookies,
@@ -33,6 +33,10 @@ urlpatterns = [
 
     path('checkout/<int:user_id>/', CheckoutOrderView.as_view(), name='checkout-order'),
 
+    # Operations: streaming export and reporting (admin only)
+    path('export/', OrderExportView.as_view(), name='orders-export'),
+    path('reports/daily-sales/', DailySalesReportView.as_view(), name='daily-sales-report'),
+
     # User orders and order info by id
     path('user_orders/<int:user_id>', __import__('orders.api.views').api.views.UserOrdersByIdView.as_view(), name='user-orders-by-id'),
     path('info/<int:order_id>', __import__('orders.api.views').api.views.OrderInfoByIdView.as_view(), name='order-info-by-id'),
@@ -3,8 +3,10 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from .serializers import OrderSerializer, OrderItemSerializer
-from ..models import Order, OrderItem
+from .serializers import OrderSerializer, OrderItemSerializer, DailySalesRollupSerializer
+from ..models import Order, OrderItem, DailySalesRollup, get_order_summary
+from .pagination import OrderCursorPagination
+from ..export import EXPORT_FORMATS, export_rows, filter_orders, iter_export
 from ..utils import Cart
 from rest_framework.views import APIView
 from django.conf import settings
@@ -15,6 +17,10 @@ from django.core.exceptions import ValidationError
 from rest_framework.authentication import TokenAuthentication
 from django.db import transaction
 from django.shortcuts import get_object_or_404
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.db.models import Sum
 from certificates.models import Certificate
 
 User = get_user_model()
@@ -26,7 +32,7 @@ class OrderViewSet(viewsets.ModelViewSet):
     authentication_classes = [TokenAuthentication]
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        return Order.objects.filter(user=self.request.user).with_items()
 
     @swagger_auto_schema(
         operation_description="List all orders for the current user",
@@ -123,15 +129,13 @@ class OrderViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def items(self, request, pk=None):
         order = self.get_object()
-        items = order.items.all()
+        items = order.items.all()  # prefetched by get_queryset
         serializer = OrderItemSerializer(items, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def user_orders(self, request):
-        orders = self.get_queryset()
-        serializer = self.get_serializer(orders, many=True)
-        return Response(serializer.data)
+        return paginated_orders_response(request, self.get_queryset(), self)
 
     @action(detail=True, methods=['get'])
     def info(self, request, pk=None):
@@ -146,7 +150,7 @@ class OrderItemViewSet(viewsets.ModelViewSet):
     authentication_classes = [TokenAuthentication]
 
     def get_queryset(self):
-        return OrderItem.objects.filter(order__user=self.request.user)
+        return OrderItem.objects.filter(order__user=self.request.user).select_related('event', 'masterclass')
 
     @swagger_auto_schema(
         operation_description="List all order items",
@@ -177,9 +181,22 @@ class OrderItemViewSet(viewsets.ModelViewSet):
             raise ValidationError("Order does not exist or does not belong to the user")
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        self.perform_create(serializer)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    def perform_create(self, serializer):
+        item = serializer.save()
+        item.order.calculate_total()
+
+    def perform_update(self, serializer):
+        item = serializer.save()
+        item.order.calculate_total()
+
+    def perform_destroy(self, instance):
+        order = instance.order
+        instance.delete()
+        order.calculate_total()
+
     @swagger_auto_schema(
         operation_description="Get a specific order item",
         responses={
@@ -373,16 +390,22 @@ class UserPasswordViewSet(viewsets.ViewSet):
         return Response({'message': 'Password successfully changed'})
 
 
+def paginated_orders_response(request, orders, view):
+    """A cursor page of the user's orders plus their cached summary aggregates."""
+    paginator = OrderCursorPagination()
+    page = paginator.paginate_queryset(orders, request, view=view)
+    response = paginator.get_paginated_response(OrderSerializer(page, many=True).data)
+    response.data['summary'] = get_order_summary(request.user.id)
+    return response
+
+
 class UserOrdersByIdView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request, user_id):
-        from .serializers import OrderSerializer
-        from ..models import Order
         if request.user.id != int(user_id):
             return Response({'detail': 'Forbidden'}, status=403)
-        orders = Order.objects.filter(user_id=user_id)
-        serializer = OrderSerializer(orders, many=True)
-        return Response(serializer.data)
+        orders = Order.objects.filter(user_id=user_id).with_items()
+        return paginated_orders_response(request, orders, self)
 
 
 class OrderInfoByIdView(APIView):
@@ -390,8 +413,105 @@ class OrderInfoByIdView(APIView):
     def get(self, request, order_id):
         from .serializers import OrderSerializer
         from ..models import Order
-        order = get_object_or_404(Order, id=order_id)
-        if order.user != request.user:
+        order = get_object_or_404(Order.objects.with_items(), id=order_id)
+        if order.user_id != request.user.id:
             return Response({'detail': 'Forbidden'}, status=403)
         serializer = OrderSerializer(order)
-        return Response(serializer.data) 
\ No newline at end of file
+        return Response(serializer.data)
+
+
+class OrderExportView(APIView):
+    """
+    Streams orders with their items as CSV or NDJSON for operations.
+    Query params: output=csv|ndjson, date_from, date_to (YYYY-MM-DD), status.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Export orders as CSV or NDJSON (admin only)",
+        manual_parameters=[
+            openapi.Parameter('output', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=list(EXPORT_FORMATS)),
+            openapi.Parameter('date_from', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+            openapi.Parameter('date_to', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+            openapi.Parameter('status', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+        ]
+    )
+    def get(self, request):
+        output = request.query_params.get('output', 'csv')
+        try:
+            orders = filter_orders(
+                date_from=request.query_params.get('date_from'),
+                date_to=request.query_params.get('date_to'),
+                status=request.query_params.get('status'),
+            )
+            content = iter_export(export_rows(orders), output)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        content_type = 'text/csv; charset=utf-8' if output == 'csv' else 'application/x-ndjson; charset=utf-8'
+        response = StreamingHttpResponse(content, content_type=content_type)
+        filename = f"orders-{timezone.now():%Y%m%d-%H%M%S}.{output}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class DailySalesReportView(APIView):
+    """
+    Dashboard data from the DailySalesRollup table (see update_sales_rollups).
+    Query params: date_from, date_to (YYYY-MM-DD, default the last 30 days), masterclass.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Daily sales and occupancy per masterclass (admin only)",
+        manual_parameters=[
+            openapi.Parameter('date_from', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+            openapi.Parameter('date_to', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+            openapi.Parameter('masterclass', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        ]
+    )
+    def get(self, request):
+        today = timezone.localdate()
+        try:
+            date_from = self.parse_date_param(request, 'date_from') or today - timezone.timedelta(days=30)
+            date_to = self.parse_date_param(request, 'date_to') or today
+            masterclass = request.query_params.get('masterclass')
+            if masterclass:
+                try:
+                    masterclass = int(masterclass)
+                except ValueError:
+                    raise ValueError(f"Invalid masterclass '{masterclass}', expected an ID")
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        rollups = DailySalesRollup.objects.filter(day__range=(date_from, date_to)).select_related('masterclass')
+        if masterclass:
+            rollups = rollups.filter(masterclass_id=masterclass)
+
+        totals = rollups.aggregate(
+            orders_count=Sum('orders_count'),
+            revenue=Sum('revenue'),
+            seats_sold=Sum('seats_sold'),
+            certificates_sold=Sum('certificates_sold'),
+            seats_available=Sum('seats_available'),
+            seats_occupied=Sum('seats_occupied'),
+        )
+        totals = {key: value or 0 for key, value in totals.items()}
+        totals['occupancy_ratio'] = (
+            totals['seats_occupied'] / totals['seats_available'] if totals['seats_available'] else None
+        )
+        return Response({
+            'date_from': date_from,
+            'date_to': date_to,
+            'rows': DailySalesRollupSerializer(rollups, many=True).data,
+            'totals': totals,
+        })
+
+    @staticmethod
+    def parse_date_param(request, name):
+        value = request.query_params.get(name)
+        if not value:
+            return None
+        parsed = parse_date(value)
+        if parsed is None:
+            raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD")
+        return parsed
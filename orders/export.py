@@ -0,0 +1,94 @@
+"""
+Streaming export of orders for operations (CSV or NDJSON).
+
+Rows are read with values() and iterator(chunk_size=...), so neither the
+endpoint nor the export_orders command holds more than one chunk in
+memory, however many orders match. There is one row per order item; an
+order without items gives a single row with empty item columns.
+"""
+import csv
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_date
+
+from orders.models import Order
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+# (column, lookup on Order)
+EXPORT_COLUMNS = [
+    ('order_id', 'id'),
+    ('created_at', 'created_at'),
+    ('status', 'status'),
+    ('user_email', 'user__email'),
+    ('email', 'email'),
+    ('phone', 'phone'),
+    ('surname', 'surname'),
+    ('name', 'name'),
+    ('order_total', 'total_price'),
+    ('item_id', 'items__id'),
+    ('masterclass', 'items__masterclass__name'),
+    ('event_start', 'items__event__start_datetime'),
+    ('is_certificate', 'items__is_certificate'),
+    ('quantity', 'items__quantity'),
+    ('price', 'items__price'),
+]
+
+
+def filter_orders(date_from=None, date_to=None, status=None):
+    """
+    Orders created between date_from and date_to (YYYY-MM-DD, inclusive)
+    with the given status. Raises ValueError on a malformed date.
+    """
+    orders = Order.objects.all()
+    for lookup, value in (('created_at__date__gte', date_from), ('created_at__date__lte', date_to)):
+        if value:
+            parsed = parse_date(value)
+            if parsed is None:
+                raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD")
+            orders = orders.filter(**{lookup: parsed})
+    if status:
+        orders = orders.filter(status=status)
+    return orders
+
+
+def export_rows(orders, chunk_size=None):
+    """Yields one dict per order item, fetching chunk_size rows at a time."""
+    rows = (
+        orders
+        .order_by('id', 'items__id')
+        .values_list(*[lookup for _, lookup in EXPORT_COLUMNS])
+        .iterator(chunk_size=chunk_size or settings.ORDER_EXPORT_CHUNK_SIZE)
+    )
+    columns = [column for column, _ in EXPORT_COLUMNS]
+    for row in rows:
+        yield dict(zip(columns, row))
+
+
+class _Echo:
+    """File-like object whose write() returns the line instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([column for column, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow(['' if value is None else value for value in row.values()])
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def iter_export(rows, output):
+    if output == 'csv':
+        return iter_csv(rows)
+    if output == 'ndjson':
+        return iter_ndjson(rows)
+    raise ValueError(f"Unknown export format '{output}', expected one of {', '.join(EXPORT_FORMATS)}")
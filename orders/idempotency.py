@@ -0,0 +1,132 @@
+import hashlib
+import json
+from functools import wraps
+
+from django.db import IntegrityError, transaction
+from django.http import QueryDict
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from orders.models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+MAX_KEY_LENGTH = 255
+
+
+def _owner(request):
+    if request.user.is_authenticated:
+        return {'user': request.user}
+    if request.session.session_key is None:
+        request.session.save()
+    return {'session_key': request.session.session_key}
+
+
+def _fingerprint(request):
+    """
+    Hashes the method, the path and the parsed payload as canonical JSON. Not
+    request.body: once a multipart body has been read into request.POST (the
+    session CSRF check does that) the raw stream is gone.
+    """
+    data = request.data
+    if isinstance(data, QueryDict):
+        data = dict(data.lists())
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(request.get_full_path().encode())
+    digest.update(json.dumps(data, sort_keys=True, separators=(',', ':'), default=str).encode())
+    return digest.hexdigest()
+
+
+def _replay(record, fingerprint):
+    if record.fingerprint != fingerprint:
+        return Response(
+            {'error': 'Idempotency-Key has already been used for a different request'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    if record.status_code is None:
+        return Response(
+            {'error': 'A request with this Idempotency-Key is still being processed'},
+            status=status.HTTP_409_CONFLICT
+        )
+    return Response(record.response_body, status=record.status_code, headers={'Idempotent-Replayed': 'true'})
+
+
+def _take_over(record):
+    """
+    Restarts an abandoned in-progress record for this request. The UPDATE only
+    matches the record as it was read, so of several concurrent retries exactly
+    one wins; the others get None.
+    """
+    now = timezone.now()
+    taken = IdempotencyKey.objects.filter(
+        pk=record.pk, status_code__isnull=True, created_at=record.created_at
+    ).update(created_at=now)
+    if not taken:
+        return None
+    record.created_at = now
+    return record
+
+
+def idempotent(view):
+    """
+    Makes a mutating view replayable with an Idempotency-Key header.
+
+    The first request with a key runs the view and stores its response; any
+    retry with the same key (same owner) gets the stored response back from a
+    single indexed lookup, without touching carts, seats or orders. Requests
+    without the header run as before. Server errors are not stored so that
+    they can be retried. A key left in progress by a request that died (see
+    IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS) is taken over by the next retry.
+
+    Works for APIView methods and for @api_view functions (place it below
+    @api_view).
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        request = args[0] if isinstance(args[0], Request) else args[1]
+        key = request.META.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'Idempotency-Key must be at most {MAX_KEY_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        owner = _owner(request)
+        fingerprint = _fingerprint(request)
+        record = IdempotencyKey.objects.filter(key=key, **owner).first()
+        if record is not None and record.is_expired():
+            record.delete()
+            record = None
+        if record is not None and record.fingerprint == fingerprint and record.is_abandoned():
+            record = _take_over(record)
+            if record is None:
+                # Another retry took it over first
+                return _replay(IdempotencyKey.objects.get(key=key, **owner), fingerprint)
+        elif record is not None:
+            return _replay(record, fingerprint)
+        else:
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(key=key, fingerprint=fingerprint, **owner)
+            except IntegrityError:
+                # A concurrent request with the same key got there first
+                return _replay(IdempotencyKey.objects.get(key=key, **owner), fingerprint)
+
+        try:
+            response = view(*args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+        if response.status_code >= 500:
+            record.delete()
+        else:
+            record.status_code = response.status_code
+            record.response_body = response.data
+            record.save(update_fields=['status_code', 'response_body'])
+        return response
+
+    return wrapper
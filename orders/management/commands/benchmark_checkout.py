@@ -0,0 +1,167 @@
+import uuid
+from collections import Counter, defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count, Sum
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from lesjours.benchmarking import QueryCounter, format_summary, latency_summary, run_concurrently
+from masterclasses.models import MasterClass, Event
+from orders.models import Order, OrderItem, OutboxMessage
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs add-to-cart -> checkout from many threads against the same few events '
+        'and reports latency, throughput, query counts and oversell/duplicate anomalies'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16, help='Concurrent buyers')
+        parser.add_argument('--iterations', type=int, default=5, help='Checkouts attempted per buyer')
+        parser.add_argument('--events', type=int, default=2, help='Events the buyers compete for')
+        parser.add_argument('--seats', type=int, default=20, help='Capacity of each event')
+        parser.add_argument('--guests', type=int, default=1, help='Seats bought per checkout')
+        parser.add_argument(
+            '--retries',
+            type=int,
+            default=1,
+            help='Times each checkout is re-sent with the same Idempotency-Key (simulated client retries)',
+        )
+        parser.add_argument('--keep', action='store_true', help='Keep the generated users, events and orders')
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:8]
+        masterclass = MasterClass.objects.create(
+            name=f'Benchmark checkout {run_id}',
+            short_description='Generated by benchmark_checkout',
+            start_price=1000,
+            final_price=800,
+        )
+        events = [
+            Event.objects.create(
+                masterclass=masterclass,
+                start_datetime=timezone.now() + timezone.timedelta(days=30),
+                available_seats=options['seats'],
+            )
+            for _ in range(options['events'])
+        ]
+        users = [
+            User.objects.create_user(
+                username=f'bench-{run_id}-{i}@example.com',
+                email=f'bench-{run_id}-{i}@example.com',
+                password=uuid.uuid4().hex,
+            )
+            for i in range(options['threads'])
+        ]
+        tokens = [Token.objects.create(user=user).key for user in users]
+        clients = {}
+
+        def buy(thread_index, iteration):
+            client = clients.get(thread_index)
+            if client is None:
+                client = clients[thread_index] = APIClient()
+                client.credentials(HTTP_AUTHORIZATION=f'Token {tokens[thread_index]}')
+            user_id = users[thread_index].id
+            event = events[(thread_index + iteration) % len(events)]
+            key = f'{run_id}-{thread_index}-{iteration}'
+            with QueryCounter() as add_queries:
+                added = client.post(reverse('add-to-cart', kwargs={
+                    'user_id': user_id, 'product_unit_id': event.id, 'guests_amount': options['guests']
+                }))
+            if added.status_code != 200:
+                return self.classify(added, 'add_to_cart'), len(add_queries), None
+            with QueryCounter() as checkout_queries:
+                response = client.post(
+                    reverse('checkout-order', kwargs={'user_id': user_id}),
+                    {'email': users[thread_index].email},
+                    format='json',
+                    HTTP_IDEMPOTENCY_KEY=key,
+                )
+            for _ in range(options['retries']):
+                client.post(
+                    reverse('checkout-order', kwargs={'user_id': user_id}),
+                    {'email': users[thread_index].email},
+                    format='json',
+                    HTTP_IDEMPOTENCY_KEY=key,
+                )
+            return self.classify(response, 'checkout'), len(add_queries), len(checkout_queries)
+
+        try:
+            samples, wall = run_concurrently(buy, options['threads'], options['iterations'])
+            self.report(samples, wall, events, users, options)
+        finally:
+            if not options['keep']:
+                order_ids = list(Order.objects.filter(user__in=users).values_list('id', flat=True))
+                OutboxMessage.objects.filter(payload__order_id__in=order_ids).delete()
+                User.objects.filter(id__in=[user.id for user in users]).delete()
+                masterclass.delete()
+
+    def classify(self, response, step):
+        if response.status_code == 201:
+            return 'ordered'
+        error = str(response.data.get('error', ''))
+        if 'Not enough seats' in error:
+            return f'sold_out@{step}'
+        return f'error@{step}:{response.status_code}:{error[:40]}'
+
+    def report(self, samples, wall, events, users, options):
+        outcomes = Counter()
+        queries = defaultdict(list)
+        for _, result in samples:
+            if isinstance(result, Exception):
+                outcomes[f'exception:{type(result).__name__}'] += 1
+                continue
+            outcome, add_queries, checkout_queries = result
+            outcomes[outcome] += 1
+            queries['add_to_cart'].append(add_queries)
+            if checkout_queries is not None:
+                queries['checkout'].append(checkout_queries)
+
+        self.stdout.write(f'Database: {connection.vendor}')
+        if connection.vendor == 'sqlite':
+            self.stdout.write('SQLite runs one writer at a time: "database is locked" errors measure that, not checkout')
+        self.stdout.write(
+            f'Flows: {len(samples)} in {wall:.2f}s ({len(samples) / wall:.1f} flows/s, '
+            f'{outcomes["ordered"] / wall:.1f} orders/s)'
+        )
+        self.stdout.write(f'Outcomes: {dict(outcomes)}')
+        self.stdout.write(f'Flow latency: {format_summary(latency_summary([latency for latency, _ in samples]))}')
+        for step, counts in queries.items():
+            self.stdout.write(f'Queries per {step}: min={min(counts)} max={max(counts)} mean={sum(counts) / len(counts):.1f}')
+
+        anomalies = []
+        sold = dict(
+            OrderItem.objects.filter(event__in=events)
+            .values('event').annotate(seats=Sum('quantity')).values_list('event', 'seats')
+        )
+        for event in Event.objects.filter(id__in=[event.id for event in events]):
+            ordered = sold.get(event.id, 0)
+            self.stdout.write(
+                f'Event {event.id}: available={event.available_seats} occupied={event.occupied_seats} '
+                f'held={event.held_seats} in orders={ordered}'
+            )
+            if event.occupied_seats > event.available_seats or ordered > event.available_seats:
+                anomalies.append(f'event {event.id} oversold')
+            if ordered != event.occupied_seats:
+                anomalies.append(f'event {event.id}: {ordered} seats in orders but {event.occupied_seats} occupied')
+
+        orders_per_user = dict(
+            Order.objects.filter(user__in=users).values('user').annotate(n=Count('id')).values_list('user', 'n')
+        )
+        total_orders = sum(orders_per_user.values())
+        if total_orders != outcomes['ordered']:
+            anomalies.append(f'{total_orders} orders created for {outcomes["ordered"]} successful checkouts (duplicates)')
+
+        if anomalies:
+            for anomaly in anomalies:
+                self.stdout.write(self.style.ERROR(f'Anomaly: {anomaly}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('No oversell or duplicate orders'))
@@ -0,0 +1,71 @@
+import uuid
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from django.utils import timezone
+
+from lesjours.benchmarking import format_summary, latency_summary, run_concurrently
+from masterclasses.models import MasterClass, Event, SeatsUnavailable
+from orders.models import SeatHold
+
+
+class Command(BaseCommand):
+    help = 'Measures seat-hold contention: many carts holding seats of the same few events at once'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--iterations', type=int, default=10, help='Holds placed per thread')
+        parser.add_argument('--events', type=int, default=1, help='Events the threads compete for')
+        parser.add_argument('--seats', type=int, default=50, help='Capacity of each event')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated masterclass and holds')
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:8]
+        masterclass = MasterClass.objects.create(
+            name=f'Benchmark seat holds {run_id}',
+            short_description='Generated by benchmark_seat_holds',
+        )
+        event_ids = [
+            Event.objects.create(
+                masterclass=masterclass,
+                start_datetime=timezone.now() + timezone.timedelta(days=30),
+                available_seats=options['seats'],
+            ).id
+            for _ in range(options['events'])
+        ]
+
+        def place_hold(thread_index, iteration):
+            event_id = event_ids[(thread_index + iteration) % len(event_ids)]
+            session_key = f'bench{run_id}{thread_index:04d}{iteration:06d}'
+            SeatHold.objects.place(event_id, 1, session_key=session_key)
+            return 'held'
+
+        try:
+            samples, wall = run_concurrently(place_hold, options['threads'], options['iterations'])
+            outcomes = Counter(
+                'conflict' if isinstance(result, SeatsUnavailable)
+                else f'error:{type(result).__name__}' if isinstance(result, Exception)
+                else result
+                for _, result in samples
+            )
+            self.stdout.write(f'Holds attempted: {len(samples)} in {wall:.2f}s ({len(samples) / wall:.0f} ops/s)')
+            self.stdout.write(f'Outcomes: {dict(outcomes)}')
+            self.stdout.write(f'Latency: {format_summary(latency_summary([latency for latency, _ in samples]))}')
+
+            consistent = True
+            for event in Event.objects.filter(id__in=event_ids):
+                holds = SeatHold.objects.filter(event=event).aggregate(total=Sum('quantity'))['total'] or 0
+                self.stdout.write(
+                    f'Event {event.id}: available={event.available_seats} held_seats={event.held_seats} '
+                    f'sum(holds)={holds} occupied={event.occupied_seats}'
+                )
+                consistent &= holds == event.held_seats
+                consistent &= event.occupied_seats + event.held_seats <= event.available_seats
+            if consistent:
+                self.stdout.write(self.style.SUCCESS('Counters consistent, no overbooking'))
+            else:
+                self.stdout.write(self.style.ERROR('Inconsistent hold counters or overbooking detected'))
+        finally:
+            if not options['keep']:
+                masterclass.delete()
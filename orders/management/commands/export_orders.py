@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.export import EXPORT_FORMATS, export_rows, filter_orders, iter_export
+
+
+class Command(BaseCommand):
+    help = 'Streams orders with their items as CSV or NDJSON (constant memory)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--date-from', help='First creation date to include, YYYY-MM-DD')
+        parser.add_argument('--date-to', help='Last creation date to include, YYYY-MM-DD')
+        parser.add_argument('--status', help='Only orders with this status')
+        parser.add_argument('--file', help='Write to this file instead of stdout')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.ORDER_EXPORT_CHUNK_SIZE,
+            help='Rows fetched from the database per round trip',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            orders = filter_orders(options['date_from'], options['date_to'], options['status'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        started = time.monotonic()
+        lines = 0
+        out = open(options['file'], 'w', encoding='utf-8', newline='') if options['file'] else self.stdout
+        try:
+            for chunk in iter_export(export_rows(orders, options['chunk_size']), options['output']):
+                if options['file']:
+                    out.write(chunk)
+                else:
+                    out.write(chunk, ending='')
+                lines += 1
+        finally:
+            if options['file']:
+                out.close()
+        elapsed = time.monotonic() - started
+        rows = lines - 1 if options['output'] == 'csv' else lines  # minus the CSV header
+        self.stderr.write(f'Exported {rows} rows in {elapsed:.2f}s')
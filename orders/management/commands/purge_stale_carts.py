@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.contrib.sessions.models import Session
+
+from lesjours.purging import PurgeCommand
+from orders.models import Cart, IdempotencyKey, get_cart_expiry_cutoff
+
+
+class Command(PurgeCommand):
+    help = 'Deletes expired carts, session rows and idempotency keys in small batches'
+
+    def get_targets(self, now):
+        self.stdout.write(f'Cart TTL: {settings.CART_TTL_DAYS} days (cutoff {get_cart_expiry_cutoff(now).isoformat()})')
+        return [
+            ('carts', Cart.objects.expired(now)),
+            ('sessions', Session.objects.filter(expire_date__lt=now)),
+            ('idempotency keys', IdempotencyKey.objects.expired(now)),
+        ]
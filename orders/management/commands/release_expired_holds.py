@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.models import SeatHold
+
+
+class Command(BaseCommand):
+    help = 'Releases expired seat holds back to their events (run periodically, e.g. every minute)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Holds released per transaction')
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Keep sweeping every N seconds instead of exiting after one pass',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            released = 0
+            while True:
+                count = SeatHold.objects.release_expired(limit=options['batch_size'])
+                released += count
+                if count < options['batch_size']:
+                    break
+            elapsed = time.monotonic() - started
+            rate = released / elapsed if elapsed else 0
+            self.stdout.write(
+                self.style.SUCCESS(f'Released {released} expired holds in {elapsed:.2f}s ({rate:.0f} holds/s)')
+            )
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
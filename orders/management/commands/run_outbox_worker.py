@@ -0,0 +1,51 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from orders.outbox import process_batch
+
+
+class Command(BaseCommand):
+    help = 'Executes pending outbox messages (order emails, certificate codes, analytics) with retries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.OUTBOX_BATCH_SIZE,
+            help='Messages claimed and executed per batch',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait before polling again when the outbox is empty',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the due messages and exit instead of polling forever',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            done = failed = 0
+            while True:
+                batch_done, batch_failed = process_batch(options['batch_size'])
+                done += batch_done
+                failed += batch_failed
+                if batch_done + batch_failed < options['batch_size']:
+                    break
+            if done or failed or options['once']:
+                elapsed = time.monotonic() - started
+                rate = (done + failed) / elapsed if elapsed else 0
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f'Outbox: {done} done, {failed} failed in {elapsed:.2f}s ({rate:.0f} messages/s)'
+                    )
+                )
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.rollups import update_rollups
+
+
+class Command(BaseCommand):
+    help = 'Updates daily sales/occupancy rollups for the days changed since the last run'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rebuild every day from scratch instead of only the changed ones',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        days, rows = update_rollups(full=options['full'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {days} days ({rows} rollup rows) in {elapsed:.2f}s')
+        )
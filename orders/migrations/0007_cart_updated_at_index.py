@@ -0,0 +1,17 @@
+# Generated by Django 4.2.10 on 2026-10-18 22:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_cart_cartitem'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(fields=['updated_at'], name='orders_cart_updated_at_idx'),
+        ),
+    ]
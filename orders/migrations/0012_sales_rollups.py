@@ -0,0 +1,46 @@
+# Generated by Django 4.2.10 on 2026-10-18 22:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masterclasses', '0010_event_held_seats'),
+        ('orders', '0011_order_user_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('value', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('orders_count', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('seats_sold', models.PositiveIntegerField(default=0)),
+                ('certificates_sold', models.PositiveIntegerField(default=0)),
+                ('seats_available', models.PositiveIntegerField(default=0)),
+                ('seats_occupied', models.PositiveIntegerField(default=0)),
+                ('occupancy_ratio', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('masterclass', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='masterclasses.masterclass')),
+            ],
+            options={
+                'ordering': ['day', 'masterclass_id'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailysalesrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'masterclass'), name='dailysalesrollup_unique_day_masterclass'),
+        ),
+    ]
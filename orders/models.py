@@ -1,6 +1,65 @@
-from django.db import models
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import models, transaction
 from django.conf import settings
-from masterclasses.models import MasterClass, Event
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+from masterclasses.models import MasterClass, Event, SeatsUnavailable
+
+
+class OrderQuerySet(models.QuerySet):
+    def with_items(self):
+        """Prefetches items with their event and masterclass, as OrderSerializer reads them."""
+        return self.prefetch_related(
+            models.Prefetch('items', queryset=OrderItem.objects.select_related('event', 'masterclass'))
+        )
+
+    def summary(self, now=None):
+        """
+        Order count, total spent and seats booked for upcoming events, in one
+        query. Cancelled orders count as orders but not as spent or booked.
+        """
+        upcoming_seats = (
+            OrderItem.objects
+            .filter(order=models.OuterRef('pk'), event__start_datetime__gt=now or timezone.now())
+            .values('order')
+            .annotate(seats=models.Sum('quantity'))
+            .values('seats')
+        )
+        active = ~models.Q(status='cancelled')
+        result = self.aggregate(
+            order_count=models.Count('id'),
+            total_spent=models.Sum('total_price', filter=active),
+            upcoming_bookings=models.Sum(models.Subquery(upcoming_seats), filter=active),
+        )
+        return {
+            'order_count': result['order_count'],
+            'total_spent': float(result['total_spent'] or 0),
+            'upcoming_bookings': result['upcoming_bookings'] or 0,
+        }
+
+
+def order_summary_cache_key(user_id):
+    return f'orders:summary:{user_id}'
+
+
+def get_order_summary(user_id):
+    """Order summary of a user, cached until one of their orders changes."""
+    key = order_summary_cache_key(user_id)
+    summary = cache.get(key)
+    if summary is None:
+        summary = Order.objects.filter(user_id=user_id).summary()
+        cache.set(key, summary, settings.ORDER_SUMMARY_CACHE_SECONDS)
+    return summary
+
+
+def invalidate_order_summary(user_id):
+    # After commit, so that a concurrent reader cannot re-cache the old values
+    transaction.on_commit(lambda: cache.delete(order_summary_cache_key(user_id)))
 
 
 class Order(models.Model):
@@ -31,8 +90,13 @@ class Order(models.Model):
     comment = models.TextField(null=True, blank=True)
     telegram = models.CharField(max_length=100, null=True, blank=True)
 
+    objects = OrderQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='orders_order_user_created_idx'),
+        ]
         verbose_name = 'Order'
         verbose_name_plural = 'Orders'
 
@@ -40,9 +104,11 @@ class Order(models.Model):
         return f"Order {self.id} - {self.user.email}"
 
     def calculate_total(self):
-        total = sum(item.price * item.quantity for item in self.items.all())
+        total = self.items.aggregate(
+            total=models.Sum(models.F('price') * models.F('quantity'), output_field=models.DecimalField())
+        )['total'] or 0
         self.total_price = total
-        self.save()
+        self.save(update_fields=['total_price', 'updated_at'])
         return total
 
     def mark_as_paid(self):
@@ -76,8 +142,31 @@ class OrderItem(models.Model):
     def save(self, *args, **kwargs):
         if not self.price and self.masterclass:
             self.price = self.masterclass.final_price if hasattr(self.masterclass, 'final_price') else self.masterclass.start_price
+        # Итог заказа здесь не пересчитывается: checkout считает его один раз по корзине,
+        # а OrderItemViewSet вызывает order.calculate_total() после изменения позиции
         super().save(*args, **kwargs)
-        self.order.calculate_total()
+
+
+@receiver([post_save, post_delete], sender=Order)
+def order_changed(sender, instance, **kwargs):
+    invalidate_order_summary(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=OrderItem)
+def order_item_changed(sender, instance, **kwargs):
+    user_id = Order.objects.filter(pk=instance.order_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        invalidate_order_summary(user_id)
+
+
+def get_cart_expiry_cutoff(now=None):
+    """Carts last touched before this moment are considered expired."""
+    return (now or timezone.now()) - timedelta(days=settings.CART_TTL_DAYS)
+
+
+class CartQuerySet(models.QuerySet):
+    def expired(self, now=None):
+        return self.filter(updated_at__lt=get_cart_expiry_cutoff(now))
 
 
 class Cart(models.Model):
@@ -85,9 +174,24 @@ class Cart(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CartQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at'], name='orders_cart_updated_at_idx'),
+        ]
+
     def __str__(self):
         return f"Cart for {self.user.email}"
 
+    def is_expired(self, now=None):
+        return self.updated_at < get_cart_expiry_cutoff(now)
+
+    def touch(self):
+        """Bump updated_at without rewriting the row's other columns."""
+        self.updated_at = timezone.now()
+        Cart.objects.filter(pk=self.pk).update(updated_at=self.updated_at)
+
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
     event = models.ForeignKey(Event, on_delete=models.CASCADE, null=True, blank=True)
@@ -101,3 +205,283 @@ class CartItem(models.Model):
         if self.certificate:
             return f"Certificate {self.certificate.id} x {self.quantity}"
         return f"CartItem x {self.quantity}"
+
+
+class SeatHoldManager(models.Manager):
+    def for_owner(self, user=None, session_key=None):
+        if user is not None:
+            return self.filter(user=user)
+        if session_key is None:
+            return self.none()
+        return self.filter(user__isnull=True, session_key=session_key)
+
+    def place(self, event_id, quantity, user=None, session_key=None):
+        """
+        Sets the owner's hold on an event to quantity seats and restarts its
+        expiry; quantity 0 releases the hold. Only the difference with the
+        current hold is claimed from Event.held_seats.
+        Raises SeatsUnavailable if the event cannot cover the difference.
+        """
+        with transaction.atomic():
+            hold = self.for_owner(user, session_key).select_for_update().filter(event_id=event_id).first()
+            delta = quantity - (hold.quantity if hold else 0)
+            if delta > 0 and not Event.hold_seats(event_id, delta):
+                # Expired holds of other carts may still be counted; sweep this event and retry once
+                if not self.release_expired(event_ids=[event_id]) or not Event.hold_seats(event_id, delta):
+                    raise SeatsUnavailable(event_id)
+            elif delta < 0:
+                Event.unhold_seats(event_id, -delta)
+
+            if quantity <= 0:
+                if hold:
+                    hold.delete()
+                return None
+            expires_at = timezone.now() + timedelta(seconds=settings.SEAT_HOLD_TTL_SECONDS)
+            if hold:
+                hold.quantity = quantity
+                hold.expires_at = expires_at
+                hold.save(update_fields=['quantity', 'expires_at'])
+                return hold
+            return self.create(
+                event_id=event_id,
+                user=user,
+                session_key=None if user is not None else session_key,
+                quantity=quantity,
+                expires_at=expires_at,
+            )
+
+    def release(self, user=None, session_key=None, event_id=None):
+        with transaction.atomic():
+            holds = self.for_owner(user, session_key).select_for_update()
+            if event_id is not None:
+                holds = holds.filter(event_id=event_id)
+            return self._delete_and_unhold(holds)
+
+    def release_expired(self, now=None, event_ids=None, limit=None):
+        """Releases up to limit expired holds and returns how many were released."""
+        holds = self.filter(expires_at__lte=now or timezone.now())
+        if event_ids is not None:
+            holds = holds.filter(event_id__in=event_ids)
+        with transaction.atomic():
+            holds = holds.select_for_update(skip_locked=True).order_by('pk')
+            if limit:
+                holds = holds[:limit]
+            return self._delete_and_unhold(holds)
+
+    def convert_to_reservation(self, seats, user=None, session_key=None):
+        """
+        Reserves {event_id: quantity} at checkout, consuming the owner's holds:
+        held seats become occupied seats without competing for availability.
+        """
+        with transaction.atomic():
+            rows = list(self.for_owner(user, session_key).select_for_update().values_list('pk', 'event_id', 'quantity'))
+            held = defaultdict(int)
+            for _, event_id, quantity in rows:
+                held[event_id] += quantity
+            self.filter(pk__in=[pk for pk, _, _ in rows]).delete()
+            try:
+                Event.reserve_seats(seats, held=held)
+            except SeatsUnavailable as e:
+                if not self.release_expired(event_ids=[e.event_id]):
+                    raise
+                Event.reserve_seats(seats, held=held)
+
+    def _delete_and_unhold(self, holds):
+        rows = list(holds.values_list('pk', 'event_id', 'quantity'))
+        if not rows:
+            return 0
+        per_event = defaultdict(int)
+        for _, event_id, quantity in rows:
+            per_event[event_id] += quantity
+        self.filter(pk__in=[pk for pk, _, _ in rows]).delete()
+        for event_id in sorted(per_event):
+            Event.unhold_seats(event_id, per_event[event_id])
+        return len(rows)
+
+    def held_quantities(self, user=None, session_key=None):
+        """{event_id: quantity} of the owner's active holds."""
+        return dict(
+            self.for_owner(user, session_key)
+            .filter(expires_at__gt=timezone.now())
+            .values_list('event_id', 'quantity')
+        )
+
+
+class SeatHold(models.Model):
+    """
+    Seats of an event set aside for one cart (a user or an anonymous session)
+    until expires_at. Event.held_seats is kept equal to the sum of holds.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='seat_holds')
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='seat_holds'
+    )
+    session_key = models.CharField(max_length=40, null=True, blank=True)
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = SeatHoldManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['event', 'user'],
+                condition=models.Q(user__isnull=False),
+                name='seathold_unique_user_event',
+            ),
+            models.UniqueConstraint(
+                fields=['event', 'session_key'],
+                condition=models.Q(session_key__isnull=False),
+                name='seathold_unique_session_event',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Hold {self.quantity} x event {self.event_id} until {self.expires_at:%Y-%m-%d %H:%M}"
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def release_user_holds(sender, instance, **kwargs):
+    # The cascade would delete the holds without giving the seats back to Event.held_seats
+    SeatHold.objects.release(user=instance)
+
+
+def get_idempotency_key_cutoff(now=None):
+    """Idempotency keys created before this moment are no longer replayed."""
+    return (now or timezone.now()) - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+
+
+class IdempotencyKeyQuerySet(models.QuerySet):
+    def expired(self, now=None):
+        return self.filter(created_at__lt=get_idempotency_key_cutoff(now))
+
+
+class IdempotencyKey(models.Model):
+    """
+    Outcome of a mutating request sent with an Idempotency-Key header, stored
+    per owner (a user or an anonymous session) so a retry gets the same
+    response without running the view again. status_code is null while the
+    first request is still being processed.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='idempotency_keys'
+    )
+    session_key = models.CharField(max_length=40, null=True, blank=True)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=JSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    objects = IdempotencyKeyQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'key'],
+                condition=models.Q(user__isnull=False),
+                name='idempotencykey_unique_user_key',
+            ),
+            models.UniqueConstraint(
+                fields=['session_key', 'key'],
+                condition=models.Q(session_key__isnull=False),
+                name='idempotencykey_unique_session_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Idempotency key {self.key} ({self.status_code or 'in progress'})"
+
+    def is_expired(self, now=None):
+        return self.created_at < get_idempotency_key_cutoff(now)
+
+    def is_abandoned(self, now=None):
+        """Still in progress long after it started: the request that created it died."""
+        timeout = timedelta(seconds=settings.IDEMPOTENCY_IN_PROGRESS_TIMEOUT_SECONDS)
+        return self.status_code is None and self.created_at < (now or timezone.now()) - timeout
+
+
+class OutboxMessage(models.Model):
+    """
+    A side effect of a committed change (an email, an analytics event...)
+    written in the same transaction as the change and executed later by
+    run_outbox_worker. See orders.outbox for the topics and their handlers.
+    While a worker processes the message its status is 'processing' and
+    available_at is the end of the worker's lease.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    topic = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, encoder=JSONEncoder)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='orders_outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} #{self.id} ({self.status})"
+
+
+class DailySalesRollup(models.Model):
+    """
+    Precomputed reporting row for one day and one masterclass (masterclass
+    is null for certificate sales). Sales columns count non-cancelled orders
+    created that day; occupancy columns sum the masterclass's events that
+    start that day. Maintained by update_sales_rollups (see orders.rollups).
+    """
+    day = models.DateField()
+    masterclass = models.ForeignKey(
+        MasterClass,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='daily_sales'
+    )
+    orders_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    seats_sold = models.PositiveIntegerField(default=0)
+    certificates_sold = models.PositiveIntegerField(default=0)
+    seats_available = models.PositiveIntegerField(default=0)
+    seats_occupied = models.PositiveIntegerField(default=0)
+    occupancy_ratio = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['day', 'masterclass_id']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'masterclass'], name='dailysalesrollup_unique_day_masterclass'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.masterclass_id or 'certificates'}: {self.revenue} RUB"
+
+
+class RollupWatermark(models.Model):
+    """Up to which Order.updated_at a rollup job has processed changes."""
+    name = models.CharField(max_length=100, unique=True)
+    value = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} @ {self.value.isoformat()}"
@@ -0,0 +1,140 @@
+"""
+Transactional outbox for side effects of checkout.
+
+Views call enqueue() inside the transaction that creates the order, so a
+message exists if and only if the order was committed. run_outbox_worker
+then executes the messages through the handlers registered below, in
+batches, retrying failures with exponential backoff.
+
+Delivery is at least once per message. A worker claims a batch in a short
+transaction: it marks the messages 'processing' and leases them until
+now + OUTBOX_LEASE_SECONDS. It runs the handlers outside any transaction,
+so no row locks are held while SMTP is slow. Each outcome is then recorded
+in its own UPDATE. If the worker dies, only the messages it had not
+finished are picked up again once their lease ends.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.utils import timezone
+
+from certificates.models import Certificate
+from orders.models import Order, OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+def handler(topic):
+    """Registers the decorated function as the handler of topic; it receives the payload dict."""
+    def register(func):
+        HANDLERS[topic] = func
+        return func
+    return register
+
+
+def enqueue(topic, payload):
+    return OutboxMessage.objects.create(topic=topic, payload=payload)
+
+
+def enqueue_many(messages):
+    """Enqueues [(topic, payload), ...] with a single INSERT."""
+    return OutboxMessage.objects.bulk_create(
+        [OutboxMessage(topic=topic, payload=payload) for topic, payload in messages]
+    )
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+
+
+def claim_batch(batch_size=None, now=None):
+    """
+    Leases up to batch_size due messages to this worker. SKIP LOCKED lets
+    several workers claim side by side; the locks last only for this UPDATE.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects
+            .select_for_update(skip_locked=True)
+            .filter(status__in=['pending', 'processing'], available_at__lte=now)
+            .order_by('available_at', 'id')[:batch_size or settings.OUTBOX_BATCH_SIZE]
+        )
+        for message in messages:
+            message.status = 'processing'
+            message.attempts += 1
+            message.available_at = now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+        OutboxMessage.objects.bulk_update(messages, ['status', 'attempts', 'available_at'])
+    return messages
+
+
+def process_batch(batch_size=None, now=None):
+    """Claims and runs up to batch_size due messages; returns (done, failed)."""
+    now = now or timezone.now()
+    done = failed = 0
+    for message in claim_batch(batch_size, now):
+        try:
+            func = HANDLERS.get(message.topic)
+            if func is None:
+                raise LookupError(f"No outbox handler for topic '{message.topic}'")
+            func(message.payload)
+        except Exception as e:
+            logger.exception(f"Outbox message {message.id} ({message.topic}) failed")
+            if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                changes = {'status': 'failed'}
+            else:
+                changes = {'status': 'pending', 'available_at': now + retry_delay(message.attempts)}
+            changes['last_error'] = f'{type(e).__name__}: {e}'
+            failed += 1
+        else:
+            changes = {'status': 'done', 'processed_at': timezone.now()}
+            done += 1
+        # Only if the lease is still ours: after a takeover the other worker records the outcome
+        OutboxMessage.objects.filter(
+            pk=message.pk, status='processing', attempts=message.attempts
+        ).update(**changes)
+    return done, failed
+
+
+def _order_recipient(order):
+    return order.email or order.user.email
+
+
+@handler('order.confirmation_email')
+def send_order_confirmation(payload):
+    order = Order.objects.select_related('user').get(id=payload['order_id'])
+    lines = [
+        f"{item} — {item.price} RUB"
+        for item in order.items.select_related('masterclass')
+    ]
+    send_mail(
+        subject=f'Заказ №{order.id} оформлен',
+        message='\n'.join(lines + [f'Итого: {order.total_price} RUB']),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[_order_recipient(order)],
+    )
+
+
+@handler('order.certificate_codes')
+def send_certificate_codes(payload):
+    order = Order.objects.select_related('user').get(id=payload['order_id'])
+    certificates = Certificate.objects.filter(id__in=payload['certificate_ids'])
+    send_mail(
+        subject=f'Сертификаты по заказу №{order.id}',
+        message='\n'.join(f'{certificate.code}: {certificate.amount} RUB' for certificate in certificates),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[_order_recipient(order)],
+    )
+
+
+@handler('order.analytics')
+def log_order_analytics(payload):
+    logger.info(
+        f"order_placed order_id={payload['order_id']} user_id={payload['user_id']} "
+        f"total_price={payload['total_price']} items={payload['items']} seats={payload['seats']}"
+    )
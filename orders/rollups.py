@@ -0,0 +1,105 @@
+"""
+Daily sales and occupancy rollups (DailySalesRollup).
+
+rebuild_days() recomputes every row of the given days from Order, OrderItem
+and Event. update_rollups() finds the days touched by orders changed since
+the last run (the 'daily_sales' watermark) and rebuilds only those, so a
+periodic run costs time proportional to the changes, not to the history.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from masterclasses.models import Event
+from orders.models import DailySalesRollup, Order, OrderItem, RollupWatermark
+
+WATERMARK_NAME = 'daily_sales'
+
+
+def _day_rows(day):
+    rows = {}
+
+    def row(masterclass_id):
+        if masterclass_id not in rows:
+            rows[masterclass_id] = DailySalesRollup(day=day, masterclass_id=masterclass_id)
+        return rows[masterclass_id]
+
+    sales = (
+        OrderItem.objects
+        .filter(order__created_at__date=day)
+        .exclude(order__status='cancelled')
+        .values('masterclass')
+        .annotate(
+            orders_count=Count('order', distinct=True),
+            revenue=Sum(F('price') * F('quantity'), output_field=DecimalField()),
+            seats_sold=Sum('quantity', filter=Q(is_certificate=False)),
+            certificates_sold=Sum('quantity', filter=Q(is_certificate=True)),
+        )
+    )
+    for sale in sales:
+        rollup = row(sale['masterclass'])
+        rollup.orders_count = sale['orders_count']
+        rollup.revenue = sale['revenue'] or 0
+        rollup.seats_sold = sale['seats_sold'] or 0
+        rollup.certificates_sold = sale['certificates_sold'] or 0
+
+    occupancy = (
+        Event.objects
+        .filter(start_datetime__date=day)
+        .values('masterclass')
+        .annotate(available=Sum('available_seats'), occupied=Sum('occupied_seats'))
+    )
+    for events in occupancy:
+        rollup = row(events['masterclass'])
+        rollup.seats_available = events['available']
+        rollup.seats_occupied = events['occupied']
+        rollup.occupancy_ratio = events['occupied'] / events['available'] if events['available'] else None
+
+    return list(rows.values())
+
+
+def rebuild_days(days):
+    """Replaces the rollup rows of each day; returns the number of rows written."""
+    written = 0
+    for day in sorted(days):
+        with transaction.atomic():
+            rows = _day_rows(day)
+            DailySalesRollup.objects.filter(day=day).delete()
+            DailySalesRollup.objects.bulk_create(rows)
+            written += len(rows)
+    return written
+
+
+def changed_days(since):
+    """Order days and event days affected by orders updated after since (None: all history)."""
+    orders = Order.objects.all() if since is None else Order.objects.filter(updated_at__gt=since)
+    days = set(orders.annotate(day=TruncDate('created_at')).values_list('day', flat=True).distinct())
+    items = OrderItem.objects.filter(order__in=orders.values('pk'), event__isnull=False)
+    days.update(
+        items.annotate(day=TruncDate('event__start_datetime')).values_list('day', flat=True).distinct()
+    )
+    events = Event.objects.all() if since is None else Event.objects.filter(created_at__gt=since)
+    days.update(events.annotate(day=TruncDate('start_datetime')).values_list('day', flat=True).distinct())
+    return days
+
+
+def update_rollups(full=False, now=None):
+    """
+    Rebuilds the days changed since the watermark (every day when full) and
+    advances the watermark. Returns (days rebuilt, rows written).
+    """
+    now = now or timezone.now()
+    watermark = RollupWatermark.objects.filter(name=WATERMARK_NAME).first()
+    since = None
+    if watermark and not full:
+        since = watermark.value - timedelta(seconds=settings.SALES_ROLLUP_OVERLAP_SECONDS)
+    days = changed_days(since)
+    if full:
+        DailySalesRollup.objects.exclude(day__in=days).delete()
+    written = rebuild_days(days)
+    RollupWatermark.objects.update_or_create(name=WATERMARK_NAME, defaults={'value': now})
+    return len(days), written
@@ -118,12 +118,12 @@ class OrderModelTest(TestCase):
         self.order.refresh_from_db()
         self.assertEqual(self.order.status, 'cancelled')
 
-    def test_orderitem_save_triggers_total(self):
+    def test_orderitem_save_does_not_recalculate_total(self):
         self.order.total_price = 0
         self.order.save()
         OrderItem.objects.create(order=self.order, masterclass=self.masterclass, quantity=1, price=80.00)
         self.order.refresh_from_db()
-        self.assertEqual(self.order.total_price, 80.00 * 4)
+        self.assertEqual(self.order.total_price, 0)
 
     def test_order_str(self):
         self.assertIn('Order', str(self.order))
@@ -217,6 +217,17 @@ class OrderItemAPITest(TestCase):
         response = self.client.post(self.url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertTrue(OrderItem.objects.filter(order=self.order, masterclass=self.masterclass, quantity=1).exists())
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_price, 90.00 * 3)
+
+    def test_update_and_delete_orderitem_recalculate_total(self):
+        url = drf_reverse('order-item-detail', args=[self.order_item.id])
+        self.client.patch(url, {'quantity': 3}, format='json')
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_price, 90.00 * 3)
+        self.client.delete(url)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_price, 0)
 
 class OrderSerializerValidateItemsTest(TestCase):
     def setUp(self):
@@ -590,9 +601,9 @@ class UserOrdersAPITest(TestCase):
     def test_fetch_user_orders(self):
         response = self.client.get(self.user_orders_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIsInstance(response.data, list)
-        self.assertEqual(len(response.data), 1)
-        order_data = response.data[0]
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['summary']['order_count'], 1)
+        order_data = response.data['results'][0]
         self.assertEqual(order_data['id'], self.order.id)
         self.assertEqual(len(order_data['order_units']), 1)
         self.assertEqual(order_data['total_amount'], 180.00)  # 90.00 * 2
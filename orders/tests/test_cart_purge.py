@@ -0,0 +1,100 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.test import TestCase, RequestFactory, override_settings
+from django.utils import timezone
+
+from orders.models import Cart as DB_Cart, CartItem
+from orders.utils import Cart
+from masterclasses.models import MasterClass, Event
+
+User = get_user_model()
+
+
+@override_settings(CART_TTL_DAYS=30)
+class PurgeStaleCartsTest(TestCase):
+    def setUp(self):
+        self.masterclass = MasterClass.objects.create(
+            name='Purge Test Masterclass',
+            short_description='Purge Test Description',
+            start_price=100,
+            final_price=90,
+        )
+        self.event = Event.objects.create(
+            masterclass=self.masterclass,
+            start_datetime=timezone.now() + timedelta(days=7),
+            available_seats=10
+        )
+
+    def _make_cart(self, email, age_days):
+        user = User.objects.create_user(username=email, email=email, password='testpass123')
+        cart = DB_Cart.objects.create(user=user)
+        CartItem.objects.create(cart=cart, event=self.event, quantity=1)
+        DB_Cart.objects.filter(pk=cart.pk).update(updated_at=timezone.now() - timedelta(days=age_days))
+        return cart
+
+    def test_purges_only_expired_carts(self):
+        """Test that carts older than the TTL are deleted together with their items"""
+        stale = [self._make_cart(f'stale{i}@example.com', 31) for i in range(3)]
+        fresh = self._make_cart('fresh@example.com', 1)
+
+        out = StringIO()
+        call_command('purge_stale_carts', batch_size=2, stdout=out)
+
+        self.assertFalse(DB_Cart.objects.filter(pk__in=[c.pk for c in stale]).exists())
+        self.assertFalse(CartItem.objects.filter(cart_id__in=[c.pk for c in stale]).exists())
+        self.assertTrue(DB_Cart.objects.filter(pk=fresh.pk).exists())
+        self.assertIn('carts: deleted 3 rows in 2 batches', out.getvalue())
+        self.assertIn('rows/s', out.getvalue())
+
+    def test_purges_expired_sessions(self):
+        """Test that expired session rows are deleted and live ones are kept"""
+        expired = SessionStore()
+        expired['cart'] = {'event_1': {'type': 'event', 'id': 1, 'quantity': 1}}
+        expired.create()
+        Session.objects.filter(pk=expired.session_key).update(expire_date=timezone.now() - timedelta(days=1))
+        live = SessionStore()
+        live['cart'] = {}
+        live.create()
+
+        call_command('purge_stale_carts', stdout=StringIO())
+
+        self.assertFalse(Session.objects.filter(pk=expired.session_key).exists())
+        self.assertTrue(Session.objects.filter(pk=live.session_key).exists())
+
+    def test_dry_run_deletes_nothing(self):
+        """Test that --dry-run only reports counts"""
+        stale = self._make_cart('stale@example.com', 31)
+        out = StringIO()
+        call_command('purge_stale_carts', dry_run=True, stdout=out)
+        self.assertTrue(DB_Cart.objects.filter(pk=stale.pk).exists())
+        self.assertIn('carts: 1 rows would be deleted', out.getvalue())
+
+    def test_expired_cart_is_served_empty(self):
+        """Test that an expired cart that has not been purged yet reads as empty"""
+        stale = self._make_cart('late@example.com', 31)
+        request = RequestFactory().get('/')
+        request.user = stale.user
+        request.session = SessionStore()
+
+        cart = Cart(request)
+
+        self.assertEqual(cart.get_items(), [])
+        stale.refresh_from_db()
+        self.assertFalse(stale.is_expired())
+
+    def test_cart_mutation_touches_updated_at(self):
+        """Test that changing cart items keeps the cart alive"""
+        stale = self._make_cart('touch@example.com', 10)
+        request = RequestFactory().get('/')
+        request.user = stale.user
+        request.session = SessionStore()
+
+        Cart(request).update('event', self.event.id, 2)
+
+        stale.refresh_from_db()
+        self.assertGreater(stale.updated_at, timezone.now() - timedelta(minutes=1))
@@ -0,0 +1,86 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from masterclasses.models import MasterClass, Event
+from orders.models import Cart, CartItem, Order, OrderItem
+
+User = get_user_model()
+
+
+class CheckoutSeatReservationTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='checkout@example.com',
+            email='checkout@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.masterclass = MasterClass.objects.create(
+            name='Checkout Masterclass',
+            short_description='Checkout Description',
+            start_price=Decimal('1000.00'),
+            final_price=Decimal('800.00'),
+        )
+        self.event = Event.objects.create(
+            masterclass=self.masterclass,
+            start_datetime=timezone.now() + timezone.timedelta(days=3),
+            available_seats=3
+        )
+        self.other_event = Event.objects.create(
+            masterclass=self.masterclass,
+            start_datetime=timezone.now() + timezone.timedelta(days=4),
+            available_seats=5
+        )
+        self.cart = Cart.objects.create(user=self.user)
+        self.url = reverse('checkout-order', kwargs={'user_id': self.user.id})
+
+    def test_checkout_reserves_seats(self):
+        CartItem.objects.create(cart=self.cart, event=self.event, quantity=2)
+        CartItem.objects.create(cart=self.cart, event=self.other_event, quantity=1)
+
+        response = self.client.post(self.url, {'email': 'checkout@example.com'}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.event.refresh_from_db()
+        self.other_event.refresh_from_db()
+        self.assertEqual(self.event.occupied_seats, 2)
+        self.assertEqual(self.other_event.occupied_seats, 1)
+
+    def test_checkout_rejects_oversell_and_rolls_back(self):
+        CartItem.objects.create(cart=self.cart, event=self.other_event, quantity=1)
+        CartItem.objects.create(cart=self.cart, event=self.event, quantity=2)
+        # Someone else took the seats after they were put in the cart
+        Event.objects.filter(pk=self.event.pk).update(occupied_seats=2)
+
+        response = self.client.post(self.url, {'email': 'checkout@example.com'}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Not enough seats available for Checkout Masterclass')
+        self.assertFalse(Order.objects.filter(user=self.user).exists())
+        self.other_event.refresh_from_db()
+        self.assertEqual(self.other_event.occupied_seats, 0)
+        self.assertEqual(self.cart.items.count(), 2)
+
+    def test_checkout_creates_items_in_one_insert(self):
+        CartItem.objects.create(cart=self.cart, event=self.event, quantity=2)
+        CartItem.objects.create(cart=self.cart, event=self.other_event, quantity=1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, {'email': 'checkout@example.com'}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(user=self.user)
+        self.assertEqual(order.items.count(), 2)
+        self.assertEqual(order.total_price, Decimal('2400.00'))
+        item_inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "orders_orderitem"')]
+        self.assertEqual(len(item_inserts), 1)
+        order_updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "orders_order"')]
+        self.assertEqual(order_updates, [])
@@ -0,0 +1,97 @@
+import csv
+import io
+import json
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from masterclasses.models import MasterClass, Event
+from orders.models import Order, OrderItem
+
+User = get_user_model()
+
+
+class OrderExportTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser(
+            username='ops@example.com',
+            email='ops@example.com',
+            password='testpass123'
+        )
+        self.buyer = User.objects.create_user(
+            username='buyer@example.com',
+            email='buyer@example.com',
+            password='testpass123'
+        )
+        masterclass = MasterClass.objects.create(
+            name='Export Masterclass',
+            short_description='Export Description',
+            start_price=Decimal('1000.00'),
+            final_price=Decimal('800.00'),
+        )
+        event = Event.objects.create(
+            masterclass=masterclass,
+            start_datetime=timezone.now() + timedelta(days=3),
+            available_seats=10
+        )
+        self.paid = Order.objects.create(user=self.buyer, status='paid', total_price=Decimal('1600.00'))
+        OrderItem.objects.create(order=self.paid, masterclass=masterclass, event=event, quantity=2, price=Decimal('800.00'))
+        OrderItem.objects.create(order=self.paid, quantity=1, price=Decimal('1000.00'), is_certificate=True)
+        self.old = Order.objects.create(user=self.buyer, status='created')
+        Order.objects.filter(pk=self.old.pk).update(created_at=timezone.now() - timedelta(days=40))
+        self.url = reverse('orders-export')
+
+    def _body(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export_streams_item_rows(self):
+        """Test that the CSV export streams a header and one row per order item"""
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(self.url, {'status': 'paid'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment;', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(self._body(response))))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual({row['order_id'] for row in rows}, {str(self.paid.id)})
+        self.assertEqual(rows[0]['masterclass'], 'Export Masterclass')
+        self.assertEqual(rows[0]['user_email'], 'buyer@example.com')
+
+    def test_ndjson_export_with_date_range(self):
+        """Test that NDJSON output honours the date range and keeps orders without items"""
+        self.client.force_authenticate(user=self.admin)
+        date_to = (timezone.now() - timedelta(days=30)).date().isoformat()
+        response = self.client.get(self.url, {'output': 'ndjson', 'date_to': date_to})
+
+        lines = [json.loads(line) for line in self._body(response).splitlines()]
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(lines[0]['order_id'], self.old.id)
+        self.assertIsNone(lines[0]['item_id'])
+
+    def test_invalid_parameters(self):
+        """Test that a bad date or format is rejected with 400"""
+        self.client.force_authenticate(user=self.admin)
+        self.assertEqual(self.client.get(self.url, {'date_from': '01.02.2024'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'output': 'xml'}).status_code, 400)
+
+    def test_export_requires_admin(self):
+        """Test that regular users cannot export orders"""
+        self.client.force_authenticate(user=self.buyer)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_export_orders_command(self):
+        """Test that export_orders writes the same rows to stdout"""
+        out, err = io.StringIO(), io.StringIO()
+        call_command('export_orders', output='ndjson', status='paid', chunk_size=1, stdout=out, stderr=err)
+
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([line['quantity'] for line in lines], [2, 1])
+        self.assertIn('Exported 2 rows', err.getvalue())
@@ -0,0 +1,143 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from masterclasses.models import MasterClass, Event
+from orders.models import Cart, CartItem, IdempotencyKey, Order
+
+User = get_user_model()
+
+
+class IdempotencyKeyTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='retry@example.com',
+            email='retry@example.com',
+            password='testpass123'
+        )
+        self.masterclass = MasterClass.objects.create(
+            name='Retry Masterclass',
+            short_description='Retry Description',
+            start_price=Decimal('1000.00'),
+            final_price=Decimal('800.00'),
+        )
+        self.event = Event.objects.create(
+            masterclass=self.masterclass,
+            start_datetime=timezone.now() + timedelta(days=3),
+            available_seats=5
+        )
+        self.checkout_url = reverse('checkout-order', kwargs={'user_id': self.user.id})
+
+    def _checkout(self, key, email='retry@example.com'):
+        return self.client.post(self.checkout_url, {'email': email}, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_checkout_retry_replays_stored_response(self):
+        """Test that a retried checkout returns the first order instead of creating another"""
+        self.client.force_authenticate(user=self.user)
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, event=self.event, quantity=2)
+
+        first = self._checkout('checkout-1')
+        # The retry must not depend on the cart any more: it has been cleared by the first request
+        with self.assertNumQueries(1):
+            retry = self._checkout('checkout-1')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.data, first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.filter(user=self.user).count(), 1)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.occupied_seats, 2)
+
+    def test_key_reused_with_different_payload_is_rejected(self):
+        """Test that the same key with another request body gets 422"""
+        self.client.force_authenticate(user=self.user)
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, event=self.event, quantity=1)
+
+        self._checkout('checkout-2')
+        response = self._checkout('checkout-2', email='other@example.com')
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.filter(user=self.user).count(), 1)
+
+    def test_key_in_progress_returns_conflict(self):
+        """Test that a retry arriving while the first request still runs gets 409"""
+        self.client.force_authenticate(user=self.user)
+        first = self._checkout('checkout-3')  # empty cart: stored as a 400
+        IdempotencyKey.objects.filter(user=self.user, key='checkout-3').update(status_code=None)
+
+        response = self._checkout('checkout-3')
+
+        self.assertEqual(first.status_code, 400)
+        self.assertEqual(response.status_code, 409)
+
+    def test_abandoned_key_is_taken_over(self):
+        """Test that a key left in progress by a dead request is run again by the next retry"""
+        self.client.force_authenticate(user=self.user)
+        self._checkout('checkout-4')  # empty cart: stored as a 400, then made to look abandoned
+        IdempotencyKey.objects.filter(key='checkout-4').update(
+            status_code=None, created_at=timezone.now() - timedelta(minutes=10)
+        )
+        cart, _ = Cart.objects.get_or_create(user=self.user)
+        CartItem.objects.create(cart=cart, event=self.event, quantity=1)
+
+        response = self._checkout('checkout-4')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(IdempotencyKey.objects.get(key='checkout-4').status_code, 201)
+        self.assertEqual(self._checkout('checkout-4')['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.filter(user=self.user).count(), 1)
+
+    def test_anonymous_cart_mutation_is_replayed_per_session(self):
+        """Test that an anonymous add-to-cart retry is answered from the stored response"""
+        url = reverse('add-to-cart', kwargs={'user_id': self.user.id, 'product_unit_id': self.event.id, 'guests_amount': 2})
+        first = self.client.post(url, HTTP_IDEMPOTENCY_KEY='add-1')
+        self.client.delete(reverse('remove-from-cart', kwargs={'user_id': self.user.id, 'product_unit_id': self.event.id}))
+
+        retry = self.client.post(url, HTTP_IDEMPOTENCY_KEY='add-1')
+
+        self.assertEqual(retry.status_code, first.status_code)
+        self.assertEqual(retry.data, first.json())
+        cart = self.client.get(reverse('cart', kwargs={'user_id': self.user.id})).data
+        self.assertEqual(cart['product_units'], [])
+
+        other_client = APIClient()
+        other = other_client.post(url, HTTP_IDEMPOTENCY_KEY='add-1')
+        self.assertNotIn('Idempotent-Replayed', other)
+
+    def test_form_encoded_cart_mutation_with_session_csrf(self):
+        """Test that a multipart body already parsed by the CSRF check can still be fingerprinted"""
+        client = APIClient(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        client.cookies['csrftoken'] = 'a' * 32
+        url = reverse('cart', kwargs={'user_id': self.user.id})
+        data = {'type': 'event', 'id': self.event.id, 'quantity': 1, 'csrfmiddlewaretoken': 'a' * 32}
+
+        first = client.post(url, data, HTTP_IDEMPOTENCY_KEY='form-1')
+        retry = client.post(url, data, HTTP_IDEMPOTENCY_KEY='form-1')
+        changed = client.post(url, dict(data, quantity=2), HTTP_IDEMPOTENCY_KEY='form-1')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(changed.status_code, 422)
+
+    def test_expired_keys_are_purged(self):
+        """Test that purge_stale_carts removes idempotency keys past their TTL"""
+        self.client.force_authenticate(user=self.user)
+        self._checkout('old')
+        self._checkout('new')
+        IdempotencyKey.objects.filter(key='old').update(created_at=timezone.now() - timedelta(days=2))
+
+        call_command('purge_stale_carts', stdout=StringIO())
+
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['new'])
@@ -0,0 +1,129 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from masterclasses.models import MasterClass, Event
+from orders.models import Order, OrderItem, get_order_summary
+
+User = get_user_model()
+
+
+class OrderHistoryQueriesTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='history@example.com',
+            email='history@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.masterclass = MasterClass.objects.create(
+            name='History Masterclass',
+            short_description='History Description',
+            start_price=Decimal('1000.00'),
+            final_price=Decimal('800.00'),
+            parameters={'Адрес': ['Москва'], 'Контакты': ['+7']},
+        )
+        self.early_event = Event.objects.create(
+            masterclass=self.masterclass,
+            start_datetime=timezone.now() + timedelta(days=1),
+            available_seats=100
+        )
+        self.booked_event = Event.objects.create(
+            masterclass=self.masterclass,
+            start_datetime=timezone.now() + timedelta(days=10),
+            available_seats=100
+        )
+        self.url = reverse('user-orders-by-id', kwargs={'user_id': self.user.id})
+
+    def _make_orders(self, count):
+        for _ in range(count):
+            order = Order.objects.create(user=self.user)
+            OrderItem.objects.create(
+                order=order, masterclass=self.masterclass, event=self.booked_event, quantity=2, price=Decimal('800.00')
+            )
+            OrderItem.objects.create(order=order, quantity=1, price=Decimal('3000.00'), is_certificate=True)
+
+    def test_query_count_does_not_grow_with_orders(self):
+        """Test that order history is served in a fixed number of queries"""
+        # orders page, prefetched items, summary aggregate
+        self._make_orders(1)
+        with self.assertNumQueries(3):
+            self.client.get(self.url)
+
+        self._make_orders(5)
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data['results']), 6)
+
+    def test_viewset_list_and_info_use_prefetch(self):
+        """Test that OrderViewSet list/info do not query per item"""
+        self._make_orders(3)
+        order = Order.objects.filter(user=self.user).first()
+        with self.assertNumQueries(3):
+            self.client.get(reverse('order-user-orders'))
+        with self.assertNumQueries(2):
+            self.client.get(reverse('order-info', args=[order.id]))
+
+    def test_date_comes_from_booked_event(self):
+        """Test that an item's date is the date of the event that was booked"""
+        self._make_orders(1)
+        response = self.client.get(self.url)
+        unit = next(u for u in response.data['results'][0]['order_units'] if u['type'] == 'master_class')
+        self.assertEqual(unit['date']['start_datetime'], self.booked_event.start_datetime.isoformat())
+
+    def test_cursor_pagination(self):
+        """Test that pages follow (created_at, id) newest first without gaps or repeats"""
+        self._make_orders(5)
+        expected = list(Order.objects.filter(user=self.user).order_by('-created_at', '-id').values_list('id', flat=True))
+
+        first = self.client.get(self.url, {'page_size': 2}).data
+        self.assertIsNone(first['previous'])
+        seen = [order['id'] for order in first['results']]
+        next_url = first['next']
+        while next_url:
+            page = self.client.get(next_url).data
+            seen += [order['id'] for order in page['results']]
+            next_url = page['next']
+
+        self.assertEqual(seen, expected)
+
+    def test_summary(self):
+        """Test order count, total spent and upcoming bookings"""
+        self._make_orders(2)
+        Order.objects.filter(user=self.user).update(total_price=Decimal('4600.00'))
+        cancelled = Order.objects.create(user=self.user, status='cancelled', total_price=Decimal('800.00'))
+        OrderItem.objects.create(
+            order=cancelled, masterclass=self.masterclass, event=self.booked_event, quantity=1, price=Decimal('800.00')
+        )
+        past_event = Event.objects.create(
+            masterclass=self.masterclass,
+            start_datetime=timezone.now() - timedelta(days=1),
+            available_seats=10
+        )
+        past = Order.objects.create(user=self.user, total_price=Decimal('800.00'))
+        OrderItem.objects.create(order=past, masterclass=self.masterclass, event=past_event, quantity=1, price=Decimal('800.00'))
+
+        summary = self.client.get(self.url).data['summary']
+
+        self.assertEqual(summary, {'order_count': 4, 'total_spent': 10000.0, 'upcoming_bookings': 4})
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_summary_is_cached_until_orders_change(self):
+        """Test that the summary is cached per user and dropped when an order changes"""
+        cache.clear()
+        self._make_orders(1)
+        self.assertEqual(get_order_summary(self.user.id)['order_count'], 1)
+        with self.assertNumQueries(0):
+            get_order_summary(self.user.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.create(user=self.user)
+
+        self.assertEqual(get_order_summary(self.user.id)['order_count'], 2)
@@ -0,0 +1,145 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from certificates.models import Certificate
+from masterclasses.models import MasterClass, Event
+from orders import outbox
+from orders.models import Cart, CartItem, OutboxMessage
+
+User = get_user_model()
+
+
+class CheckoutOutboxTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='outbox@example.com',
+            email='outbox@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.masterclass = MasterClass.objects.create(
+            name='Outbox Masterclass',
+            short_description='Outbox Description',
+            start_price=Decimal('1000.00'),
+            final_price=Decimal('800.00'),
+        )
+        self.event = Event.objects.create(
+            masterclass=self.masterclass,
+            start_datetime=timezone.now() + timedelta(days=3),
+            available_seats=1
+        )
+        self.cart = Cart.objects.create(user=self.user)
+        self.url = reverse('checkout-order', kwargs={'user_id': self.user.id})
+
+    def test_checkout_enqueues_side_effects(self):
+        """Test that checkout only records side effects and the worker executes them"""
+        certificate = Certificate.objects.create(user=self.user, amount=Decimal('1000.00'), code='GIFT-1')
+        CartItem.objects.create(cart=self.cart, event=self.event, quantity=1)
+        CartItem.objects.create(cart=self.cart, certificate=certificate, quantity=1)
+
+        response = self.client.post(self.url, {'email': 'buyer@example.com'}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(
+            sorted(OutboxMessage.objects.values_list('topic', flat=True)),
+            ['order.analytics', 'order.certificate_codes', 'order.confirmation_email']
+        )
+
+        out = StringIO()
+        call_command('run_outbox_worker', once=True, stdout=out)
+
+        self.assertIn('3 done, 0 failed', out.getvalue())
+        self.assertFalse(OutboxMessage.objects.exclude(status='done').exists())
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertTrue(all(message.to == ['buyer@example.com'] for message in mail.outbox))
+        self.assertTrue(any('GIFT-1' in message.body for message in mail.outbox))
+        self.assertTrue(all(message.from_email == 'Les Jours <noreply@les-jours.ru>' for message in mail.outbox))
+
+    def test_failed_checkout_enqueues_nothing(self):
+        """Test that a rolled back checkout leaves no outbox messages"""
+        CartItem.objects.create(cart=self.cart, event=self.event, quantity=2)
+
+        response = self.client.post(self.url, {'email': 'buyer@example.com'}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+
+@override_settings(OUTBOX_MAX_ATTEMPTS=2, OUTBOX_RETRY_BASE_SECONDS=60)
+class OutboxRetryTest(TestCase):
+    def setUp(self):
+        self.calls = []
+
+        def flaky(payload):
+            self.calls.append(payload)
+            raise RuntimeError('SMTP down')
+
+        outbox.HANDLERS['test.flaky'] = flaky
+        self.addCleanup(outbox.HANDLERS.pop, 'test.flaky')
+
+    def test_failures_are_retried_with_backoff_then_given_up(self):
+        """Test that a failing handler is rescheduled and marked failed after the last attempt"""
+        message = outbox.enqueue('test.flaky', {'n': 1})
+        now = timezone.now()
+
+        self.assertEqual(outbox.process_batch(now=now), (0, 1))
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('pending', 1))
+        self.assertEqual(message.available_at, now + timedelta(seconds=60))
+        self.assertIn('SMTP down', message.last_error)
+
+        # Not due yet
+        self.assertEqual(outbox.process_batch(now=now + timedelta(seconds=30)), (0, 0))
+
+        self.assertEqual(outbox.process_batch(now=now + timedelta(seconds=61)), (0, 1))
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('failed', 2))
+        self.assertEqual(len(self.calls), 2)
+
+    @override_settings(OUTBOX_LEASE_SECONDS=300)
+    def test_crashed_worker_only_repeats_unfinished_messages(self):
+        """Test that messages finished before a crash stay done and the rest are retried after the lease"""
+        sent = []
+
+        def crash(payload):
+            raise KeyboardInterrupt  # the worker process dies mid-batch
+
+        outbox.HANDLERS['test.send'] = lambda payload: sent.append(payload['n'])
+        outbox.HANDLERS['test.crash'] = crash
+        self.addCleanup(outbox.HANDLERS.pop, 'test.send')
+        self.addCleanup(outbox.HANDLERS.pop, 'test.crash')
+        first = outbox.enqueue('test.send', {'n': 1})
+        second = outbox.enqueue('test.crash', {'n': 2})
+        now = timezone.now()
+
+        with self.assertRaises(KeyboardInterrupt):
+            outbox.process_batch(now=now)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, 'done')
+        self.assertEqual((second.status, second.attempts), ('processing', 1))
+
+        # Leased: another worker does not take it yet
+        self.assertEqual(outbox.process_batch(now=now + timedelta(seconds=10)), (0, 0))
+
+        outbox.HANDLERS['test.crash'] = lambda payload: sent.append(payload['n'])
+        self.assertEqual(outbox.process_batch(now=now + timedelta(seconds=301)), (1, 0))
+        self.assertEqual(sent, [1, 2])
+
+    def test_unknown_topic_fails(self):
+        """Test that a message without a handler is recorded as an error"""
+        message = outbox.enqueue('test.unknown', {})
+        outbox.process_batch()
+        message.refresh_from_db()
+        self.assertIn('No outbox handler', message.last_error)
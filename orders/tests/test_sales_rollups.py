@@ -0,0 +1,111 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from masterclasses.models import MasterClass, Event
+from orders.models import DailySalesRollup, Order, OrderItem, RollupWatermark
+from orders.rollups import update_rollups
+
+User = get_user_model()
+
+
+class DailySalesRollupTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='rollup@example.com',
+            email='rollup@example.com',
+            password='testpass123'
+        )
+        self.masterclass = MasterClass.objects.create(
+            name='Rollup Masterclass',
+            short_description='Rollup Description',
+            start_price=Decimal('1000.00'),
+            final_price=Decimal('800.00'),
+        )
+        self.today = timezone.localdate()
+        self.event = Event.objects.create(
+            masterclass=self.masterclass,
+            start_datetime=timezone.now(),
+            available_seats=10,
+            occupied_seats=3
+        )
+
+    def _order(self, quantity, status='created', certificates=0):
+        order = Order.objects.create(user=self.user, status=status)
+        OrderItem.objects.create(
+            order=order, masterclass=self.masterclass, event=self.event, quantity=quantity, price=Decimal('800.00')
+        )
+        if certificates:
+            OrderItem.objects.create(order=order, quantity=certificates, price=Decimal('1000.00'), is_certificate=True)
+        return order
+
+    def test_full_rebuild(self):
+        """Test revenue, seats, certificates and occupancy of a day"""
+        self._order(2, certificates=1)
+        self._order(1)
+        self._order(5, status='cancelled')
+
+        out = StringIO()
+        call_command('update_sales_rollups', full=True, stdout=out)
+
+        row = DailySalesRollup.objects.get(day=self.today, masterclass=self.masterclass)
+        self.assertEqual(row.orders_count, 2)
+        self.assertEqual(row.revenue, Decimal('2400.00'))
+        self.assertEqual(row.seats_sold, 3)
+        self.assertEqual((row.seats_available, row.seats_occupied), (10, 3))
+        self.assertAlmostEqual(row.occupancy_ratio, 0.3)
+        certificates = DailySalesRollup.objects.get(day=self.today, masterclass__isnull=True)
+        self.assertEqual(certificates.certificates_sold, 1)
+        self.assertEqual(certificates.revenue, Decimal('1000.00'))
+        self.assertIn('Rebuilt 1 days', out.getvalue())
+
+    def test_incremental_update_only_touches_changed_days(self):
+        """Test that an incremental run rebuilds only days with changed orders"""
+        old = self._order(1)
+        old_day = self.today - timedelta(days=10)
+        Order.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=10))
+        update_rollups(full=True)
+        self.assertTrue(DailySalesRollup.objects.filter(day=old_day).exists())
+
+        # Later: the watermark is past the old order, a new order arrives today
+        RollupWatermark.objects.update(value=timezone.now() + timedelta(hours=1))
+        Order.objects.filter(pk=old.pk).update(updated_at=timezone.now() - timedelta(days=10))
+        self._order(2)
+        Order.objects.filter(user=self.user).exclude(pk=old.pk).update(updated_at=timezone.now() + timedelta(hours=2))
+
+        days, _ = update_rollups()
+
+        self.assertEqual(days, 1)
+        self.assertEqual(DailySalesRollup.objects.get(day=self.today, masterclass=self.masterclass).seats_sold, 2)
+        self.assertEqual(DailySalesRollup.objects.get(day=old_day, masterclass=self.masterclass).seats_sold, 1)
+
+    def test_report_api(self):
+        """Test that the report serves rollup rows and totals to admins only"""
+        self._order(2)
+        update_rollups(full=True)
+        client = APIClient()
+        url = reverse('daily-sales-report')
+
+        client.force_authenticate(user=self.user)
+        self.assertEqual(client.get(url).status_code, 403)
+
+        admin = User.objects.create_superuser(username='boss@example.com', email='boss@example.com', password='x')
+        client.force_authenticate(user=admin)
+        with self.assertNumQueries(2):
+            response = client.get(url, {'masterclass': self.masterclass.id})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['rows']), 1)
+        self.assertEqual(response.data['rows'][0]['masterclass_name'], 'Rollup Masterclass')
+        self.assertEqual(response.data['totals']['seats_sold'], 2)
+        self.assertAlmostEqual(response.data['totals']['occupancy_ratio'], 0.3)
+
+        for params in ({'masterclass': 'abc'}, {'date_from': '01.02.2024'}, {'date_to': '2024-13-45'}):
+            self.assertEqual(client.get(url, params).status_code, 400, params)
@@ -0,0 +1,170 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management import call_command
+from django.test import TestCase, RequestFactory, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from masterclasses.models import MasterClass, Event, SeatsUnavailable
+from orders.models import Cart, CartItem, SeatHold
+from orders.utils import Cart as SessionCart
+
+User = get_user_model()
+
+
+class SeatHoldTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='hold@example.com',
+            email='hold@example.com',
+            password='testpass123'
+        )
+        self.masterclass = MasterClass.objects.create(
+            name='Hold Masterclass',
+            short_description='Hold Description',
+            start_price=Decimal('1000.00'),
+            final_price=Decimal('800.00'),
+        )
+        self.event = Event.objects.create(
+            masterclass=self.masterclass,
+            start_datetime=timezone.now() + timedelta(days=3),
+            available_seats=3
+        )
+
+    def _expire(self, hold):
+        SeatHold.objects.filter(pk=hold.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+    def test_place_resize_and_release(self):
+        """Test that a hold claims only the difference when resized and frees seats on release"""
+        SeatHold.objects.place(self.event.id, 2, user=self.user)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.held_seats, 2)
+        self.assertEqual(self.event.get_remaining_seats(), 1)
+
+        SeatHold.objects.place(self.event.id, 3, user=self.user)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.held_seats, 3)
+        self.assertEqual(SeatHold.objects.filter(event=self.event).count(), 1)
+
+        SeatHold.objects.place(self.event.id, 1, user=self.user)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.held_seats, 1)
+
+        SeatHold.objects.release(user=self.user)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.held_seats, 0)
+        self.assertFalse(SeatHold.objects.exists())
+
+    def test_hold_beyond_capacity_is_rejected(self):
+        """Test that other carts cannot hold seats that are already held"""
+        SeatHold.objects.place(self.event.id, 2, session_key='a' * 32)
+        with self.assertRaises(SeatsUnavailable):
+            SeatHold.objects.place(self.event.id, 2, session_key='b' * 32)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.held_seats, 2)
+
+    def test_expired_hold_is_reclaimed_on_demand(self):
+        """Test that an expired hold of another cart does not block a new one"""
+        stale = SeatHold.objects.place(self.event.id, 3, session_key='a' * 32)
+        self._expire(stale)
+
+        SeatHold.objects.place(self.event.id, 2, user=self.user)
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.held_seats, 2)
+        self.assertFalse(SeatHold.objects.filter(pk=stale.pk).exists())
+
+    def test_sweeper_releases_expired_holds(self):
+        """Test that release_expired_holds frees seats of expired holds only"""
+        stale = SeatHold.objects.place(self.event.id, 2, session_key='a' * 32)
+        SeatHold.objects.place(self.event.id, 1, user=self.user)
+        self._expire(stale)
+
+        out = StringIO()
+        call_command('release_expired_holds', stdout=out)
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.held_seats, 1)
+        self.assertEqual(list(SeatHold.objects.values_list('user', flat=True)), [self.user.id])
+        self.assertIn('Released 1 expired holds', out.getvalue())
+
+    def test_checkout_converts_holds(self):
+        """Test that checkout turns the cart's held seats into occupied seats"""
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        client.post(reverse('add-to-cart', kwargs={
+            'user_id': self.user.id, 'product_unit_id': self.event.id, 'guests_amount': 3
+        }))
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.held_seats, 3)
+
+        # Fully held by this cart, so the seats stay available to it
+        data = client.get(reverse('cart', kwargs={'user_id': self.user.id})).data
+        self.assertTrue(all(item['availability'] for item in data['product_units']))
+
+        response = client.post(reverse('checkout-order', kwargs={'user_id': self.user.id}), {'email': 'hold@example.com'}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.occupied_seats, 3)
+        self.assertEqual(self.event.held_seats, 0)
+        self.assertFalse(SeatHold.objects.exists())
+
+    def test_add_to_cart_rejected_when_seats_held_elsewhere(self):
+        """Test that adding to cart fails while another cart holds the seats"""
+        SeatHold.objects.place(self.event.id, 2, session_key='a' * 32)
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        response = client.post(reverse('add-to-cart', kwargs={
+            'user_id': self.user.id, 'product_unit_id': self.event.id, 'guests_amount': 2
+        }))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Not enough seats available')
+        cart = Cart.objects.filter(user=self.user).first()
+        self.assertFalse(cart and CartItem.objects.filter(cart=cart).exists())
+
+    def test_deleting_user_releases_holds(self):
+        """Test that deleting a user gives their held seats back to the event"""
+        SeatHold.objects.place(self.event.id, 2, user=self.user)
+        self.user.delete()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.held_seats, 0)
+        self.assertFalse(SeatHold.objects.exists())
+
+    def test_expired_cart_releases_holds(self):
+        """Test that clearing an expired cart also releases its holds"""
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, event=self.event, quantity=2)
+        SeatHold.objects.place(self.event.id, 2, user=self.user)
+        Cart.objects.filter(pk=cart.pk).update(updated_at=timezone.now() - timedelta(days=31))
+        request = RequestFactory().get('/')
+        request.user = self.user
+        request.session = SessionStore()
+
+        with override_settings(CART_TTL_DAYS=30):
+            self.assertEqual(SessionCart(request).get_items(), [])
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.held_seats, 0)
+
+    def test_failed_cart_write_rolls_back_the_hold(self):
+        """Test that a hold is not left behind when adding the event to the cart fails"""
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        with mock.patch.object(SessionCart, 'add', side_effect=RuntimeError('cart write failed')):
+            response = client.post(reverse('add-to-cart', kwargs={
+                'user_id': self.user.id, 'product_unit_id': self.event.id, 'guests_amount': 2
+            }))
+
+        self.assertEqual(response.status_code, 400)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.held_seats, 0)
+        self.assertFalse(SeatHold.objects.exists())
@@ -5,19 +5,37 @@ from masterclasses.models import MasterClass, Event
 from certificates.models import Certificate
 from django.utils import timezone
 from users.models import UserProfile
-from orders.models import Cart as DB_Cart, CartItem as DB_CartItem
+from orders.models import Cart as DB_Cart, CartItem as DB_CartItem, SeatHold
 
 class Cart:
     def __init__(self, request):
         self.request = request
         self.user = request.user if request.user.is_authenticated else None
         if self.user:
-            self.cart_obj, _ = DB_Cart.objects.get_or_create(user=self.user)
+            self.cart_obj, created = DB_Cart.objects.get_or_create(user=self.user)
             self.is_authenticated = True
+            if not created and self.cart_obj.is_expired():
+                # Корзина просрочена, но ещё не удалена purge_stale_carts
+                SeatHold.objects.release(user=self.user)
+                self.cart_obj.items.all().delete()
+                self.cart_obj.touch()
         else:
             self.cart = request.session.get('cart', {})
             self.is_authenticated = False
 
+    def hold_owner(self, create_session=False):
+        """Keyword arguments identifying this cart's seat holds."""
+        if self.is_authenticated:
+            return {'user': self.user}
+        session = self.request.session
+        if session.session_key is None and create_session:
+            session.save()
+        return {'session_key': session.session_key}
+
+    def hold(self, event_id, quantity):
+        """Holds quantity seats of the event for this cart (0 releases); raises SeatsUnavailable."""
+        return SeatHold.objects.place(event_id, quantity, **self.hold_owner(create_session=quantity > 0))
+
     def add(self, item_type, item_id, quantity=1, user=None):
         if self.is_authenticated:
             if item_type == 'event':
@@ -36,6 +54,7 @@ class Cart:
                     cart_item.save()
                 except Certificate.DoesNotExist:
                     return False
+            self.cart_obj.touch()
             return True
         else:
             # Старая логика для анонимных
@@ -66,11 +85,14 @@ class Cart:
             return True
 
     def remove(self, item_type, item_id):
+        if item_type == 'event':
+            SeatHold.objects.release(event_id=item_id, **self.hold_owner())
         if self.is_authenticated:
             if item_type == 'event':
                 DB_CartItem.objects.filter(cart=self.cart_obj, event_id=item_id).delete()
             elif item_type == 'certificate':
                 DB_CartItem.objects.filter(cart=self.cart_obj, certificate_id=item_id).delete()
+            self.cart_obj.touch()
         else:
             for key, item in list(self.cart.items()):
                 if item['type'] == item_type and str(item['id']) == str(item_id):
@@ -83,6 +105,7 @@ class Cart:
                 DB_CartItem.objects.filter(cart=self.cart_obj, event_id=item_id).update(quantity=quantity)
             elif item_type == 'certificate':
                 DB_CartItem.objects.filter(cart=self.cart_obj, certificate_id=item_id).update(quantity=quantity)
+            self.cart_obj.touch()
         else:
             for key, item in self.cart.items():
                 if item['type'] == item_type and str(item['id']) == str(item_id):
@@ -93,8 +116,10 @@ class Cart:
             self.save()
 
     def clear(self):
+        SeatHold.objects.release(**self.hold_owner())
         if self.is_authenticated:
             self.cart_obj.items.all().delete()
+            self.cart_obj.touch()
         else:
             self.cart = {}
             self.save()
@@ -120,13 +145,15 @@ class Cart:
 
     def get_items(self):
         items = []
+        # Seats this cart already holds are available to it regardless of other carts
+        held = SeatHold.objects.held_quantities(**self.hold_owner())
         if self.is_authenticated:
             for cart_item in self.cart_obj.items.all():
                 if cart_item.event:
                     event = cart_item.event
                     masterclass = event.masterclass
                     guests_amount = cart_item.quantity
-                    availability = event.get_remaining_seats() >= guests_amount
+                    availability = event.get_remaining_seats() + held.get(event.id, 0) >= guests_amount
                     params = masterclass.parameters
                     address = ''
                     contacts = ''
@@ -189,7 +216,7 @@ class Cart:
                         event = Event.objects.get(id=item_data['id'])
                         masterclass = event.masterclass
                         guests_amount = item_data['quantity']
-                        availability = event.get_remaining_seats() >= guests_amount
+                        availability = event.get_remaining_seats() + held.get(event.id, 0) >= guests_amount
                         params = masterclass.parameters
                         address = ''
                         contacts = ''
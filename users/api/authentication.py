@@ -1,27 +1,156 @@
-from rest_framework.authentication import TokenAuthentication
+from rest_framework.authentication import (
+    BaseAuthentication,
+    BasicAuthentication,
+    SessionAuthentication,
+    TokenAuthentication,
+    get_authorization_header,
+)
 from rest_framework.exceptions import AuthenticationFailed
-from django.utils import timezone
-from datetime import timedelta
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django.conf import settings
+from django.core.cache import cache
+
+from lesjours import metrics
+from users.models import get_token_expiry_cutoff, token_cache_key
+from users.revocation import revocation_list
 
 
 class ExpiringTokenAuthentication(TokenAuthentication):
     """
     Custom token authentication that includes token expiration.
+
+    The token's creation time and its user's fields (without the password)
+    are cached for AUTH_TOKEN_CACHE_SECONDS, so repeated requests with the
+    same token do not query the database. Saving the user or deleting the
+    token drops the entry, but only in the cache this process uses: with the
+    per-process locmem default other workers may keep accepting the token for
+    up to AUTH_TOKEN_CACHE_SECONDS. Expired tokens are rejected here and
+    deleted in batches by purge_expired_tokens.
     """
 
     def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        entry = cache.get(cache_key)
+        if entry is None:
+            entry = self.load_token(key)
+            cache.set(cache_key, entry, settings.AUTH_TOKEN_CACHE_SECONDS)
+
+        created, fields = entry
+        if not fields['is_active']:
+            raise AuthenticationFailed('User inactive or deleted')
+
+        if created < get_token_expiry_cutoff():
+            raise AuthenticationFailed('Token has expired')
+
+        User = get_user_model()
+        names = [f.attname for f in User._meta.concrete_fields if f.attname in fields]
+        user = User.from_db(DEFAULT_DB_ALIAS, names, [fields[name] for name in names])
+        return (user, self.get_model()(key=key, user=user, created=created))
+
+    def load_token(self, key):
         model = self.get_model()
         try:
             token = model.objects.select_related('user').get(key=key)
         except model.DoesNotExist:
             raise AuthenticationFailed('Invalid token')
 
-        if not token.user.is_active:
-            raise AuthenticationFailed('User inactive or deleted')
+        fields = {
+            f.attname: getattr(token.user, f.attname)
+            for f in token.user._meta.concrete_fields
+            if f.attname != 'password'
+        }
+        return token.created, fields
 
-        # Check if token has expired (24 hours)
-        if token.created < timezone.now() - timedelta(hours=24):
-            token.delete()
-            raise AuthenticationFailed('Token has expired')
 
-        return (token.user, token) 
\ No newline at end of file
+class RevocableJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that also rejects tokens on the revocation list."""
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if revocation_list.is_revoked(validated_token[jwt_settings.JTI_CLAIM]):
+            raise InvalidToken('Token has been revoked')
+        return validated_token
+
+
+class StatelessJWTAuthentication(RevocableJWTAuthentication):
+    """
+    JWT authentication that builds the user from the token claims instead of
+    loading the row. The result is a regular User instance with only the
+    claim fields loaded; any other field (is_staff, email, ...) is fetched
+    from the database the first time it is read, and related lookups such as
+    user.profile or filter(user=request.user) work unchanged.
+
+    Deactivated users keep access until their token expires, so this is only
+    meant for read-only endpoints.
+    """
+    claim_fields = ('username', 'first_name', 'last_name')
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        User = get_user_model()
+        claims = {jwt_settings.USER_ID_FIELD: user_id}
+        for field in self.claim_fields:
+            if field in validated_token:
+                claims[field] = validated_token[field]
+        # from_db expects the values in model field order
+        fields = [f.attname for f in User._meta.concrete_fields if f.attname in claims]
+        user = User.from_db(DEFAULT_DB_ALIAS, fields, [claims[f] for f in fields])
+        user.token_claims = validated_token.payload
+        return user
+
+
+class DispatchingAuthentication(BaseAuthentication):
+    """
+    Runs exactly one backend, chosen by the Authorization header prefix:
+    Basic, Token or the JWT header types (Bearer). Requests without the
+    header use the session. This replaces trying Session, Basic, Token and
+    JWT one after another on every request.
+
+    Each backend's duration is recorded in lesjours.metrics as auth.<scheme>.
+    """
+    session_backend = SessionAuthentication
+    stateless_reads = False
+
+    def __init__(self):
+        self.session = self.session_backend()
+        self.backends = {
+            b'basic': ('basic', BasicAuthentication()),
+            ExpiringTokenAuthentication.keyword.lower().encode(): ('token', ExpiringTokenAuthentication()),
+        }
+        jwt = RevocableJWTAuthentication()
+        for header_type in jwt_settings.AUTH_HEADER_TYPES:
+            self.backends[header_type.lower().encode()] = ('jwt', jwt)
+        self.stateless_jwt = StatelessJWTAuthentication()
+
+    def authenticate(self, request):
+        parts = get_authorization_header(request).split(None, 1)
+        scheme, backend = 'session', self.session
+        if parts:
+            # Unknown schemes (and blank headers) fall back to the session, as the chain did
+            scheme, backend = self.backends.get(parts[0].lower(), (scheme, backend))
+        if scheme == 'jwt' and self.stateless_reads and request.method in SAFE_METHODS:
+            scheme, backend = 'jwt_stateless', self.stateless_jwt
+        with metrics.timer(f'auth.{scheme}'):
+            return backend.authenticate(request)
+
+    def authenticate_header(self, request):
+        # Same as the session-first chain: unauthenticated requests get 403, not 401
+        return None
+
+
+class StatelessReadAuthentication(DispatchingAuthentication):
+    """
+    DispatchingAuthentication for read-mostly views such as the catalog:
+    GET/HEAD/OPTIONS with a JWT use StatelessJWTAuthentication, everything
+    else authenticates as usual.
+    """
+    stateless_reads = True
@@ -1,9 +1,9 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from ..models import UserProfile
+from ..models import UserProfile, LastSeenMasterClass
 from django.core.validators import RegexValidator
+from django.db import transaction
 from rest_framework.validators import UniqueValidator
-import json
 
 
 class UserProfileSerializer(serializers.ModelSerializer):
@@ -13,42 +13,37 @@ class UserProfileSerializer(serializers.ModelSerializer):
         read_only_fields = ['cart']
 
 
+class LastSeenCardSerializer(serializers.ModelSerializer):
+    """Compact masterclass card for the "recently viewed" strip."""
+    id = serializers.IntegerField(source='masterclass.id')
+    name = serializers.CharField(source='masterclass.name')
+    slug = serializers.CharField(source='masterclass.slug')
+    image = serializers.SerializerMethodField()
+    price = serializers.SerializerMethodField()
+
+    class Meta:
+        model = LastSeenMasterClass
+        fields = ['id', 'name', 'slug', 'image', 'price', 'seen_at']
+
+    def get_image(self, obj):
+        links = obj.masterclass.bucket_link
+        if isinstance(links, list):
+            links = links[0] if links else None
+        if isinstance(links, dict):
+            links = links.get('url')
+        return links or None
+
+    def get_price(self, obj):
+        return {
+            'start_price': obj.masterclass.start_price,
+            'final_price': obj.masterclass.final_price
+        }
+
+
 class LoginSerializer(serializers.Serializer):
     username = serializers.EmailField()
     password = serializers.CharField(write_only=True)
 
-    def to_internal_value(self, data):
-        import json
-        # Если data — QueryDict с одним ключом, который похож на JSON-строку
-        if isinstance(data, dict) and len(data) == 1:
-            key = next(iter(data.keys()))
-            try:
-                json_data = json.loads(key)
-                if isinstance(json_data, dict):
-                    return super().to_internal_value(json_data)
-            except json.JSONDecodeError:
-                pass
-        # Если data — строка (например, всё тело — JSON-строка)
-        if isinstance(data, str):
-            try:
-                json_data = json.loads(data)
-                if isinstance(json_data, dict):
-                    return super().to_internal_value(json_data)
-            except json.JSONDecodeError:
-                pass
-        # Если data — dict с одним ключом 'data', внутри которого JSON-строка
-        if isinstance(data, dict) and 'data' in data and isinstance(data['data'], str):
-            try:
-                json_data = json.loads(data['data'])
-                if isinstance(json_data, dict):
-                    return super().to_internal_value(json_data)
-            except json.JSONDecodeError:
-                pass
-        # Обычная обработка form-urlencoded
-        if isinstance(data, dict) and all(isinstance(v, list) for v in data.values()):
-            data = {k: v[0] if v else None for k, v in data.items()}
-        return super().to_internal_value(data)
-
 
 class RegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -66,39 +61,6 @@ class RegistrationSerializer(serializers.ModelSerializer):
         model = get_user_model()
         fields = ['username', 'password', 'first_name', 'last_name', 'phone', 'gender', 'is_mailing_list']
 
-    def to_internal_value(self, data):
-        print('DEBUG REGISTRATION DATA:', data)
-        import json
-        # Если data — QueryDict с одним ключом, который похож на JSON-строку
-        if isinstance(data, dict) and len(data) == 1:
-            key = next(iter(data.keys()))
-            try:
-                json_data = json.loads(key)
-                if isinstance(json_data, dict):
-                    return super().to_internal_value(json_data)
-            except json.JSONDecodeError:
-                pass
-        # Если data — строка (например, всё тело — JSON-строка)
-        if isinstance(data, str):
-            try:
-                json_data = json.loads(data)
-                if isinstance(json_data, dict):
-                    return super().to_internal_value(json_data)
-            except json.JSONDecodeError:
-                pass
-        # Если data — dict с одним ключом 'data', внутри которого JSON-строка
-        if isinstance(data, dict) and 'data' in data and isinstance(data['data'], str):
-            try:
-                json_data = json.loads(data['data'])
-                if isinstance(json_data, dict):
-                    return super().to_internal_value(json_data)
-            except json.JSONDecodeError:
-                pass
-        # Обычная обработка form-urlencoded
-        if isinstance(data, dict) and all(isinstance(v, list) for v in data.values()):
-            data = {k: v[0] if v else None for k, v in data.items()}
-        return super().to_internal_value(data)
-
     def validate_gender(self, value):
         gender_mapping = {
             'male': 'male',
@@ -117,24 +79,22 @@ class RegistrationSerializer(serializers.ModelSerializer):
         phone = validated_data.pop('phone')
         gender = self.validate_gender(validated_data.pop('gender')) 
         is_mailing_list = validated_data.pop('is_mailing_list')
-        
-        user = get_user_model().objects.create_user(
-            username=validated_data['username'].lower().strip(),
-            email=validated_data['username'].lower().strip(),
-            password=validated_data['password'],
+        email = validated_data['username'].lower().strip()
+
+        # Same as create_user(), but written as one INSERT for the user and one for the
+        # fully populated profile. save_base(raw=True) makes create_user_profile skip
+        # its empty profile, as it does for fixtures
+        User = get_user_model()
+        user = User(
+            username=User.normalize_username(email),
+            email=User.objects.normalize_email(email),
             first_name=validated_data['first_name'],
             last_name=validated_data['last_name']
         )
-        
-        # Явно создаём профиль, если он не был создан
-        if not hasattr(user, 'profile'):
-            UserProfile.objects.create(user=user)
-        
-        user.profile.gender = gender
-        user.profile.phone = phone
-        user.profile.is_mailing_list = is_mailing_list
-        user.profile.save()
-        
+        user.set_password(validated_data['password'])
+        with transaction.atomic():
+            user.save_base(raw=True)
+            UserProfile.objects.create(user=user, gender=gender, phone=phone, is_mailing_list=is_mailing_list)
         return user
 
 
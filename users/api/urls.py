@@ -2,9 +2,9 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     UserProfileViewSet, RegistrationView, LoginView, CustomTokenRefreshView,
-    UserInfoView, UserLastSeenView, ChangePasswordView
+    UserInfoView, UserLastSeenView, ChangePasswordView, TokenRevokeView
 )
-from .wishlist_views import WishlistView
+from .wishlist_views import WishlistView, WishlistBulkView
 
 router = DefaultRouter()
 router.register(r'profiles', UserProfileViewSet, basename='profile')
@@ -14,8 +14,10 @@ urlpatterns = [
     path('register/', RegistrationView.as_view(), name='register'),
     path('login/', LoginView.as_view(), name='login'),
     path('token/refresh/', CustomTokenRefreshView.as_view(), name='user_token_refresh'),
+    path('token/revoke/', TokenRevokeView.as_view(), name='user_token_revoke'),
     path('wishlist/<int:id>/', WishlistView.as_view(), name='wishlist'),
     path('wishlist/<int:id>/<int:product_id>/', WishlistView.as_view(), name='wishlist-item'),
+    path('wishlist/<int:id>/bulk/', WishlistBulkView.as_view(), name='wishlist-bulk'),
     path('user_info/<int:id>/', UserInfoView.as_view(), name='user_info'),
     path('last_seen/<int:id>/', UserLastSeenView.as_view(), name='last_seen'),
     path('change_pwd_lk/<int:id>/', ChangePasswordView.as_view(), name='change_password'),
@@ -3,12 +3,15 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.authtoken.models import Token
+from django.conf import settings
 from django.contrib.auth import get_user_model, authenticate
+from django.core.cache import cache
+from django.db import transaction
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from .serializers import UserSerializer, UserProfileSerializer, RegistrationSerializer, LoginSerializer
+from .serializers import UserSerializer, UserProfileSerializer, RegistrationSerializer, LoginSerializer, LastSeenCardSerializer
 from .permissions import IsProfileOwner
-from ..models import UserProfile
+from ..models import UserProfile, LastSeenMasterClass, user_info_cache_key
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from datetime import datetime
@@ -16,6 +19,12 @@ from masterclasses.models import MasterClass
 from masterclasses.api.serializers import MasterClassSerializer
 from rest_framework import serializers
 from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from users import last_seen
+from users.hashers import PasswordHashingBusy
+from lesjours.parsers import RequestTooLarge
+from users.revocation import revocation_list
 import logging
 
 User = get_user_model()
@@ -24,6 +33,7 @@ logger = logging.getLogger(__name__)
 
 class RegistrationView(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'auth'
 
     @swagger_auto_schema(
         operation_description="Register a new user",
@@ -62,6 +72,8 @@ class RegistrationView(APIView):
         except serializers.ValidationError as e:
             print("DEBUG: Validation error:", str(e))
             return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
+        except (PasswordHashingBusy, RequestTooLarge):
+            raise
         except Exception as e:
             print("DEBUG: Unexpected error:", str(e))
             import traceback
@@ -73,6 +85,7 @@ class RegistrationView(APIView):
 
 class LoginView(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'auth'
 
     @swagger_auto_schema(
         operation_description="Login user",
@@ -113,6 +126,8 @@ class LoginView(APIView):
                 'first_name': user.first_name,
                 'last_name': user.last_name
             })
+        except (PasswordHashingBusy, RequestTooLarge):
+            raise
         except Exception as e:
             return Response(
                 {'error': 'Invalid password'},
@@ -341,6 +356,7 @@ class UserProfileViewSet(viewsets.ModelViewSet):
 
 class CustomTokenRefreshView(APIView):
     permission_classes = [AllowAny]
+    throttle_scope = 'token_refresh'
     
     @swagger_auto_schema(
         operation_description="Refresh token",
@@ -365,78 +381,8 @@ class CustomTokenRefreshView(APIView):
         }
     )
     def post(self, request):
-        # Основная логика для обработки JSON-объекта с фигурными скобками в формате x-www-form-urlencoded
-        refresh_token = None
-        
-        # Если содержимое запроса - это форма с фигурными скобками JSON
-        if request.content_type == 'application/x-www-form-urlencoded':
-            # Сначала проверяем, есть ли данные в форме
-            raw_data = None
-            
-            # Проверяем, есть ли данные в ключах формы
-            if len(request.POST) == 1 and '{' in list(request.POST.keys())[0]:
-                # Если ключ - это JSON-строка с фигурными скобками
-                raw_data = list(request.POST.keys())[0]
-            elif len(request.POST) == 0 and request.body:
-                # Если POST пуст, но есть тело запроса
-                try:
-                    raw_data = request.body.decode('utf-8')
-                except:
-                    pass
-                    
-            # Пытаемся распарсить JSON
-            if raw_data and raw_data.startswith('{'):
-                try:
-                    import json
-                    json_data = json.loads(raw_data)
-                    if 'refresh' in json_data:
-                        refresh_token = json_data.get('refresh')
-                except:
-                    pass
-        
-        # Стандартные проверки, если токен не найден выше
-        if not refresh_token:
-            # Проверяем все возможные источники данных
-            sources = [
-                # Form-data обычный ключ refresh
-                lambda: request.POST.get('refresh') if hasattr(request, 'POST') else None,
-                # JSON в body
-                lambda: request.data.get('refresh') if hasattr(request, 'data') and hasattr(request.data, 'get') else None,
-                # JSON в виде словаря
-                lambda: request.data.get('refresh') if isinstance(request.data, dict) else None,
-                # Строка в body
-                lambda: getattr(request, '_body', b'').decode('utf-8') if hasattr(request, '_body') else None
-            ]
-            
-            # Пробуем извлечь токен из различных источников
-            for source_func in sources:
-                try:
-                    possible_token = source_func()
-                    if possible_token:
-                        if isinstance(possible_token, str) and possible_token.startswith('{'):
-                            # Если это JSON-строка
-                            try:
-                                import json
-                                json_data = json.loads(possible_token)
-                                if 'refresh' in json_data:
-                                    refresh_token = json_data.get('refresh')
-                                    break
-                            except:
-                                pass
-                        else:
-                            refresh_token = possible_token
-                            break
-                except:
-                    continue
-        
-        # Если токен - строка JSON
-        if not refresh_token and isinstance(request.data, str):
-            try:
-                import json
-                json_data = json.loads(request.data)
-                refresh_token = json_data.get('refresh')
-            except:
-                pass
+        # JSON, обычная форма и JSON внутри формы разбираются парсерами (lesjours.parsers)
+        refresh_token = request.data.get('refresh') if hasattr(request.data, 'get') else None
         
         # Проверяем наличие токена
         if not refresh_token:
@@ -445,6 +391,8 @@ class CustomTokenRefreshView(APIView):
         # Обрабатываем токен
         try:
             token = RefreshToken(refresh_token)
+            if revocation_list.is_revoked(token[jwt_settings.JTI_CLAIM]):
+                raise TokenError('Token has been revoked')
             access_token = str(token.access_token)
             
             return Response({
@@ -455,142 +403,163 @@ class CustomTokenRefreshView(APIView):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+class TokenRevokeView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Revoke the JWT used for this request and, optionally, a refresh token",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'refresh': openapi.Schema(type=openapi.TYPE_STRING, description='Refresh token to revoke')
+            }
+        ),
+        responses={
+            200: openapi.Response(
+                description="Tokens revoked",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'revoked': openapi.Schema(type=openapi.TYPE_INTEGER)
+                    }
+                )
+            ),
+            400: "Bad Request"
+        }
+    )
+    def post(self, request):
+        tokens = []
+        if isinstance(request.auth, AccessToken):
+            tokens.append(request.auth)
+
+        refresh_token = request.data.get('refresh') if hasattr(request.data, 'get') else None
+        if refresh_token:
+            try:
+                refresh = RefreshToken(refresh_token)
+            except TokenError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            if str(refresh.get(jwt_settings.USER_ID_CLAIM)) != str(request.user.pk):
+                return Response({'error': 'Token belongs to another user'}, status=status.HTTP_400_BAD_REQUEST)
+            tokens.append(refresh)
+
+        if not tokens:
+            return Response({'error': 'No token to revoke'}, status=status.HTTP_400_BAD_REQUEST)
+
+        for token in tokens:
+            revocation_list.revoke(token)
+        logger.info('Revoked %d token(s) for user %s', len(tokens), request.user.pk)
+        return Response({'revoked': len(tokens)})
+
+def user_info_data(user):
+    profile = user.profile
+    return {
+        'id': user.id,
+        'formatted_happy_birthday_date': profile.birth_date.strftime('%d.%m.%Y') if profile.birth_date else None,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'email': user.email,
+        'phone_number': profile.phone,
+        'gender': {
+            'id': 1 if profile.gender == 'male' else 2,
+            'name': 'M' if profile.gender == 'male' else 'F'
+        }
+    }
+
+
+def assign_changed(instance, values):
+    """Sets the values that differ from the instance and returns their field names."""
+    changed = [field for field, value in values.items() if getattr(instance, field) != value]
+    for field in changed:
+        setattr(instance, field, values[field])
+    return changed
+
+
 class UserInfoView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request, id):
-        logger.debug(f"GET UserInfoView: Получен запрос для пользователя ID={id}")
-        try:
-            user = User.objects.get(id=id)
-            profile = user.profile
-            
-            response_data = {
-                'id': user.id,
-                'formatted_happy_birthday_date': profile.birth_date.strftime('%d.%m.%Y') if profile.birth_date else None,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'email': user.email,
-                'phone_number': profile.phone,
-                'gender': {
-                    'id': 1 if profile.gender == 'male' else 2,
-                    'name': 'M' if profile.gender == 'male' else 'F'
-                }
-            }
-            logger.debug(f"GET UserInfoView: Возвращены данные для пользователя ID={id}: {response_data}")
-            return Response(response_data)
-        except User.DoesNotExist:
-            logger.warning(f"GET UserInfoView: Пользователь с ID={id} не найден")
-            return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+        response_data = cache.get(user_info_cache_key(id))
+        if response_data is None:
+            try:
+                user = User.objects.select_related('profile').get(id=id)
+            except User.DoesNotExist:
+                logger.warning(f"GET UserInfoView: Пользователь с ID={id} не найден")
+                return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+            response_data = user_info_data(user)
+            cache.set(user_info_cache_key(id), response_data, settings.USER_INFO_CACHE_SECONDS)
+        return Response(response_data)
     
     def post(self, request, id):
-        logger.debug(f"POST UserInfoView: Получен запрос обновления данных для пользователя ID={id}. Данные: {request.data}")
         try:
-            user = User.objects.get(id=id)
-            profile = user.profile
-            
-            # Сохраняем старые значения для логирования
-            old_values = {
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'email': user.email,
-                'username': user.username,
-                'gender': profile.gender,
-                'phone': profile.phone,
-                'birth_date': profile.birth_date.strftime('%d.%m.%Y') if profile.birth_date else None
-            }
-            
-            # Update user fields
-            user.first_name = request.data.get('first_name', user.first_name)
-            user.last_name = request.data.get('last_name', user.last_name)
-            user.email = request.data.get('email', user.email)
-            user.username = request.data.get('username', user.username)
-            
-            # Update profile fields
-            gender = request.data.get('gender', profile.gender)
-            if gender in ['M', 'F']:
-                gender = 'male' if gender == 'M' else 'female'
-            profile.gender = gender
-            
-            # Update phone number
-            if 'phone' in request.data:
-                profile.phone = request.data.get('phone')
-            
-            if 'date' in request.data:
-                try:
-                    profile.birth_date = datetime.strptime(request.data['date'], '%d.%m.%Y').date()
-                except ValueError:
-                    logger.error(f"POST UserInfoView: Некорректный формат даты: {request.data['date']}")
-                    return Response({'error': 'Invalid date format'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            user.save()
-            profile.save()
-            
-            # Собираем новые значения для логирования
-            new_values = {
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'email': user.email,
-                'username': user.username,
-                'gender': profile.gender,
-                'phone': profile.phone,
-                'birth_date': profile.birth_date.strftime('%d.%m.%Y') if profile.birth_date else None
-            }
-            
-            # Логируем изменения
-            changes = {field: {'old': old_values[field], 'new': new_values[field]} 
-                      for field in old_values if old_values[field] != new_values[field]}
-            logger.info(f"POST UserInfoView: Обновлены данные пользователя ID={id}. Изменения: {changes}")
-            
-            # Return the same format as GET method
-            response_data = {
-                'id': user.id,
-                'formatted_happy_birthday_date': profile.birth_date.strftime('%d.%m.%Y') if profile.birth_date else None,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'email': user.email,
-                'phone_number': profile.phone,
-                'gender': {
-                    'id': 1 if profile.gender == 'male' else 2,
-                    'name': 'M' if profile.gender == 'male' else 'F'
-                }
-            }
-            logger.debug(f"POST UserInfoView: Возвращаемые данные: {response_data}")
-            return Response(response_data)
+            user = User.objects.select_related('profile').get(id=id)
         except User.DoesNotExist:
             logger.warning(f"POST UserInfoView: Пользователь с ID={id} не найден")
             return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+        profile = user.profile
+
+        user_values = {
+            field: request.data[field]
+            for field in ('first_name', 'last_name', 'email', 'username')
+            if field in request.data
+        }
+        profile_values = {}
+        if 'gender' in request.data:
+            gender = request.data['gender']
+            if gender in ['M', 'F']:
+                gender = 'male' if gender == 'M' else 'female'
+            profile_values['gender'] = gender
+        if 'phone' in request.data:
+            profile_values['phone'] = request.data.get('phone')
+        if 'date' in request.data:
+            try:
+                profile_values['birth_date'] = datetime.strptime(request.data['date'], '%d.%m.%Y').date()
+            except ValueError:
+                logger.error(f"POST UserInfoView: Некорректный формат даты: {request.data['date']}")
+                return Response({'error': 'Invalid date format'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Only changed columns are written; saving drops the cached user info
+        user_fields = assign_changed(user, user_values)
+        profile_fields = assign_changed(profile, profile_values)
+        with transaction.atomic():
+            if user_fields:
+                user.save(update_fields=user_fields)
+            if profile_fields:
+                profile.save(update_fields=profile_fields)
+
+        if user_fields or profile_fields:
+            logger.info(f"POST UserInfoView: Обновлены поля пользователя ID={id}: {user_fields + profile_fields}")
+        return Response(user_info_data(user))
 
 class UserLastSeenView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request, id):
-        try:
-            user = User.objects.get(id=id)
-            last_seen = user.profile.last_seen_masterclasses.all()
-            serializer = MasterClassSerializer(last_seen, many=True)
-            return Response(serializer.data)
-        except User.DoesNotExist:
-            return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+        if str(request.user.pk) != str(id):
+            return Response({'error': 'User ID mismatch'}, status=status.HTTP_403_FORBIDDEN)
+        last_seen.flush_pending(request.user.pk)
+        recent = (
+            LastSeenMasterClass.objects.filter(user_id=request.user.pk)
+            .select_related('masterclass')
+            .only('seen_at', 'masterclass__id', 'masterclass__name', 'masterclass__slug',
+                  'masterclass__bucket_link', 'masterclass__start_price', 'masterclass__final_price')
+            .order_by('-seen_at')[:settings.LAST_SEEN_LIMIT]
+        )
+        return Response(LastSeenCardSerializer(recent, many=True).data)
     
     def post(self, request, id):
+        if str(request.user.pk) != str(id):
+            return Response({'error': 'User ID mismatch'}, status=status.HTTP_403_FORBIDDEN)
+        product_id = request.data.get('product_id')
+        if not product_id:
+            return Response({'error': 'Product ID is required'}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            user = User.objects.get(id=id)
-            product_id = request.data.get('product_id')
-            
-            if not product_id:
-                return Response({'error': 'Product ID is required'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            try:
-                masterclass = MasterClass.objects.get(id=product_id)
-            except MasterClass.DoesNotExist:
-                return Response({'error': 'Masterclass not found'}, status=status.HTTP_404_NOT_FOUND)
-            
-            # Add to last seen
-            user.profile.last_seen_masterclasses.add(masterclass)
-            
-            return Response({'message': 'Masterclass added to last seen'})
-        except User.DoesNotExist:
-            return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+            product_id = int(product_id)
+        except (TypeError, ValueError):
+            return Response({'error': 'Masterclass not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        # Buffered; written in a batch after the response (users.last_seen)
+        last_seen.record(request.user.pk, product_id)
+        return Response({'message': 'Masterclass added to last seen'})
 
 class ChangePasswordView(APIView):
     permission_classes = [IsAuthenticated]
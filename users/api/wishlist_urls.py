@@ -1,7 +1,8 @@
 from django.urls import path
-from .wishlist_views import WishlistView
+from .wishlist_views import WishlistView, WishlistBulkView
 
 urlpatterns = [
     path('<int:id>/', WishlistView.as_view(), name='wishlist-without-user'),
     path('<int:id>/<int:product_id>/', WishlistView.as_view(), name='wishlist-item-without-user'),
+    path('<int:id>/bulk/', WishlistBulkView.as_view(), name='wishlist-bulk-without-user'),
 ] 
\ No newline at end of file
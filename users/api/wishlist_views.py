@@ -3,8 +3,10 @@ from rest_framework.response import Response
 from rest_framework import status, permissions
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from masterclasses.models import MasterClass
 from masterclasses.api.serializers import MasterClassSerializer
+from users.models import UserProfile
 
 User = get_user_model()
 
@@ -48,4 +50,61 @@ class WishlistView(APIView):
             )
         masterclass = get_object_or_404(MasterClass, id=product_id)
         user.profile.favorite_masterclasses.remove(masterclass)
-        return Response({'message': 'Masterclass removed from wishlist'}) 
\ No newline at end of file
+        return Response({'message': 'Masterclass removed from wishlist'})
+
+
+def parse_ids(value):
+    """Set of IDs from a JSON list of ints or digit strings; anything else raises ValueError."""
+    if not isinstance(value, list):
+        raise ValueError('Expected a list of IDs')
+    ids = set()
+    for pk in value:
+        if isinstance(pk, int) and not isinstance(pk, bool):
+            ids.add(pk)
+        elif isinstance(pk, str) and pk.isascii() and pk.isdigit():
+            ids.add(int(pk))
+        else:
+            raise ValueError(f'Invalid ID: {pk!r}')
+    return ids
+
+
+class WishlistBulkView(APIView):
+    """
+    Applies several wishlist changes in one request, e.g. a guest's local
+    wishlist after sign-in: {"add": [ids], "remove": [ids]}. An ID in both
+    lists ends up removed. IDs of masterclasses that do not exist are
+    skipped and returned in "unknown". The response carries the resulting
+    wishlist as a list of IDs.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request, id):
+        if not request.user.is_authenticated:
+            return Response({'detail': 'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED)
+        if request.user.id != id:
+            return Response(
+                {'error': 'You can only modify your own wishlist'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        try:
+            add_ids = parse_ids(request.data.get('add', []))
+            remove_ids = parse_ids(request.data.get('remove', []))
+        except (TypeError, ValueError, AttributeError):
+            return Response({'error': 'add and remove must be lists of masterclass IDs'}, status=status.HTTP_400_BAD_REQUEST)
+
+        known = MasterClass.objects.only('id').in_bulk(add_ids | remove_ids)
+        unknown = sorted((add_ids | remove_ids) - known.keys())
+        add_ids = (add_ids - remove_ids) & known.keys()
+        remove_ids &= known.keys()
+
+        profile = UserProfile.objects.only('id').get(user_id=request.user.id)
+        with transaction.atomic():
+            if add_ids:
+                profile.favorite_masterclasses.add(*add_ids)
+            if remove_ids:
+                profile.favorite_masterclasses.remove(*remove_ids)
+
+        through = UserProfile.favorite_masterclasses.through
+        wishlist = through.objects.filter(userprofile_id=profile.id).order_by('masterclass_id').values_list('masterclass_id', flat=True)
+        return Response({'wishlist': list(wishlist), 'unknown': unknown})
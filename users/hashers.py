@@ -0,0 +1,80 @@
+"""
+Password hashing on a dedicated, bounded thread pool.
+
+PBKDF2 is deliberately slow. Run directly on the request threads, a burst of
+logins occupies every thread and the catalog queues behind it. The hasher
+below runs the hashing on PASSWORD_HASH_WORKERS threads (hashlib releases
+the GIL while it works). At most PASSWORD_HASH_QUEUE more requests may wait
+for a worker. Anything beyond that is refused with a 503 right away instead
+of piling up: by DRF's exception handler in API views, and by
+lesjours.middleware.PasswordHashingBusyMiddleware everywhere else (admin
+login, allauth).
+
+Only the hash computation is moved to the pool; the user lookup and the
+rest of authenticate() stay on the request thread and its DB connection.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from lesjours import metrics
+
+
+class PasswordHashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many sign-in requests, please retry shortly.'
+    default_code = 'password_hashing_busy'
+    # Sent as Retry-After
+    wait = 1
+
+
+class HashingPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _start(self):
+        # Threads do not survive a fork, so each worker process starts its own pool
+        with self._lock:
+            if self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    thread_name_prefix='password-hash',
+                )
+                self._slots = threading.BoundedSemaphore(
+                    settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE
+                )
+                self._pid = os.getpid()
+
+    def run(self, func, *args):
+        if self._pid != os.getpid():
+            self._start()
+        if not self._slots.acquire(blocking=False):
+            metrics.record('password_hash.rejected', 0, error=True)
+            raise PasswordHashingBusy()
+        try:
+            with metrics.timer('password_hash.wait_and_run'):
+                return self._executor.submit(self._timed, func, *args).result()
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _timed(func, *args):
+        with metrics.timer('password_hash.run'):
+            return func(*args)
+
+
+hashing_pool = HashingPool()
+
+
+class BoundedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 (same algorithm and stored format) computed on hashing_pool."""
+
+    def encode(self, password, salt, iterations=None):
+        # verify() and harden_runtime() go through encode() as well
+        return hashing_pool.run(super().encode, password, salt, iterations)
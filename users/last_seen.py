@@ -0,0 +1,105 @@
+"""
+"Recently viewed" masterclasses.
+
+A product-page view only records (user, masterclass, time) in a per-process
+buffer. The buffer is written at the end of a request, once it holds
+LAST_SEEN_FLUSH_SIZE views or is older than LAST_SEEN_FLUSH_SECONDS. The
+write is one upsert for the whole batch plus a trim that keeps each user's
+LAST_SEEN_LIMIT most recent rows. Views still buffered when a process stops
+are lost, which is acceptable for this history.
+
+The buffer belongs to one worker process. A read flushes only the buffer of
+the worker serving it, so with several workers a view recorded by another
+worker shows up once that worker finishes a request after its flush is due;
+the history is not read-your-writes.
+
+A failed write (e.g. a user deleted after the view was buffered) is logged
+and its batch is dropped; it never reaches the request that triggered it.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, transaction
+from django.core.signals import request_finished
+from django.db.models import Subquery
+from django.dispatch import receiver
+from django.utils import timezone
+
+from masterclasses.models import MasterClass
+from users.models import LastSeenMasterClass
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pending = {}
+_oldest = None
+
+
+def record(user_id, masterclass_id):
+    global _oldest
+    with _lock:
+        _pending[(user_id, masterclass_id)] = timezone.now()
+        if _oldest is None:
+            _oldest = time.monotonic()
+
+
+def flush():
+    """Writes the buffered views; returns the number of rows upserted."""
+    global _pending, _oldest
+    with _lock:
+        pending, _pending, _oldest = _pending, {}, None
+    if not pending:
+        return 0
+
+    try:
+        return _write(pending)
+    except DatabaseError:
+        # Runs from request_finished, after the response: there is no caller to report to
+        logger.exception(f"Dropped {len(pending)} buffered last-seen views")
+        return 0
+
+
+def _write(pending):
+    # Views of masterclasses or users deleted in the meantime (or bogus ids) are dropped here
+    known_masterclasses = set(
+        MasterClass.objects.filter(id__in={mc_id for _, mc_id in pending}).values_list('id', flat=True)
+    )
+    known_users = set(
+        get_user_model().objects.filter(id__in={user_id for user_id, _ in pending}).values_list('id', flat=True)
+    )
+    rows = [
+        LastSeenMasterClass(user_id=user_id, masterclass_id=mc_id, seen_at=seen_at)
+        for (user_id, mc_id), seen_at in pending.items()
+        if mc_id in known_masterclasses and user_id in known_users
+    ]
+    with transaction.atomic():
+        LastSeenMasterClass.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['user', 'masterclass'],
+            update_fields=['seen_at'],
+        )
+        for user_id in {row.user_id for row in rows}:
+            recent = LastSeenMasterClass.objects.filter(user_id=user_id).order_by('-seen_at').values('pk')
+            LastSeenMasterClass.objects.filter(user_id=user_id).exclude(
+                pk__in=Subquery(recent[:settings.LAST_SEEN_LIMIT])
+            ).delete()
+    return len(rows)
+
+
+def flush_pending(user_id=None):
+    """Flushes this process's buffer before a read if it holds views of user_id (or any views)."""
+    if user_id is None or any(key[0] == user_id for key in list(_pending)):
+        flush()
+
+
+@receiver(request_finished)
+def flush_if_due(sender, **kwargs):
+    if not _pending:
+        return
+    age = time.monotonic() - _oldest if _oldest is not None else 0
+    if len(_pending) >= settings.LAST_SEEN_FLUSH_SIZE or age >= settings.LAST_SEEN_FLUSH_SECONDS:
+        flush()
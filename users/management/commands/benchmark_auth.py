@@ -0,0 +1,78 @@
+import base64
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from rest_framework.authentication import BasicAuthentication, SessionAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from lesjours.benchmarking import QueryCounter, format_summary, latency_summary
+from users.api.authentication import DispatchingAuthentication, ExpiringTokenAuthentication
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Compares the old four-authenticator chain with DispatchingAuthentication per auth scheme'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=500, help='Requests per scheme and configuration')
+        parser.add_argument(
+            '--basic-iterations',
+            type=int,
+            default=10,
+            help='Requests for Basic auth (each one runs a full password hash)',
+        )
+
+    def handle(self, *args, **options):
+        password = uuid.uuid4().hex
+        email = f'bench-auth-{uuid.uuid4().hex[:8]}@example.com'
+        user = User.objects.create_user(username=email, email=email, password=password)
+        try:
+            basic = base64.b64encode(f'{user.username}:{password}'.encode()).decode()
+            headers = {
+                'anonymous': None,
+                'basic': f'Basic {basic}',
+                'token': f'Token {Token.objects.create(user=user).key}',
+                'jwt': f'Bearer {RefreshToken.for_user(user).access_token}',
+            }
+            configurations = {
+                'chain': lambda: [
+                    SessionAuthentication(),
+                    BasicAuthentication(),
+                    ExpiringTokenAuthentication(),
+                    JWTAuthentication(),
+                ],
+                'dispatch': lambda: [DispatchingAuthentication()],
+            }
+            factory = APIRequestFactory()
+            for scheme, header in headers.items():
+                iterations = options['basic_iterations'] if scheme == 'basic' else options['iterations']
+                for name, authenticators in configurations.items():
+                    latencies, queries = self.measure(factory, header, authenticators, iterations, expected=scheme != 'anonymous')
+                    self.stdout.write(
+                        f'{scheme:<9} {name:<8} {format_summary(latency_summary(latencies))}, '
+                        f'queries/request={queries / iterations:.1f}'
+                    )
+        finally:
+            user.delete()
+
+    def measure(self, factory, header, authenticators, iterations, expected):
+        latencies = []
+        with QueryCounter() as queries:
+            for _ in range(iterations):
+                http_request = factory.get('/', HTTP_AUTHORIZATION=header) if header else factory.get('/')
+                http_request.user = AnonymousUser()  # what AuthenticationMiddleware sets without a session
+                request = Request(http_request, authenticators=authenticators())
+                started = time.perf_counter()
+                authenticated = request.user.is_authenticated
+                latencies.append(time.perf_counter() - started)
+                if authenticated != expected:
+                    raise AssertionError(f'Unexpected authentication result for {header!r}')
+        return latencies, len(queries)
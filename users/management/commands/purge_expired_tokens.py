@@ -0,0 +1,15 @@
+from rest_framework.authtoken.models import Token
+
+from lesjours.purging import PurgeCommand
+from users.models import get_token_expiry_cutoff
+from users.revocation import expired_revocations
+
+
+class Command(PurgeCommand):
+    help = 'Deletes DRF auth tokens older than AUTH_TOKEN_TTL_HOURS and revocations of expired JWTs in small batches'
+
+    def get_targets(self, now):
+        return [
+            ('auth tokens', Token.objects.filter(created__lt=get_token_expiry_cutoff(now))),
+            ('revoked JWTs', expired_revocations(now)),
+        ]
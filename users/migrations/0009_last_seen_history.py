@@ -0,0 +1,51 @@
+# Generated by Django 4.2.10 on 2026-10-18 23:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def copy_last_seen(apps, schema_editor):
+    # The M2M had no timestamps: existing entries all get the migration time
+    UserProfile = apps.get_model('users', 'UserProfile')
+    LastSeenMasterClass = apps.get_model('users', 'LastSeenMasterClass')
+    through = UserProfile.last_seen_masterclasses.through
+    now = timezone.now()
+    rows = [
+        LastSeenMasterClass(user_id=user_id, masterclass_id=masterclass_id, seen_at=now)
+        for user_id, masterclass_id in through.objects.values_list('userprofile__user_id', 'masterclass_id').iterator()
+    ]
+    LastSeenMasterClass.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masterclasses', '0010_event_held_seats'),
+        ('users', '0008_revoked_tokens'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LastSeenMasterClass',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seen_at', models.DateTimeField()),
+                ('masterclass', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='last_seen_entries', to='masterclasses.masterclass')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='last_seen', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-seen_at'], name='users_last_seen_user_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='lastseenmasterclass',
+            constraint=models.UniqueConstraint(fields=('user', 'masterclass'), name='users_last_seen_unique'),
+        ),
+        migrations.RunPython(copy_last_seen, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='userprofile',
+            name='last_seen_masterclasses',
+        ),
+    ]
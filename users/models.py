@@ -1,7 +1,13 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
-from django.db import models
-from django.db.models.signals import post_save
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
 
 
 class User(AbstractUser):
@@ -27,18 +33,122 @@ class UserProfile(models.Model):
     is_mailing_list = models.BooleanField(default=False)
     cart = models.JSONField(default=dict, blank=True)
     favorite_masterclasses = models.ManyToManyField('masterclasses.MasterClass', blank=True)
-    last_seen_masterclasses = models.ManyToManyField('masterclasses.MasterClass', related_name='last_seen_by', blank=True)
 
     def __str__(self):
         return f"{self.user.email}'s profile"
 
 
+class LastSeenMasterClass(models.Model):
+    """One row per viewed masterclass; users.last_seen upserts seen_at and caps the history."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='last_seen')
+    masterclass = models.ForeignKey('masterclasses.MasterClass', on_delete=models.CASCADE, related_name='last_seen_entries')
+    seen_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'masterclass'], name='users_last_seen_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-seen_at'], name='users_last_seen_user_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} saw {self.masterclass_id} at {self.seen_at}'
+
+
+class RevokedToken(models.Model):
+    """A revoked JWT, kept until the token would have expired anyway."""
+    jti = models.CharField(max_length=255, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='revoked_tokens')
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.jti
+
+
+def wishlist_cache_key(user_id):
+    return f'users:wishlist:{user_id}'
+
+
+def favorite_masterclass_ids(user_id):
+    """IDs of the user's wishlisted masterclasses, cached until the wishlist changes."""
+    key = wishlist_cache_key(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        through = UserProfile.favorite_masterclasses.through
+        ids = frozenset(
+            through.objects.filter(userprofile__user_id=user_id).values_list('masterclass_id', flat=True)
+        )
+        cache.set(key, ids, settings.WISHLIST_CACHE_SECONDS)
+    return ids
+
+
+@receiver(m2m_changed, sender=UserProfile.favorite_masterclasses.through)
+def wishlist_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # pre_clear: after the clear the affected profiles can no longer be found
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        user_ids = [instance.user_id]
+    elif action == 'pre_clear':
+        user_ids = list(UserProfile.objects.filter(favorite_masterclasses=instance).values_list('user_id', flat=True))
+    else:
+        user_ids = list(UserProfile.objects.filter(pk__in=pk_set).values_list('user_id', flat=True))
+    keys = [wishlist_cache_key(user_id) for user_id in user_ids]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
 @receiver(post_save, sender=User)
-def create_user_profile(sender, instance, created, **kwargs):
-    if created:
+def create_user_profile(sender, instance, created, raw=False, **kwargs):
+    # Raw saves (fixtures, RegistrationSerializer.create) bring their own profile
+    if created and not raw:
         UserProfile.objects.create(user=instance)
 
 
+def user_info_cache_key(user_id):
+    return f'users:info:{user_id}'
+
+
+def invalidate_user_info(user_id):
+    # After commit, so that a concurrent reader cannot re-cache the old values
+    transaction.on_commit(lambda: cache.delete(user_info_cache_key(user_id)))
+
+
+@receiver(post_save, sender=UserProfile)
+def profile_changed(sender, instance, **kwargs):
+    invalidate_user_info(instance.user_id)
+
+
+def get_token_expiry_cutoff(now=None):
+    """Tokens created before this moment are expired."""
+    return (now or timezone.now()) - timedelta(hours=settings.AUTH_TOKEN_TTL_HOURS)
+
+
+def token_cache_key(key):
+    return f'auth_token:{key}'
+
+
+def invalidate_token_cache(keys):
+    keys = [token_cache_key(key) for key in keys]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+# Saving only these fields (login bookkeeping) changes nothing the user or token caches depend on
+UNCACHED_USER_FIELDS = frozenset({'last_login'})
+
+
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    instance.profile.save()
+def user_changed(sender, instance, created, update_fields=None, **kwargs):
+    # Password changes and deactivation must not be served from the token cache
+    if created or (update_fields is not None and set(update_fields) <= UNCACHED_USER_FIELDS):
+        return
+    invalidate_user_info(instance.pk)
+    invalidate_token_cache(Token.objects.filter(user_id=instance.pk).values_list('key', flat=True))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_token_cache([instance.key])
@@ -0,0 +1,123 @@
+"""
+Revocation list for JWTs.
+
+Revoked JTIs are stored in RevokedToken. Every process mirrors them into a
+Bloom filter and only pulls rows added since its last refresh, at most once
+per JWT_REVOCATION_REFRESH_SECONDS. A token whose JTI is not in the filter
+is definitely not revoked, so most requests are checked without any I/O;
+filter hits are confirmed with a primary-key lookup.
+
+A revocation made in another process is seen here after the next refresh.
+Rows past their token's own expiry can no longer match a valid token;
+purge_expired_tokens deletes them (expired_revocations()).
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from users.models import RevokedToken
+
+REFRESH_OVERLAP = timedelta(minutes=1)
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        # Double hashing: k positions from one 128-bit digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        added = False
+        for position in self._positions(item):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                added = True
+        # Re-adding a known JTI (refresh overlap) does not use up capacity
+        if added:
+            self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationList:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.bloom = BloomFilter(settings.JWT_REVOCATION_BLOOM_CAPACITY, settings.JWT_REVOCATION_BLOOM_ERROR_RATE)
+        self.since = None
+        self.refreshed_at = None
+
+    def _is_fresh(self, now):
+        return self.refreshed_at is not None and now - self.refreshed_at < settings.JWT_REVOCATION_REFRESH_SECONDS
+
+    def refresh(self, force=False):
+        """Adds rows created since the last refresh to the filter."""
+        now = time.monotonic()
+        if not force and self._is_fresh(now):
+            return
+        with self._lock:
+            if not force and self._is_fresh(now):
+                return
+            started = timezone.now()
+            revoked = RevokedToken.objects.all()
+            if self.since is not None:
+                # Overlap so rows committed late by slower transactions are not missed
+                revoked = revoked.filter(created_at__gte=self.since - REFRESH_OVERLAP)
+            jtis = list(revoked.values_list('jti', flat=True))
+            bloom = self.bloom
+            if bloom.count + len(jtis) > bloom.capacity:
+                # Full: rebuild with room to grow instead of letting the false positive rate climb
+                bloom = BloomFilter(bloom.capacity * 2, settings.JWT_REVOCATION_BLOOM_ERROR_RATE)
+                jtis = list(RevokedToken.objects.values_list('jti', flat=True))
+            for jti in jtis:
+                bloom.add(jti)
+            self.bloom = bloom
+            self.since = started
+            self.refreshed_at = now
+
+    def is_revoked(self, jti):
+        self.refresh()
+        if jti not in self.bloom:
+            return False
+        return RevokedToken.objects.filter(jti=jti).exists()
+
+    def revoke(self, token):
+        """Revokes a validated simplejwt token until its own expiry."""
+        jti = token[jwt_settings.JTI_CLAIM]
+        RevokedToken.objects.get_or_create(
+            jti=jti,
+            defaults={
+                'user_id': token.get(jwt_settings.USER_ID_CLAIM),
+                'expires_at': datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc),
+            },
+        )
+        # Visible in this process right away; others pick it up on their next refresh
+        with self._lock:
+            self.bloom.add(jti)
+
+
+revocation_list = RevocationList()
+
+
+def expired_revocations(now):
+    """Revocations whose token has expired anyway and can be deleted."""
+    return RevokedToken.objects.filter(expires_at__lt=now)
@@ -0,0 +1,204 @@
+import base64
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from lesjours import metrics
+from masterclasses.models import MasterClass
+from users.api.jwt import CustomTokenObtainPairSerializer
+
+User = get_user_model()
+
+
+class DispatchingAuthenticationTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='auth@example.com',
+            email='auth@example.com',
+            password='testpass123'
+        )
+        self.url = reverse('user_info', kwargs={'id': self.user.id})
+        metrics.reset()
+
+    def _get(self, authorization=None):
+        if authorization:
+            return self.client.get(self.url, HTTP_AUTHORIZATION=authorization)
+        return self.client.get(self.url)
+
+    def test_each_scheme_runs_its_backend(self):
+        """Test that Basic, Token and Bearer headers authenticate through their own backend"""
+        basic = base64.b64encode(b'auth@example.com:testpass123').decode()
+        token = Token.objects.create(user=self.user).key
+        access = str(RefreshToken.for_user(self.user).access_token)
+
+        for header in (f'Basic {basic}', f'Token {token}', f'Bearer {access}'):
+            self.assertEqual(self._get(header).status_code, status.HTTP_200_OK, header)
+
+        counters = metrics.snapshot('auth.')
+        self.assertEqual({name: c['count'] for name, c in counters.items()},
+                         {'auth.basic': 1, 'auth.token': 1, 'auth.jwt': 1})
+
+    def test_token_request_does_not_hash_passwords(self):
+        """Test that a Token request only looks up the token"""
+        token = Token.objects.create(user=self.user).key
+        with self.assertNumQueries(2):  # token+user, user+profile
+            self._get(f'Token {token}')
+
+    def test_invalid_credentials_are_rejected(self):
+        """Test that a bad token is rejected and counted as an error"""
+        response = self._get('Bearer not-a-jwt')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(metrics.snapshot('auth.jwt')['auth.jwt']['errors'], 1)
+
+    def test_session_and_unknown_schemes(self):
+        """Test that requests without a known scheme use the session"""
+        self.assertEqual(self._get().status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_login(self.user)
+        self.assertEqual(self._get().status_code, status.HTTP_200_OK)
+        self.assertEqual(self._get('Digest abc').status_code, status.HTTP_200_OK)
+        self.assertEqual(self._get('   ').status_code, status.HTTP_200_OK)
+        self.assertEqual(metrics.snapshot('auth.')['auth.session']['count'], 4)
+
+    def test_metrics_endpoint_is_admin_only(self):
+        """Test that counters are exposed to staff only"""
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+        self.user.is_staff = True
+        self.user.save()
+        metrics.record('auth.token', 0.002)
+        response = self.client.get(reverse('metrics'), {'prefix': 'auth.'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['counters']['auth.token']['count'], 1)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ExpiringTokenCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='cached@example.com',
+            email='cached@example.com',
+            password='testpass123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = reverse('user_info', kwargs={'id': self.user.id})
+
+    def _token_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        return response, [q for q in ctx.captured_queries if 'authtoken_token' in q['sql']]
+
+    def test_repeated_requests_skip_the_token_lookup(self):
+        """Test that only the first request with a token reads the token table"""
+        response, queries = self._token_queries()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+
+        response, queries = self._token_queries()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(queries, [])
+
+    def test_deactivation_and_logout_invalidate_the_cache(self):
+        """Test that saving the user or deleting the token is seen by the next request"""
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_active = True
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_last_login_update_keeps_the_cache(self):
+        """Test that saving only last_login neither queries tokens nor drops cached entries"""
+        self.client.get(self.url)
+        self.user.last_login = timezone.now()
+        with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.user.save(update_fields=['last_login'])
+        self.assertFalse(any('authtoken_token' in q['sql'] for q in ctx.captured_queries))
+        self.assertEqual(callbacks, [])
+        _, queries = self._token_queries()
+        self.assertEqual(queries, [])
+
+    def test_expired_tokens_are_rejected_and_purged_later(self):
+        """Test that an expired token is refused without a delete and removed by the purge command"""
+        Token.objects.filter(pk=self.token.pk).update(created=timezone.now() - timedelta(hours=25))
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertTrue(Token.objects.filter(pk=self.token.pk).exists())
+
+        out = StringIO()
+        call_command('purge_expired_tokens', stdout=out)
+        self.assertFalse(Token.objects.filter(pk=self.token.pk).exists())
+        self.assertIn('auth tokens: deleted 1 rows', out.getvalue())
+
+
+class StatelessReadAuthenticationTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='reader@example.com',
+            email='reader@example.com',
+            password='testpass123',
+            first_name='Anna',
+        )
+        self.liked = MasterClass.objects.create(name='Liked', short_description='Liked', start_price=100, final_price=90)
+        self.other = MasterClass.objects.create(name='Other', short_description='Other', start_price=100, final_price=90)
+        self.user.profile.favorite_masterclasses.add(self.liked)
+        access = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        metrics.reset()
+
+    def test_catalog_read_does_not_load_user(self):
+        """Test that a catalog GET with a JWT reads neither the user nor the profile row"""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('masterclass-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        in_wishlist = {item['id']: item['in_wishlist'] for item in response.data['results']}
+        self.assertEqual(in_wishlist, {self.liked.id: True, self.other.id: False})
+
+        sql = ' '.join(q['sql'] for q in ctx.captured_queries)
+        self.assertNotIn('FROM "users_user" ', sql)
+        self.assertNotIn('FROM "users_userprofile" ', sql)
+        wishlist_queries = [q for q in ctx.captured_queries if 'favorite_masterclasses' in q['sql']]
+        self.assertEqual(len(wishlist_queries), 1)
+        self.assertEqual(metrics.snapshot('auth.')['auth.jwt_stateless']['count'], 1)
+
+    def test_claims_user_loads_other_fields_lazily(self):
+        """Test that the claims user carries the token fields and fetches the rest on access"""
+        from users.api.authentication import StatelessJWTAuthentication
+
+        token = CustomTokenObtainPairSerializer.get_token(self.user).access_token
+        user = StatelessJWTAuthentication().get_user(token)
+        with self.assertNumQueries(0):
+            self.assertEqual(user, self.user)
+            self.assertEqual(user.first_name, 'Anna')
+            self.assertEqual(user.token_claims['gender'], self.user.profile.gender)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, 'reader@example.com')
+
+    def test_writes_authenticate_against_the_database(self):
+        """Test that unsafe methods on the same views use regular JWT authentication"""
+        response = self.client.post(reverse('masterclass-toggle-wishlist', kwargs={'slug': self.other.slug}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['in_wishlist'])
+        self.assertEqual(metrics.snapshot('auth.')['auth.jwt']['count'], 1)
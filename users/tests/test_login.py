@@ -1,4 +1,7 @@
-from django.test import TestCase
+import json
+from urllib.parse import urlencode
+
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
@@ -72,4 +75,45 @@ class LoginAPITest(TestCase):
         del payload['password']
         
         response = self.client.post(self.login_url, payload)
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST) 
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST) 
+
+class TolerantBodyParsingTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='parse@example.com',
+            email='parse@example.com',
+            password='testpass123'
+        )
+        self.credentials = json.dumps({'username': 'parse@example.com', 'password': 'testpass123'})
+
+    def test_login_accepts_json_envelopes(self):
+        """Test that the JSON-in-form and double-encoded bodies are all understood"""
+        form = 'application/x-www-form-urlencoded'
+        bodies = [
+            (self.credentials, form),
+            (urlencode({self.credentials: ''}), form),
+            (urlencode({'data': self.credentials}), form),
+            (json.dumps(self.credentials), 'application/json'),
+            (json.dumps({'data': self.credentials}), 'application/json'),
+        ]
+        for body, content_type in bodies:
+            response = self.client.post('/api/user/login', body, content_type=content_type)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, body)
+
+    def test_token_refresh_reads_the_parsed_body(self):
+        """Test that token refresh accepts a JSON object sent as a form body"""
+        refresh = self.client.post('/api/user/login', self.credentials, content_type='application/json').data['refresh']
+        response = self.client.post(
+            reverse('user_token_refresh'), json.dumps({'refresh': refresh}),
+            content_type='application/x-www-form-urlencoded'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('access', response.data)
+
+    @override_settings(API_MAX_BODY_BYTES=64)
+    def test_oversize_body_is_rejected(self):
+        """Test that a body above the limit gets 413"""
+        body = json.dumps({'username': 'parse@example.com', 'password': 'x' * 100})
+        response = self.client.post('/api/user/login', body, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
@@ -0,0 +1,81 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, make_password
+from django.test import Client, TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from lesjours import metrics
+from users.hashers import hashing_pool
+
+User = get_user_model()
+
+
+@override_settings(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE=0)
+class BoundedPasswordHashingTest(TestCase):
+    def setUp(self):
+        hashing_pool._pid = None
+        metrics.reset()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='hash@example.com',
+            email='hash@example.com',
+            password='testpass123'
+        )
+
+    def tearDown(self):
+        # Let the next test start a pool with its own settings
+        hashing_pool._pid = None
+
+    def test_hashes_run_on_the_pool(self):
+        """Test that hashing happens on a pool thread and keeps the pbkdf2_sha256 format"""
+        threads = []
+        original = hashing_pool._timed
+
+        def spy(func, *args):
+            threads.append(threading.current_thread().name)
+            return original(func, *args)
+
+        hashing_pool._timed = spy
+        metrics.reset()
+        try:
+            encoded = make_password('secret')
+            self.assertTrue(check_password('secret', encoded))
+        finally:
+            del hashing_pool._timed
+
+        self.assertTrue(encoded.startswith('pbkdf2_sha256$'))
+        self.assertEqual(len(threads), 2)
+        self.assertTrue(all(name.startswith('password-hash') for name in threads))
+        self.assertEqual(metrics.snapshot('password_hash.run')['password_hash.run']['count'], 2)
+
+    def test_login_is_refused_when_the_pool_is_full(self):
+        """Test that a login beyond workers + queue gets a fast 503 with Retry-After"""
+        payload = {'username': 'hash@example.com', 'password': 'testpass123'}
+        self.assertEqual(self.client.post('/api/user/login', payload).status_code, status.HTTP_200_OK)
+
+        hashing_pool._slots.acquire()
+        try:
+            response = self.client.post('/api/user/login', payload)
+        finally:
+            hashing_pool._slots.release()
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(metrics.snapshot('password_hash.rejected')['password_hash.rejected']['errors'], 1)
+
+    def test_admin_login_is_refused_when_the_pool_is_full(self):
+        """Test that a non-DRF login gets the same 503 instead of a server error"""
+        self.user.is_staff = True
+        self.user.save()
+        payload = {'username': 'hash@example.com', 'password': 'testpass123'}
+
+        hashing_pool._slots.acquire()
+        try:
+            response = Client().post('/admin/login/', payload)
+        finally:
+            hashing_pool._slots.release()
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '1')
@@ -1,11 +1,18 @@
-from django.test import TestCase
+from unittest import mock
+
+from django.db import connection, IntegrityError
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
+from django.utils import timezone
 from masterclasses.models import MasterClass
+from users import last_seen
+from users.models import LastSeenMasterClass, UserProfile
 
 User = get_user_model()
 
@@ -42,6 +49,30 @@ class RegistrationAPITest(TestCase):
         self.assertEqual(user.last_name, self.valid_payload['last_name'])
         self.assertEqual(user.profile.gender, 'male')
 
+    def test_registration_writes_user_and_profile_once(self):
+        """Test that registration is one INSERT per table and no UPDATE"""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.register_url, self.valid_payload)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        writes = [q['sql'].split()[0] for q in ctx.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE'))]
+        self.assertEqual(writes, ['INSERT', 'INSERT'])
+        profile = User.objects.get(email=self.valid_payload['username']).profile
+        self.assertEqual((profile.phone, profile.gender, profile.is_mailing_list), ('+79161149227', 'male', True))
+
+    def test_other_user_creation_gets_an_empty_profile(self):
+        """Test that users created outside registration still get a profile from the signal"""
+        user = User.objects.create_user(username='plain@example.com', email='plain@example.com', password='x')
+        self.assertEqual(UserProfile.objects.filter(user=user).count(), 1)
+
+    def test_user_save_does_not_save_profile(self):
+        """Test that saving a user no longer re-saves its profile"""
+        user = User.objects.create_user(username='solo@example.com', email='solo@example.com', password='x')
+        user.profile
+        with CaptureQueriesContext(connection) as ctx:
+            user.save()
+        self.assertFalse(any('users_userprofile' in q['sql'] for q in ctx.captured_queries))
+
     def test_registration_duplicate_email(self):
         """Test registration with existing email"""
         # Create user first
@@ -204,16 +235,60 @@ class LastSeenTest(TestCase):
         """Test successful addition to last seen"""
         response = self.client.post(self.last_seen_url, {'product_id': self.masterclass.id})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertTrue(self.masterclass in self.user.profile.favorite_masterclasses.all() or self.masterclass in self.user.profile.last_seen_masterclasses.all())
+        last_seen.flush()
+        self.assertTrue(LastSeenMasterClass.objects.filter(user=self.user, masterclass=self.masterclass).exists())
 
     def test_get_last_seen_success(self):
         """Test successful retrieval of last seen items"""
-        self.user.profile.last_seen_masterclasses.add(self.masterclass)
+        LastSeenMasterClass.objects.create(user=self.user, masterclass=self.masterclass, seen_at=timezone.now())
         response = self.client.get(self.last_seen_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
         self.assertEqual(response.data[0]['id'], self.masterclass.id)
 
+    def test_post_is_buffered_and_read_back_in_order(self):
+        """Test that views are not written during the request and come back newest first"""
+        other = MasterClass.objects.create(name='Other', short_description='Other', start_price=10, final_price=10)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(self.last_seen_url, {'product_id': self.masterclass.id})
+        self.assertFalse(any('users_lastseenmasterclass' in q['sql'] for q in ctx.captured_queries))
+        self.client.post(self.last_seen_url, {'product_id': other.id})
+        self.client.post(self.last_seen_url, {'product_id': 999999})
+
+        response = self.client.get(self.last_seen_url)
+        self.assertEqual([card['id'] for card in response.data], [other.id, self.masterclass.id])
+        self.assertEqual(set(response.data[0]), {'id', 'name', 'slug', 'image', 'price', 'seen_at'})
+
+    @override_settings(LAST_SEEN_LIMIT=2)
+    def test_history_is_capped_and_upserted(self):
+        """Test that repeated views update seen_at and only the newest entries are kept"""
+        extra = [
+            MasterClass.objects.create(name=f'Extra {i}', short_description='Extra', start_price=10, final_price=10)
+            for i in range(2)
+        ]
+        for masterclass in [self.masterclass, *extra]:
+            last_seen.record(self.user.id, masterclass.id)
+            last_seen.flush()
+        last_seen.record(self.user.id, extra[0].id)
+        last_seen.flush()
+
+        rows = LastSeenMasterClass.objects.filter(user=self.user).order_by('-seen_at')
+        self.assertEqual([row.masterclass_id for row in rows], [extra[0].id, extra[1].id])
+
+    def test_flush_skips_deleted_users_and_survives_errors(self):
+        """Test that views of deleted users are dropped and a failed write is logged, not raised"""
+        gone = User.objects.create_user(username='gone@example.com', email='gone@example.com', password='testpass123')
+        last_seen.record(gone.id, self.masterclass.id)
+        last_seen.record(self.user.id, self.masterclass.id)
+        gone.delete()
+        self.assertEqual(last_seen.flush(), 1)
+
+        last_seen.record(self.user.id, self.masterclass.id)
+        with mock.patch.object(LastSeenMasterClass.objects, 'bulk_create', side_effect=IntegrityError), \
+                self.assertLogs('users.last_seen', 'ERROR'):
+            self.assertEqual(last_seen.flush(), 0)
+        self.assertEqual(last_seen.flush(), 0)
+
 class ChangePasswordTest(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -0,0 +1,88 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from lesjours import metrics
+
+User = get_user_model()
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def rest_framework(**rates):
+    return dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES=rates)
+
+
+@override_settings(CACHES=LOCMEM)
+class FixedWindowThrottleTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='limit@example.com',
+            email='limit@example.com',
+            password='testpass123'
+        )
+        self.payload = {'username': 'limit@example.com', 'password': 'wrong'}
+
+    @override_settings(REST_FRAMEWORK=rest_framework(auth='3/min'))
+    def test_login_limit_is_per_ip(self):
+        """Test that an IP gets the window's number of logins, then 429 with Retry-After"""
+        for _ in range(3):
+            response = self.client.post('/api/user/login', self.payload, REMOTE_ADDR='10.0.0.1')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post('/api/user/login', self.payload, REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertLessEqual(int(response['Retry-After']), 60)
+        self.assertEqual(metrics.snapshot('throttle.')['throttle.auth']['errors'], 1)
+
+        response = self.client.post('/api/user/login', self.payload, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(REST_FRAMEWORK=rest_framework(promo='1/min'))
+    def test_function_views_and_unscoped_views(self):
+        """Test that promo endpoints use their own counter and views without a scope are not limited"""
+        url = reverse('promo-unauth')
+        self.assertEqual(self.client.post(url, {'promo': 'X'}, format='json').status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.post(url, {'promo': 'X'}, format='json').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        # auth has no rate in this configuration
+        for _ in range(3):
+            response = self.client.post('/api/user/login', self.payload)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(REST_FRAMEWORK=rest_framework(auth='3/min'))
+    def test_counter_resets_at_the_window_boundary(self):
+        """Test that a window allows num_requests and the next window starts from zero"""
+        def login_at(seconds):
+            with mock.patch('lesjours.throttling.time.time', return_value=seconds):
+                return self.client.post('/api/user/login', self.payload).status_code
+
+        self.assertEqual([login_at(59.5) for _ in range(3)], [status.HTTP_400_BAD_REQUEST] * 3)
+        self.assertEqual(login_at(59.9), status.HTTP_429_TOO_MANY_REQUESTS)
+        # The documented trade-off: a new window right after the boundary
+        self.assertEqual(login_at(60.5), status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(REST_FRAMEWORK=rest_framework(auth='3/min'))
+    def test_check_is_one_cache_round_trip(self):
+        """Test that after the first request of a window each check is a single incr()"""
+        self.client.post('/api/user/login', self.payload)
+        with mock.patch.object(cache, 'incr', wraps=cache.incr) as incr, \
+                mock.patch.object(cache, 'add', wraps=cache.add) as add, \
+                mock.patch.object(cache, 'get', wraps=cache.get) as get, \
+                mock.patch.object(cache, 'set', wraps=cache.set) as set_:
+            self.client.post('/api/user/login', self.payload)
+        self.assertEqual(incr.call_count, 1)
+        throttle_calls = [
+            call for method in (add, get, set_) for call in method.call_args_list
+            if str(call.args[0]).startswith('throttle:')
+        ]
+        self.assertEqual(throttle_calls, [])
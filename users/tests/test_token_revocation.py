@@ -0,0 +1,106 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from users.models import RevokedToken
+from users.revocation import BloomFilter, revocation_list
+
+User = get_user_model()
+
+
+class BloomFilterTest(TestCase):
+    def test_no_false_negatives(self):
+        """Test that every added item is reported as present"""
+        bloom = BloomFilter(1000, 0.01)
+        items = [f'jti-{i}' for i in range(1000)]
+        for item in items:
+            bloom.add(item)
+        self.assertTrue(all(item in bloom for item in items))
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_duplicates_do_not_use_capacity(self):
+        """Test that adding the same JTI twice counts once"""
+        bloom = BloomFilter(10, 0.01)
+        bloom.add('same')
+        bloom.add('same')
+        self.assertEqual(bloom.count, 1)
+
+
+class TokenRevocationTest(TestCase):
+    def setUp(self):
+        revocation_list.reset()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='revoke@example.com',
+            email='revoke@example.com',
+            password='testpass123'
+        )
+        self.refresh = RefreshToken.for_user(self.user)
+        self.access = str(self.refresh.access_token)
+        self.info_url = reverse('user_info', kwargs={'id': self.user.id})
+
+    def _get_info(self):
+        return self.client.get(self.info_url, HTTP_AUTHORIZATION=f'Bearer {self.access}')
+
+    def test_revoked_access_and_refresh_tokens_are_rejected(self):
+        """Test that revoking through the endpoint blocks both tokens"""
+        self.assertEqual(self._get_info().status_code, status.HTTP_200_OK)
+
+        response = self.client.post(
+            reverse('user_token_revoke'), {'refresh': str(self.refresh)},
+            format='json', HTTP_AUTHORIZATION=f'Bearer {self.access}'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['revoked'], 2)
+        self.assertEqual(RevokedToken.objects.filter(user=self.user).count(), 2)
+
+        self.assertEqual(self._get_info().status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.post(reverse('token_refresh'), {'refresh': str(self.refresh)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post(reverse('user_token_refresh'), {'refresh': str(self.refresh)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_other_tokens_are_checked_without_queries(self):
+        """Test that a token missing from the filter is accepted without touching the revocation table"""
+        revocation_list.refresh(force=True)
+        with self.assertNumQueries(0):
+            self.assertFalse(revocation_list.is_revoked(self.refresh.access_token['jti']))
+
+    @override_settings(JWT_REVOCATION_REFRESH_SECONDS=0)
+    def test_revocations_from_other_processes_are_picked_up(self):
+        """Test that rows written elsewhere reach the filter on the next refresh"""
+        revocation_list.refresh(force=True)
+        token = self.refresh.access_token
+        RevokedToken.objects.create(jti=token['jti'], user=self.user, expires_at=self.user.date_joined)
+        self.assertTrue(revocation_list.is_revoked(token['jti']))
+
+    def test_cannot_revoke_another_users_refresh_token(self):
+        """Test that a refresh token of someone else is refused"""
+        other = User.objects.create_user(username='other@example.com', email='other@example.com', password='x')
+        response = self.client.post(
+            reverse('user_token_revoke'), {'refresh': str(RefreshToken.for_user(other))},
+            format='json', HTTP_AUTHORIZATION=f'Bearer {self.access}'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(RevokedToken.objects.exists())
+
+    def test_expired_revocations_are_purged(self):
+        """Test that purge_expired_tokens deletes revocations of expired tokens only"""
+        now = timezone.now()
+        RevokedToken.objects.create(jti='expired', user=self.user, expires_at=now - timedelta(minutes=1))
+        RevokedToken.objects.create(jti='live', user=self.user, expires_at=now + timedelta(hours=1))
+
+        out = StringIO()
+        call_command('purge_expired_tokens', stdout=out)
+
+        self.assertEqual(list(RevokedToken.objects.values_list('jti', flat=True)), ['live'])
+        self.assertIn('revoked JWTs: deleted 1 rows', out.getvalue())
@@ -1,5 +1,8 @@
 import json
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
@@ -132,6 +135,33 @@ class UserInfoAPITest(TestCase):
         self.profile.refresh_from_db()
         self.assertEqual(self.profile.gender, 'female')
     
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_get_is_one_query_then_cached(self):
+        """Тест: один запрос на чтение, затем ответ из кэша до изменения профиля"""
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['first_name'], 'Иван')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, data=json.dumps({'phone': '+7 000'}), content_type='application/json')
+        self.assertEqual(self.client.get(self.url).data['phone_number'], '+7 000')
+
+    def test_update_writes_only_changed_columns(self):
+        """Тест: обновляются только изменённые столбцы"""
+        update_data = {'first_name': 'Пётр', 'last_name': 'Иванов', 'gender': 'M'}
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, data=json.dumps(update_data), content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"first_name"', updates[0])
+        self.assertNotIn('"last_name"', updates[0])
+        self.assertNotIn('"password"', updates[0])
+
     def test_invalid_date_format(self):
         """Тест обработки неверного формата даты"""
         update_data = {
@@ -1,9 +1,13 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from masterclasses.models import MasterClass
+from users.models import wishlist_cache_key
 from decimal import Decimal
 
 User = get_user_model()
@@ -119,4 +123,92 @@ class WishlistAPITest(TestCase):
         self.client.force_authenticate(user=self.user)
         url = reverse('wishlist-item', args=[self.user.id, 99999])
         response = self.client.delete(url)
-        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND) 
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND) 
+
+    def test_bulk_update(self):
+        """Test that adds and removes are applied together and unknown IDs are reported"""
+        second = MasterClass.objects.create(
+            name='Second Masterclass',
+            short_description='Second Description',
+            start_price=Decimal('500.00'),
+            final_price=Decimal('500.00'),
+        )
+        self.user.profile.favorite_masterclasses.add(self.masterclass)
+        self.client.force_authenticate(user=self.user)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(
+                reverse('wishlist-bulk', args=[self.user.id]),
+                {'add': [second.id, 99999], 'remove': [self.masterclass.id]},
+                format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'wishlist': [second.id], 'unknown': [99999]})
+        self.assertEqual(sum('masterclasses_masterclass' in q['sql'] for q in ctx.captured_queries), 1)
+
+    def test_bulk_update_validation(self):
+        """Test that the bulk endpoint rejects other users and malformed ID lists"""
+        self.client.force_authenticate(user=self.user)
+        url = reverse('wishlist-bulk', args=[self.other_user.id])
+        self.assertEqual(self.client.post(url, {'add': []}, format='json').status_code, status.HTTP_403_FORBIDDEN)
+        url = reverse('wishlist-bulk', args=[self.user.id])
+        for payload in ({'add': ['x']}, {'add': '12'}, {'add': {'12': 1}}, {'add': True}, {'remove': [True]}, {'remove': [1.5]}):
+            response = self.client.post(url, payload, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, payload)
+        response = self.client.post(url, {'add': '12'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(self.user.profile.favorite_masterclasses.exists())
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class WishlistCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='cached@example.com',
+            email='cached@example.com',
+            password='testpass123'
+        )
+        self.masterclass = MasterClass.objects.create(
+            name='Cached Masterclass',
+            short_description='Cached Description',
+            start_price=Decimal('1000.00'),
+            final_price=Decimal('1000.00'),
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def _wishlist_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('masterclass-list'))
+        flags = {item['id']: item['in_wishlist'] for item in response.data['results']}
+        return flags, [q for q in ctx.captured_queries if 'favorite_masterclasses' in q['sql']]
+
+    def test_ids_are_cached_until_the_wishlist_changes(self):
+        """Test that the wishlist IDs are read once and re-read after an add or remove"""
+        flags, queries = self._wishlist_queries()
+        self.assertEqual((flags[self.masterclass.id], len(queries)), (False, 1))
+        flags, queries = self._wishlist_queries()
+        self.assertEqual(queries, [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('wishlist-item', args=[self.user.id, self.masterclass.id]))
+        flags, queries = self._wishlist_queries()
+        self.assertEqual((flags[self.masterclass.id], len(queries)), (True, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.masterclass.userprofile_set.clear()
+        flags, _ = self._wishlist_queries()
+        self.assertFalse(flags[self.masterclass.id])
+
+    def test_toggle_decides_from_the_database(self):
+        """Test that toggle_wishlist flips membership even when the cached IDs are stale"""
+        url = reverse('masterclass-toggle-wishlist', kwargs={'slug': self.masterclass.slug})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(self.client.post(url).data['in_wishlist'])
+
+        # A reader that queried before the add wrote the old set back after the invalidation
+        cache.set(wishlist_cache_key(self.user.id), frozenset())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertFalse(self.client.post(url).data['in_wishlist'])
+        self.assertFalse(self.user.profile.favorite_masterclasses.exists())